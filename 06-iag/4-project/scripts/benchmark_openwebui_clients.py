@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""Mede vazao e retries dos scripts cliente contra o servidor local de `fake_openwebui_server.py`.
+
+Duas cargas, cada uma com concorrencia configuravel:
+
+1. Importacao: upload -> polling de status -> add ao knowledge, com as mesmas
+   funcoes e politicas de retry de `import_batches_to_openwebui.py`.
+   Reporta arquivos/s.
+2. Avaliacao: geracao e juiz pelo `run_eval_pipeline` de `run_rag_eval.py`.
+   Reporta perguntas/s.
+
+Ao final confere com os contadores do servidor se cada arquivo foi adicionado
+ao knowledge exatamente uma vez. Com `--base-url` usa um servidor ja em
+execucao em vez de subir um na propria thread.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+try:
+    from scripts.fake_openwebui_server import (
+        DEFAULT_KNOWLEDGE_NAME,
+        FakeOpenWebUIState,
+        add_state_arguments,
+        start_server,
+        state_from_args,
+    )
+    from scripts.import_batches_to_openwebui import (
+        ProcessingFailedError,
+        add_file_to_knowledge_with_retry,
+        retry_sleep_seconds,
+        upload_file,
+        wait_for_processing,
+    )
+    from scripts.run_rag_eval import (
+        generate_answer_row,
+        get_knowledge_id,
+        judge_row,
+        load_text,
+        run_eval_pipeline,
+        summarize_latency,
+    )
+except ModuleNotFoundError:
+    from fake_openwebui_server import (
+        DEFAULT_KNOWLEDGE_NAME,
+        FakeOpenWebUIState,
+        add_state_arguments,
+        start_server,
+        state_from_args,
+    )
+    from import_batches_to_openwebui import (
+        ProcessingFailedError,
+        add_file_to_knowledge_with_retry,
+        retry_sleep_seconds,
+        upload_file,
+        wait_for_processing,
+    )
+    from run_rag_eval import (
+        generate_answer_row,
+        get_knowledge_id,
+        judge_row,
+        load_text,
+        run_eval_pipeline,
+        summarize_latency,
+    )
+
+LOGGER = logging.getLogger("benchmark_openwebui_clients")
+
+
+def import_one_file(
+    base_url: str,
+    token: str,
+    knowledge_id: str,
+    file_path: Path,
+    *,
+    poll_interval: float,
+    timeout_seconds: int,
+    process_failed_retries: int,
+    max_add_retries: int,
+    initial_backoff: float,
+    max_backoff: float,
+) -> dict[str, Any]:
+    """Mesmo fluxo por arquivo de `import_batches_to_openwebui.py`, sem o checkpoint em disco."""
+    started_monotonic = time.monotonic()
+    row: dict[str, Any] = {"file_name": file_path.name, "status": "failed", "processing_retries": 0, "error": ""}
+    try:
+        for processing_attempt in range(1, process_failed_retries + 2):
+            file_id = upload_file(base_url, token, file_path)["id"]
+            try:
+                wait_for_processing(
+                    base_url=base_url,
+                    token=token,
+                    file_id=file_id,
+                    timeout_seconds=timeout_seconds,
+                    poll_interval=poll_interval,
+                )
+            except ProcessingFailedError:
+                row["processing_retries"] = processing_attempt
+                if processing_attempt > process_failed_retries:
+                    raise
+                time.sleep(retry_sleep_seconds(processing_attempt, initial_backoff, max_backoff))
+                continue
+            add_file_to_knowledge_with_retry(
+                base_url=base_url,
+                token=token,
+                knowledge_id=knowledge_id,
+                file_id=file_id,
+                max_retries=max_add_retries,
+                initial_backoff=initial_backoff,
+                max_backoff=max_backoff,
+            )
+            row["status"] = "added"
+            break
+    except Exception as exc:  # noqa: BLE001
+        row["error"] = str(exc)
+    row["duration_seconds"] = round(time.monotonic() - started_monotonic, 4)
+    return row
+
+
+def benchmark_import(
+    base_url: str,
+    token: str,
+    knowledge_id: str,
+    file_paths: list[Path],
+    *,
+    workers: int,
+    **import_options: Any,
+) -> dict[str, Any]:
+    started_monotonic = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="import") as pool:
+        rows = list(
+            pool.map(
+                lambda path: import_one_file(base_url, token, knowledge_id, path, **import_options),
+                file_paths,
+            )
+        )
+    elapsed = time.monotonic() - started_monotonic
+    added = sum(1 for row in rows if row["status"] == "added")
+    return {
+        "files": len(rows),
+        "added": added,
+        "failed": len(rows) - added,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "files_per_second": round(added / elapsed, 3) if elapsed > 0 else None,
+        "latency_seconds": summarize_latency([row["duration_seconds"] for row in rows]),
+        "processing_retries": sum(row["processing_retries"] for row in rows),
+        "errors": sorted({row["error"] for row in rows if row["error"]})[:10],
+    }
+
+
+def benchmark_eval(
+    base_url: str,
+    token: str,
+    knowledge_id: str,
+    items: list[dict[str, Any]],
+    *,
+    model: str,
+    answer_prompt: str,
+    rubric_text: str,
+    judge_system_prompt: str,
+    judge_user_template: str,
+    generation_workers: int,
+    judge_workers: int,
+    max_retries: int,
+    initial_backoff: float,
+    stream: bool,
+    with_judge: bool,
+) -> dict[str, Any]:
+    def generate(item: dict[str, Any]) -> dict[str, Any]:
+        return generate_answer_row(
+            item,
+            base_url=base_url,
+            token=token,
+            model=model,
+            knowledge_id=knowledge_id,
+            answer_prompt=answer_prompt,
+            answer_prompt_role="system",
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+            stream=stream,
+        )
+
+    def judge(row: dict[str, Any]) -> dict[str, Any]:
+        return judge_row(
+            row,
+            base_url=base_url,
+            token=token,
+            model=model,
+            rubric_text=rubric_text,
+            judge_system_prompt=judge_system_prompt,
+            judge_user_template=judge_user_template,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+        )
+
+    started_monotonic = time.monotonic()
+    rows = run_eval_pipeline(
+        items,
+        generate=generate,
+        judge=judge if with_judge else None,
+        on_row_done=lambda index, row: None,
+        generation_workers=generation_workers,
+        judge_workers=judge_workers,
+    )
+    elapsed = time.monotonic() - started_monotonic
+    ok = sum(1 for row in rows if row.get("status") == "ok")
+    return {
+        "questions": len(rows),
+        "ok": ok,
+        "errors": len(rows) - ok,
+        "generation_workers": generation_workers,
+        "judge_workers": judge_workers if with_judge else 0,
+        "stream": stream,
+        "elapsed_seconds": round(elapsed, 3),
+        "questions_per_second": round(ok / elapsed, 3) if elapsed > 0 else None,
+        "generation_seconds": summarize_latency(
+            [row["generation_seconds"] for row in rows if row.get("generation_seconds") is not None]
+        ),
+        "generation_retry_wait_seconds": round(
+            sum(float(row.get("generation_retry_wait_seconds") or 0.0) for row in rows), 3
+        ),
+        "judge_retry_wait_seconds": round(sum(float(row.get("judge_retry_wait_seconds") or 0.0) for row in rows), 3),
+    }
+
+
+def write_synthetic_batches(directory: Path, count: int, size_bytes: int) -> list[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    body = ("Discurso sintetico para teste de carga. " * (size_bytes // 40 + 1))[:size_bytes]
+    paths = []
+    for index in range(1, count + 1):
+        path = directory / f"batch_{index:05d}.md"
+        path.write_text(f"## Chunk {index}-001\n\n{body}\n", encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dos scripts cliente contra um Open WebUI local simulado.")
+    parser.add_argument(
+        "--base-url",
+        default="",
+        help="URL de um servidor ja em execucao. Se vazio, sobe o servidor local na propria thread.",
+    )
+    parser.add_argument("--token", default="benchmark", help="Token enviado no header Authorization.")
+    parser.add_argument(
+        "--knowledge-name",
+        default=DEFAULT_KNOWLEDGE_NAME,
+        help="Nome da Knowledge Base usada na importacao e na geracao.",
+    )
+    parser.add_argument("--files", type=int, default=50, help="Quantidade de batches sinteticos a importar.")
+    parser.add_argument("--file-size-bytes", type=int, default=20000, help="Tamanho de cada batch sintetico.")
+    parser.add_argument("--import-workers", type=int, default=4, help="Importacoes simultaneas.")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="Intervalo de polling do status.")
+    parser.add_argument("--process-failed-retries", type=int, default=3, help="Reenvios apos status failed.")
+    parser.add_argument("--max-add-retries", type=int, default=8, help="Retries de 429 na etapa de add.")
+    parser.add_argument("--initial-backoff", type=float, default=0.05, help="Backoff inicial dos retries.")
+    parser.add_argument("--max-backoff", type=float, default=0.5, help="Backoff maximo dos retries de importacao.")
+    parser.add_argument(
+        "--questions-file",
+        default="eval/discursos_questions.json",
+        help="Arquivo JSON com as perguntas.",
+    )
+    parser.add_argument("--questions", type=int, default=0, help="Limita a quantidade de perguntas. 0 = todas.")
+    parser.add_argument("--generation-workers", type=int, default=4, help="Geracoes simultaneas.")
+    parser.add_argument("--judge-workers", type=int, default=4, help="Avaliacoes simultaneas.")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retries de /api/chat/completions.")
+    parser.add_argument("--stream", action="store_true", help="Consome a geracao como SSE.")
+    parser.add_argument("--skip-judge", action="store_true", help="Mede apenas a geracao.")
+    add_state_arguments(parser)
+    parser.add_argument(
+        "--output",
+        default="",
+        help="JSON de saida. Se vazio, usa eval/results/benchmark_openwebui_<timestamp>.json",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Exibe logs detalhados.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format="%(levelname)s %(message)s")
+
+    project_root = Path(__file__).resolve().parents[1]
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    state: FakeOpenWebUIState | None = None
+    server = None
+    if args.base_url:
+        base_url = args.base_url.rstrip("/")
+    else:
+        state = state_from_args(args)
+        server, base_url = start_server(state)
+
+    try:
+        knowledge_id = get_knowledge_id(base_url, args.token, args.knowledge_name)
+
+        with tempfile.TemporaryDirectory(prefix="benchmark_batches_") as batches_dir:
+            file_paths = write_synthetic_batches(Path(batches_dir), args.files, args.file_size_bytes)
+            import_result = benchmark_import(
+                base_url,
+                args.token,
+                knowledge_id,
+                file_paths,
+                workers=args.import_workers,
+                poll_interval=args.poll_interval,
+                timeout_seconds=60,
+                process_failed_retries=args.process_failed_retries,
+                max_add_retries=args.max_add_retries,
+                initial_backoff=args.initial_backoff,
+                max_backoff=args.max_backoff,
+            )
+
+        questions_path = (
+            (project_root / args.questions_file).resolve()
+            if not Path(args.questions_file).is_absolute()
+            else Path(args.questions_file)
+        )
+        items = json.loads(questions_path.read_text(encoding="utf-8"))
+        if args.questions > 0:
+            items = items[: args.questions]
+        eval_result = benchmark_eval(
+            base_url,
+            args.token,
+            knowledge_id,
+            items,
+            model="fake-model",
+            answer_prompt=load_text(project_root / "eval" / "prompts" / "rag_prompt.md"),
+            rubric_text=load_text(project_root / "eval" / "RUBRIC.md"),
+            judge_system_prompt=load_text(project_root / "eval" / "prompts" / "rag_judge_system.md"),
+            judge_user_template=load_text(project_root / "eval" / "prompts" / "rag_judge_user.md"),
+            generation_workers=args.generation_workers,
+            judge_workers=args.judge_workers,
+            max_retries=args.max_retries,
+            initial_backoff=args.initial_backoff,
+            stream=args.stream,
+            with_judge=not args.skip_judge,
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    report: dict[str, Any] = {
+        "executed_at_utc": ts,
+        "base_url": base_url,
+        "import": import_result,
+        "eval": eval_result,
+    }
+    if state is not None:
+        server_stats = state.snapshot()
+        report["server"] = {
+            "latency": list(args.latency),
+            "chat_latency": list(args.chat_latency or args.latency),
+            "rate_limit_rate": args.rate_limit_rate,
+            "error_rate": args.error_rate,
+            "processing_seconds": args.processing_seconds,
+            "processing_failure_rate": args.processing_failure_rate,
+            **server_stats,
+        }
+        # Cada arquivo reportado como adicionado deve aparecer uma unica vez no knowledge.
+        report["import"]["consistent_with_server"] = (
+            server_stats["knowledge_duplicate_adds"] == 0
+            and server_stats["knowledge_files"] == import_result["added"]
+        )
+
+    if args.output:
+        output_path = (project_root / args.output).resolve() if not Path(args.output).is_absolute() else Path(args.output)
+    else:
+        output_path = project_root / "eval" / "results" / f"benchmark_openwebui_{ts}.json"
+    output_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(
+        f"Importacao: {import_result['added']}/{import_result['files']} arquivos, "
+        f"{import_result['files_per_second']} arquivos/s"
+    )
+    print(
+        f"Avaliacao: {eval_result['ok']}/{eval_result['questions']} perguntas, "
+        f"{eval_result['questions_per_second']} perguntas/s"
+    )
+    print(output_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,7 @@ import argparse
 import json
 import math
 import re
+from itertools import chain
 from pathlib import Path
 
 import pandas as pd
@@ -15,6 +16,7 @@ TEXT_SOURCE_FIELDS = [
     ("Resumo", "resumo"),
     ("Indexacao", "indexacao"),
 ]
+SENTENCE_BOUNDARY_RE = re.compile(r"(?<=[.!?])\s+")
 
 
 def normalize_text(text: str) -> str:
@@ -46,6 +48,48 @@ def chunk_words(text: str, max_words: int, overlap_words: int) -> list[str]:
     return chunks
 
 
+def chunk_sentences(text: str, max_words: int, overlap_words: int) -> list[str]:
+    """Like chunk_words, but chunk boundaries fall between sentences.
+
+    Sentences are packed while the chunk stays within max_words. The next
+    chunk starts with the trailing sentences of the previous one that fit in
+    overlap_words. Sentences longer than max_words are cut into max_words
+    pieces.
+    """
+    if max_words <= overlap_words:
+        raise ValueError("max_words must be greater than overlap_words")
+    units = []
+    for sentence in SENTENCE_BOUNDARY_RE.split(text):
+        words = sentence.split()
+        units.extend(words[start : start + max_words] for start in range(0, len(words), max_words))
+    if not units:
+        return []
+
+    chunks = []
+    current: list[list[str]] = []
+    size = 0
+    for unit in units:
+        if current and size + len(unit) > max_words:
+            chunks.append(" ".join(chain.from_iterable(current)))
+            overlap: list[list[str]] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + len(previous) > overlap_words:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous)
+            while overlap and overlap_size + len(unit) > max_words:
+                overlap_size -= len(overlap.pop(0))
+            current, size = overlap, overlap_size
+        current.append(unit)
+        size += len(unit)
+    chunks.append(" ".join(chain.from_iterable(current)))
+    return chunks
+
+
+CHUNKERS = {"words": chunk_words, "sentences": chunk_sentences}
+
+
 def choose_text(row: pd.Series) -> tuple[str, str]:
     for field, source in TEXT_SOURCE_FIELDS:
         value = row.get(field, "")
@@ -58,6 +102,27 @@ def escape_md(value: str) -> str:
     return (value or "").replace("\n", " ").strip()
 
 
+def format_chunk_markdown(record: dict) -> str:
+    metadata = record.get("metadata") or {}
+    lines = [
+        f"## Chunk {record['chunk_id']}",
+        f"- Data: {escape_md(metadata.get('data', ''))}",
+        f"- Autor: {escape_md(metadata.get('nome_autor', ''))}",
+        f"- Partido: {escape_md(metadata.get('partido', ''))}",
+        f"- UF: {escape_md(metadata.get('uf', ''))}",
+        f"- Casa: {escape_md(metadata.get('casa', ''))}",
+        f"- Tipo: {escape_md(metadata.get('tipo_uso_palavra', ''))}",
+        f"- Origem do texto: {escape_md(record.get('text_source', ''))}",
+    ]
+    if metadata.get("texto_integral_url"):
+        lines.append(f"- Fonte: {escape_md(metadata['texto_integral_url'])}")
+    if metadata.get("resumo"):
+        lines.append(f"- Resumo: {escape_md(metadata['resumo'])}")
+    if metadata.get("indexacao"):
+        lines.append(f"- Indexacao: {escape_md(metadata['indexacao'])}")
+    return "\n".join(lines) + "\n\n" + record.get("text", "")
+
+
 def resolve_parquet_path(repo_id: str, parquet_rel_path: str | None) -> Path:
     if parquet_rel_path:
         return Path(
@@ -108,6 +173,12 @@ def main() -> None:
     parser.add_argument(
         "--overlap-words", type=int, default=150, help="Overlap words between chunks"
     )
+    parser.add_argument(
+        "--boundary",
+        choices=sorted(CHUNKERS),
+        default="words",
+        help="Chunk boundaries: any word (words) or between sentences (sentences)",
+    )
     parser.add_argument(
         "--chunks-per-file",
         type=int,
@@ -156,7 +227,7 @@ def main() -> None:
                 skipped_rows += 1
                 continue
 
-            chunks = chunk_words(
+            chunks = CHUNKERS[args.boundary](
                 text=base_text,
                 max_words=args.max_words,
                 overlap_words=args.overlap_words,
@@ -209,22 +280,7 @@ def main() -> None:
                     )
                     md_file.write(f"# Discursos Senado - Knowledge Batch {batch_index}\n\n")
 
-                md_file.write(f"## Chunk {chunk_id}\n")
-                md_file.write(f"- Data: {escape_md(data)}\n")
-                md_file.write(f"- Autor: {escape_md(nome_autor)}\n")
-                md_file.write(f"- Partido: {escape_md(partido)}\n")
-                md_file.write(f"- UF: {escape_md(uf)}\n")
-                md_file.write(f"- Casa: {escape_md(casa)}\n")
-                md_file.write(f"- Tipo: {escape_md(tipo)}\n")
-                md_file.write(f"- Origem do texto: {escape_md(text_source)}\n")
-                if texto_url:
-                    md_file.write(f"- Fonte: {escape_md(texto_url)}\n")
-                if resumo:
-                    md_file.write(f"- Resumo: {escape_md(resumo)}\n")
-                if indexacao:
-                    md_file.write(f"- Indexacao: {escape_md(indexacao)}\n")
-                md_file.write("\n")
-                md_file.write(chunk_text)
+                md_file.write(format_chunk_markdown(record))
                 md_file.write("\n\n---\n\n")
 
                 total_chunks += 1
@@ -246,6 +302,7 @@ def main() -> None:
         "text_source_counts": text_source_counts,
         "max_words": args.max_words,
         "overlap_words": args.overlap_words,
+        "boundary": args.boundary,
         "chunks_per_file": args.chunks_per_file,
         "markdown_batch_files": math.ceil(total_chunks / args.chunks_per_file)
         if total_chunks
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Compara grupos de rodadas de avaliacao com testes pareados por pergunta.
+
+Cada grupo reune uma ou mais rodadas da mesma configuracao (ex.: um modelo ou
+um tamanho de chunk). Para cada par de grupos e cada metrica da rubrica, o
+script calcula a diferenca media por pergunta, o IC por bootstrap pareado e o
+p-valor de um teste de permutacao (troca de sinais), com correcao para
+comparacoes multiplas.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime, timezone
+from itertools import combinations
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scripts.summarize_eval_results import build_score_matrix, summarize_run
+except ModuleNotFoundError:
+    from summarize_eval_results import build_score_matrix, summarize_run
+
+
+METRICS = (
+    "total_score",
+    "adherence_score",
+    "factual_score",
+    "source_focus_score",
+    "synthesis_score",
+    "hallucination_score",
+)
+
+
+def parse_group(raw: str) -> tuple[str, list[str]]:
+    if "=" not in raw:
+        raise argparse.ArgumentTypeError(f"Grupo invalido: {raw!r}. Use nome=rodada1.csv,rodada2.csv")
+    name, files = raw.split("=", 1)
+    paths = [item.strip() for item in files.split(",") if item.strip()]
+    if not name.strip() or not paths:
+        raise argparse.ArgumentTypeError(f"Grupo invalido: {raw!r}. Use nome=rodada1.csv,rodada2.csv")
+    return name.strip(), paths
+
+
+def group_question_means(run_summaries: list[dict[str, Any]], metric: str) -> pd.Series:
+    """Media por pergunta entre as rodadas do grupo, alinhada por `id`."""
+    matrix = build_score_matrix(run_summaries, metric)
+    if matrix.empty:
+        return pd.Series(dtype=float)
+    return matrix.mean(axis=1, skipna=True).dropna()
+
+
+def paired_bootstrap(
+    differences: np.ndarray,
+    *,
+    resamples: int,
+    rng: np.random.Generator,
+    confidence: float = 0.95,
+) -> dict[str, float]:
+    n = differences.shape[0]
+    indices = rng.integers(0, n, size=(resamples, n))
+    means = differences[indices].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    # p-valor bootstrap bilateral: fracao das medias reamostradas do lado oposto de zero.
+    p_value = min(1.0, 2 * min(np.mean(means <= 0), np.mean(means >= 0)))
+    return {
+        "ci_low": float(np.quantile(means, alpha)),
+        "ci_high": float(np.quantile(means, 1 - alpha)),
+        "p_value": float(p_value),
+    }
+
+
+def paired_permutation_test(
+    differences: np.ndarray,
+    *,
+    permutations: int,
+    rng: np.random.Generator,
+) -> float:
+    """Teste de permutacao pareado: sob H0 o sinal de cada diferenca e intercambiavel."""
+    observed = abs(differences.mean())
+    signs = rng.choice(np.array([-1.0, 1.0]), size=(permutations, differences.shape[0]))
+    permuted = np.abs((signs * differences).mean(axis=1))
+    return float((np.sum(permuted >= observed - 1e-12) + 1) / (permutations + 1))
+
+
+def adjust_p_values(p_values: list[float], method: str) -> list[float]:
+    """Correcao de Holm (FWER) ou Benjamini-Hochberg (FDR)."""
+    values = np.asarray(p_values, dtype=float)
+    m = values.shape[0]
+    if m == 0:
+        return []
+    order = np.argsort(values)
+    ranked = values[order]
+    if method == "holm":
+        adjusted_ranked = np.maximum.accumulate((m - np.arange(m)) * ranked)
+    elif method == "bh":
+        adjusted_ranked = np.minimum.accumulate((m / np.arange(m, 0, -1) * ranked[::-1]))[::-1]
+    elif method == "none":
+        adjusted_ranked = ranked
+    else:
+        raise ValueError(f"Metodo de correcao desconhecido: {method}")
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(adjusted_ranked, 1.0)
+    return adjusted.tolist()
+
+
+def compare_groups(
+    groups: dict[str, list[dict[str, Any]]],
+    *,
+    metrics: tuple[str, ...] = METRICS,
+    resamples: int = 10000,
+    correction: str = "holm",
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    comparisons: list[dict[str, Any]] = []
+    for (name_a, runs_a), (name_b, runs_b) in combinations(groups.items(), 2):
+        for metric in metrics:
+            means_a = group_question_means(runs_a, metric)
+            means_b = group_question_means(runs_b, metric)
+            common = means_a.index.intersection(means_b.index)
+            result: dict[str, Any] = {
+                "group_a": name_a,
+                "group_b": name_b,
+                "metric": metric,
+                "questions": int(len(common)),
+                "mean_a": None,
+                "mean_b": None,
+                "mean_diff": None,
+                "ci_low": None,
+                "ci_high": None,
+                "bootstrap_p": None,
+                "permutation_p": None,
+            }
+            if len(common) >= 2:
+                differences = (means_b.loc[common] - means_a.loc[common]).to_numpy(dtype=float)
+                bootstrap = paired_bootstrap(differences, resamples=resamples, rng=rng)
+                result.update(
+                    {
+                        "mean_a": float(means_a.loc[common].mean()),
+                        "mean_b": float(means_b.loc[common].mean()),
+                        "mean_diff": float(differences.mean()),
+                        "ci_low": bootstrap["ci_low"],
+                        "ci_high": bootstrap["ci_high"],
+                        "bootstrap_p": bootstrap["p_value"],
+                        "permutation_p": paired_permutation_test(differences, permutations=resamples, rng=rng),
+                    }
+                )
+            comparisons.append(result)
+
+    tested = [index for index, item in enumerate(comparisons) if item["permutation_p"] is not None]
+    adjusted = adjust_p_values([comparisons[index]["permutation_p"] for index in tested], correction)
+    for item in comparisons:
+        item["adjusted_p"] = None
+    for index, value in zip(tested, adjusted):
+        comparisons[index]["adjusted_p"] = value
+    return comparisons
+
+
+def format_number(value: Any, digits: int = 3) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def build_markdown(
+    groups: dict[str, list[dict[str, Any]]],
+    comparisons: list[dict[str, Any]],
+    *,
+    resamples: int,
+    correction: str,
+    alpha: float,
+) -> str:
+    generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ")
+    lines = [
+        "# Comparacao entre configuracoes",
+        "",
+        f"Gerado em: `{generated_at}`",
+        "",
+        "## Grupos",
+        "",
+    ]
+    for name, runs in groups.items():
+        lines.append(f"- `{name}`: " + ", ".join(f"`{summary['stem']}`" for summary in runs))
+    lines.extend(
+        [
+            "",
+            "## Resultados",
+            "",
+            f"Diferenca = media de B menos media de A por pergunta, nas perguntas presentes nos dois grupos. "
+            f"IC de 95% por bootstrap pareado e p-valor de permutacao por troca de sinais, ambos com {resamples} "
+            f"reamostragens; `p ajustado` usa a correcao `{correction}` sobre todas as linhas. "
+            f"Diferencas com `p ajustado < {alpha}` estao marcadas com `*`.",
+            "",
+            "| A | B | Metrica | Perguntas | Media A | Media B | Diferenca | IC 95% | p bootstrap | p permutacao | p ajustado |",
+            "|---|---|---|---|---|---|---|---|---|---|---|",
+        ]
+    )
+    for item in comparisons:
+        marker = " *" if item["adjusted_p"] is not None and item["adjusted_p"] < alpha else ""
+        lines.append(
+            f"| `{item['group_a']}` | `{item['group_b']}` | `{item['metric']}` | `{item['questions']}` | "
+            f"{format_number(item['mean_a'])} | {format_number(item['mean_b'])} | "
+            f"{format_number(item['mean_diff'])}{marker} | "
+            f"{format_number(item['ci_low'])} a {format_number(item['ci_high'])} | "
+            f"{format_number(item['bootstrap_p'], 4)} | {format_number(item['permutation_p'], 4)} | "
+            f"{format_number(item['adjusted_p'], 4)} |"
+        )
+    lines.append("")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara grupos de rodadas RAG com testes pareados por pergunta.")
+    parser.add_argument(
+        "--group",
+        action="append",
+        type=parse_group,
+        required=True,
+        help="Grupo no formato nome=rodada1.csv,rodada2.csv. Informe ao menos dois.",
+    )
+    parser.add_argument("--resamples", type=int, default=10000, help="Reamostragens de bootstrap e permutacao.")
+    parser.add_argument(
+        "--correction",
+        choices=("holm", "bh", "none"),
+        default="holm",
+        help="Correcao para comparacoes multiplas: Holm (FWER) ou Benjamini-Hochberg (FDR).",
+    )
+    parser.add_argument("--alpha", type=float, default=0.05, help="Nivel de significancia para marcar diferencas.")
+    parser.add_argument("--seed", type=int, default=0, help="Semente das reamostragens.")
+    parser.add_argument(
+        "--output",
+        default="",
+        help="Arquivo Markdown de saida. Se vazio, usa eval/results/comparison_<timestamp>.md",
+    )
+    args = parser.parse_args()
+    if len(args.group) < 2:
+        raise SystemExit("Informe ao menos dois grupos com --group.")
+
+    project_root = Path(__file__).resolve().parents[1]
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for name, files in args.group:
+        runs = []
+        for item in files:
+            csv_path = (project_root / item).resolve() if not Path(item).is_absolute() else Path(item)
+            runs.append(summarize_run(csv_path, None))
+        groups[name] = runs
+
+    comparisons = compare_groups(groups, resamples=args.resamples, correction=args.correction, seed=args.seed)
+    markdown = build_markdown(
+        groups,
+        comparisons,
+        resamples=args.resamples,
+        correction=args.correction,
+        alpha=args.alpha,
+    )
+
+    if args.output:
+        output_path = (project_root / args.output).resolve() if not Path(args.output).is_absolute() else Path(args.output)
+    else:
+        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_path = project_root / "eval" / "results" / f"comparison_{ts}.md"
+    output_path.write_text(markdown, encoding="utf-8")
+    print(output_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""Servidor local que imita os endpoints do Open WebUI usados pelos scripts cliente.
+
+Serve para medir vazao, concorrencia e retries de
+`import_batches_to_openwebui.py` e `run_rag_eval.py` sem depender de uma
+instancia real nem de provedores de embeddings/LLM. Implementa:
+
+- POST /api/v1/files/
+- GET  /api/v1/files/{id}/process/status
+- POST /api/v1/knowledge/{id}/file/add
+- GET  /api/v1/knowledge/
+- POST /api/chat/completions (JSON ou SSE com "stream": true)
+
+Latencia, taxa de 429 e taxa de falhas sao configuraveis por linha de comando.
+
+Exemplo:
+  python scripts/fake_openwebui_server.py --port 8089 \
+    --latency lognormal:-3,0.5 --rate-limit-rate 0.05 --processing-seconds 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+LOGGER = logging.getLogger("fake_openwebui_server")
+DEFAULT_KNOWLEDGE_NAME = "Discursos Senado"
+# Mesmo texto que o Open WebUI repassa quando o endpoint de embeddings da OpenAI responde 429;
+# e o que `is_openai_rate_limit_error` procura para decidir o retry.
+EMBEDDINGS_RATE_LIMIT_DETAIL = (
+    "429, message='Too Many Requests', url='https://api.openai.com/v1/embeddings'"
+)
+JUDGE_SCORES = {
+    "adherence_score": 2,
+    "factual_score": 2,
+    "source_focus_score": 2,
+    "synthesis_score": 1,
+    "hallucination_score": 2,
+    "review_notes": "Resposta sintetica do servidor local.",
+}
+
+
+def parse_latency(spec: str) -> tuple[str, tuple[float, ...]]:
+    """Le `fixed:S`, `uniform:MIN,MAX` ou `lognormal:MU,SIGMA` (segundos)."""
+    kind, _, raw_params = spec.partition(":")
+    kind = kind.strip().lower()
+    try:
+        params = tuple(float(item) for item in raw_params.split(",") if item.strip())
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Latencia invalida: {spec!r}") from exc
+    expected = {"fixed": 1, "uniform": 2, "lognormal": 2}
+    if kind not in expected or len(params) != expected[kind]:
+        raise argparse.ArgumentTypeError(
+            f"Latencia invalida: {spec!r}. Use fixed:S, uniform:MIN,MAX ou lognormal:MU,SIGMA"
+        )
+    return kind, params
+
+
+def sample_latency(latency: tuple[str, tuple[float, ...]], rng: random.Random) -> float:
+    kind, params = latency
+    if kind == "fixed":
+        return max(0.0, params[0])
+    if kind == "uniform":
+        return max(0.0, rng.uniform(params[0], params[1]))
+    return rng.lognormvariate(params[0], params[1])
+
+
+class FakeOpenWebUIState:
+    """Estado compartilhado entre as threads do servidor: arquivos, knowledge e contadores."""
+
+    def __init__(
+        self,
+        *,
+        latency: tuple[str, tuple[float, ...]] = ("fixed", (0.0,)),
+        chat_latency: tuple[str, tuple[float, ...]] | None = None,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        processing_seconds: float = 0.0,
+        processing_failure_rate: float = 0.0,
+        stream_chunk_delay: float = 0.0,
+        knowledge_name: str = DEFAULT_KNOWLEDGE_NAME,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.chat_latency = chat_latency or latency
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.processing_seconds = processing_seconds
+        self.processing_failure_rate = processing_failure_rate
+        self.stream_chunk_delay = stream_chunk_delay
+        self.knowledge_id = str(uuid.uuid4())
+        self.knowledge_name = knowledge_name
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.files: dict[str, dict[str, Any]] = {}
+        self.knowledge_files: dict[str, list[str]] = {self.knowledge_id: []}
+        self.counters: dict[str, int] = {}
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def delay(self, latency: tuple[str, tuple[float, ...]]) -> float:
+        with self._lock:
+            return sample_latency(latency, self._rng)
+
+    def create_file(self, filename: str, size: int) -> dict[str, Any]:
+        file_id = str(uuid.uuid4())
+        entry = {
+            "id": file_id,
+            "filename": filename,
+            "size": size,
+            "created_monotonic": time.monotonic(),
+            "failed": self.draw() < self.processing_failure_rate,
+        }
+        with self._lock:
+            self.files[file_id] = entry
+        return entry
+
+    def file_status(self, file_id: str) -> str | None:
+        with self._lock:
+            entry = self.files.get(file_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["created_monotonic"] < self.processing_seconds:
+            return "pending"
+        return "failed" if entry["failed"] else "completed"
+
+    def add_to_knowledge(self, knowledge_id: str, file_id: str) -> bool:
+        with self._lock:
+            if knowledge_id not in self.knowledge_files or file_id not in self.files:
+                return False
+            self.knowledge_files[knowledge_id].append(file_id)
+            return True
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            added = self.knowledge_files[self.knowledge_id]
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "uploaded_files": len(self.files),
+                "knowledge_files": len(added),
+                "knowledge_duplicate_adds": len(added) - len(set(added)),
+            }
+
+
+def build_chat_completion(payload: dict[str, Any], state: FakeOpenWebUIState) -> dict[str, Any]:
+    messages = payload.get("messages") or []
+    question = str(messages[-1].get("content", "")) if messages and isinstance(messages[-1], dict) else ""
+    files = payload.get("files") or []
+    if not files:
+        # Sem knowledge anexada quem chama e o juiz, que espera um objeto JSON com as notas.
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "model": payload.get("model", ""),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": json.dumps(JUDGE_SCORES, ensure_ascii=False)},
+                    "finish_reason": "stop",
+                }
+            ],
+        }
+
+    documents = [
+        f"## Chunk 4511{index:02d}-001\n- Autor: Senador Ficticio {index}\n- Data: 2020-01-0{index}\n\n"
+        f"Trecho sintetico relacionado a: {question[:80]}"
+        for index in range(1, 4)
+    ]
+    content = (
+        "Segundo os discursos recuperados, o tema aparece em [451101-001] e [451102-001]. "
+        "Esta e uma resposta sintetica do servidor local de testes."
+    )
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "model": payload.get("model", ""),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "sources": [
+            {
+                "source": {"type": "collection", "id": files[0].get("id", ""), "name": state.knowledge_name},
+                "document": documents,
+                "metadata": [
+                    {"name": f"batch_{index:05d}.md", "file_id": f"file-{index}", "score": round(0.8 - index / 10, 3)}
+                    for index in range(1, 4)
+                ],
+            }
+        ],
+        "usage": {"prompt_tokens": len(question.split()), "completion_tokens": len(content.split())},
+    }
+
+
+def iter_stream_events(completion: dict[str, Any]) -> list[dict[str, Any]]:
+    """Quebra uma resposta completa nos eventos SSE que o Open WebUI envia."""
+    events: list[dict[str, Any]] = []
+    if completion.get("sources"):
+        events.append({"sources": completion["sources"]})
+    words = completion["choices"][0]["message"]["content"].split(" ")
+    for index, word in enumerate(words):
+        events.append(
+            {
+                "id": completion["id"],
+                "model": completion["model"],
+                "choices": [{"index": 0, "delta": {"content": word if index == 0 else f" {word}"}}],
+            }
+        )
+    final: dict[str, Any] = {"id": completion["id"], "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if completion.get("usage"):
+        final["usage"] = completion["usage"]
+    events.append(final)
+    return events
+
+
+class FakeOpenWebUIHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOpenWebUI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> FakeOpenWebUIState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+    def send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def inject_faults(
+        self,
+        endpoint: str,
+        rate_limit_detail: str = "Too Many Requests",
+        errors: bool = True,
+    ) -> bool:
+        """Aplica latencia e, conforme as taxas configuradas, responde 429 ou 500."""
+        latency = self.state.chat_latency if endpoint == "chat" else self.state.latency
+        time.sleep(self.state.delay(latency))
+        self.state.count(f"{endpoint}_requests")
+        if not errors:
+            return False
+        draw = self.state.draw()
+        if draw < self.state.rate_limit_rate:
+            self.state.count(f"{endpoint}_429")
+            self.send_json(429, {"detail": rate_limit_detail})
+            return True
+        if draw < self.state.rate_limit_rate + self.state.error_rate:
+            self.state.count(f"{endpoint}_500")
+            self.send_json(500, {"detail": "Falha injetada pelo servidor local."})
+            return True
+        return False
+
+    def do_GET(self) -> None:  # noqa: N802
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["api", "v1", "knowledge"]:
+            # Sem 429/500 aqui: a listagem so acontece uma vez, na partida dos clientes.
+            self.inject_faults("knowledge_list", errors=False)
+            self.send_json(200, {"items": [{"id": self.state.knowledge_id, "name": self.state.knowledge_name}]})
+            return
+        if len(parts) == 6 and parts[:3] == ["api", "v1", "files"] and parts[4:] == ["process", "status"]:
+            if self.inject_faults("status"):
+                return
+            status = self.state.file_status(parts[3])
+            if status is None:
+                self.send_json(404, {"detail": "Arquivo nao encontrado."})
+                return
+            self.state.count(f"status_{status}")
+            self.send_json(200, {"status": status})
+            return
+        self.send_json(404, {"detail": "Not Found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        body = self.read_body()
+        if parts == ["api", "v1", "files"]:
+            if self.inject_faults("upload"):
+                return
+            entry = self.state.create_file(self.extract_filename(body), len(body))
+            self.send_json(200, {"id": entry["id"], "filename": entry["filename"], "meta": {"size": entry["size"]}})
+            return
+        if len(parts) == 6 and parts[:3] == ["api", "v1", "knowledge"] and parts[4:] == ["file", "add"]:
+            if self.inject_faults("add", rate_limit_detail=EMBEDDINGS_RATE_LIMIT_DETAIL):
+                return
+            file_id = self.parse_json(body).get("file_id", "")
+            if not self.state.add_to_knowledge(parts[3], file_id):
+                self.send_json(400, {"detail": "Knowledge ou arquivo inexistente."})
+                return
+            self.send_json(200, {"id": parts[3], "files": [{"id": file_id}]})
+            return
+        if parts == ["api", "chat", "completions"]:
+            if self.inject_faults("chat"):
+                return
+            payload = self.parse_json(body)
+            completion = build_chat_completion(payload, self.state)
+            if payload.get("stream"):
+                self.send_stream(completion)
+            else:
+                self.send_json(200, completion)
+            return
+        self.send_json(404, {"detail": "Not Found"})
+
+    def send_stream(self, completion: dict[str, Any]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for event in iter_stream_events(completion):
+            self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if self.state.stream_chunk_delay:
+                time.sleep(self.state.stream_chunk_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def extract_filename(self, body: bytes) -> str:
+        # Basta o filename do multipart; o conteudo nao e processado.
+        marker = b'filename="'
+        start = body.find(marker)
+        if start < 0:
+            return "upload.bin"
+        end = body.find(b'"', start + len(marker))
+        return body[start + len(marker) : end].decode("utf-8", errors="replace")
+
+    @staticmethod
+    def parse_json(body: bytes) -> dict[str, Any]:
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+
+def start_server(
+    state: FakeOpenWebUIState,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> tuple[ThreadingHTTPServer, str]:
+    """Sobe o servidor em uma thread daemon e devolve (servidor, base_url). Use `port=0` em testes."""
+    server = ThreadingHTTPServer((host, port), FakeOpenWebUIHandler)
+    server.daemon_threads = True
+    server.state = state  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, name="fake-openwebui", daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}"
+
+
+def add_state_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--latency",
+        type=parse_latency,
+        default=("fixed", (0.0,)),
+        help="Latencia dos endpoints de arquivos/knowledge: fixed:S, uniform:MIN,MAX ou lognormal:MU,SIGMA.",
+    )
+    parser.add_argument(
+        "--chat-latency",
+        type=parse_latency,
+        default=None,
+        help="Latencia de /api/chat/completions. Default: a mesma de --latency.",
+    )
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fracao de requisicoes respondidas com 429.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracao de requisicoes respondidas com 500.")
+    parser.add_argument(
+        "--processing-seconds",
+        type=float,
+        default=0.0,
+        help="Tempo em que o arquivo fica com status pending antes de concluir.",
+    )
+    parser.add_argument(
+        "--processing-failure-rate",
+        type=float,
+        default=0.0,
+        help="Fracao de arquivos cujo processamento termina com status failed.",
+    )
+    parser.add_argument(
+        "--stream-chunk-delay",
+        type=float,
+        default=0.0,
+        help="Pausa em segundos entre eventos SSE no modo stream.",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Semente das injecoes de falha e latencia.")
+
+
+def state_from_args(args: argparse.Namespace) -> FakeOpenWebUIState:
+    return FakeOpenWebUIState(
+        latency=args.latency,
+        chat_latency=args.chat_latency,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        processing_seconds=args.processing_seconds,
+        processing_failure_rate=args.processing_failure_rate,
+        stream_chunk_delay=args.stream_chunk_delay,
+        seed=args.seed,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API do Open WebUI para testes de carga.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereco de escuta.")
+    parser.add_argument("--port", type=int, default=8089, help="Porta de escuta.")
+    add_state_arguments(parser)
+    parser.add_argument("--verbose", action="store_true", help="Registra cada requisicao.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(levelname)s %(message)s")
+
+    state = state_from_args(args)
+    server, base_url = start_server(state, host=args.host, port=args.port)
+    LOGGER.info("Servidor local em %s", base_url)
+    LOGGER.info("Knowledge: %s (%s)", state.knowledge_name, state.knowledge_id)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        LOGGER.info("Contadores: %s", json.dumps(state.snapshot(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
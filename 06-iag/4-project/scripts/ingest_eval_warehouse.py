@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Ingere rodadas de avaliacao em um armazem colunar (parquet, um arquivo por rodada).
+
+Cada rodada vira `eval/warehouse/rag_eval_runs/<stem>.parquet`, com uma linha
+por pergunta: impressoes digitais da configuracao, notas, tempos e sinais de
+recuperacao. Reingerir a mesma rodada substitui o arquivo dela. Todas as
+rodadas compartilham o mesmo schema e podem ser lidas de uma vez com
+`load_warehouse`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    from scripts.run_rag_eval import RESUME_FINGERPRINT_KEYS, get_nested, load_jsonl_rows, sha256_text
+except ModuleNotFoundError:
+    from run_rag_eval import RESUME_FINGERPRINT_KEYS, get_nested, load_jsonl_rows, sha256_text
+
+
+DEFAULT_WAREHOUSE_DIR = Path("eval") / "warehouse" / "rag_eval_runs"
+SCORE_FIELDS = (
+    "adherence_score",
+    "factual_score",
+    "source_focus_score",
+    "synthesis_score",
+    "hallucination_score",
+    "total_score",
+)
+CONFIG_FIELDS = {
+    "executed_at_utc": "executed_at_utc",
+    "knowledge_name": "knowledge_name",
+    "knowledge_id": "knowledge_id",
+    "questions_sha256": "questions_file.sha256",
+    "generator_model": "generator.model",
+    "generator_prompt_sha256": "generator.prompt_sha256",
+    "generator_prompt_role": "generator.prompt_application_role",
+    "generator_temperature": "generator.temperature",
+    "generator_top_p": "generator.top_p",
+    "generator_max_tokens": "generator.max_tokens",
+    "generator_seed": "generator.seed",
+    "judge_model": "judge.model",
+    "judge_system_prompt_sha256": "judge.system_prompt_sha256",
+    "judge_user_prompt_sha256": "judge.user_prompt_sha256",
+    "rubric_sha256": "rubric.sha256",
+    "chunks_sha256": "knowledge_artifacts.discursos_chunks.sha256",
+}
+WAREHOUSE_SCHEMA = pa.schema(
+    [
+        ("run", pa.string()),
+        ("config_fingerprint", pa.string()),
+        ("executed_at_utc", pa.string()),
+        ("knowledge_name", pa.string()),
+        ("knowledge_id", pa.string()),
+        ("questions_sha256", pa.string()),
+        ("generator_model", pa.string()),
+        ("generator_prompt_sha256", pa.string()),
+        ("generator_prompt_role", pa.string()),
+        ("generator_temperature", pa.float64()),
+        ("generator_top_p", pa.float64()),
+        ("generator_max_tokens", pa.int64()),
+        ("generator_seed", pa.int64()),
+        ("judge_model", pa.string()),
+        ("judge_system_prompt_sha256", pa.string()),
+        ("judge_user_prompt_sha256", pa.string()),
+        ("rubric_sha256", pa.string()),
+        ("chunks_sha256", pa.string()),
+        ("id", pa.string()),
+        ("category", pa.string()),
+        ("status", pa.string()),
+        ("error_stage", pa.string()),
+        ("answer_chars", pa.int64()),
+        *[(field, pa.int64()) for field in SCORE_FIELDS],
+        ("review_notes", pa.string()),
+        ("duration_seconds", pa.float64()),
+        ("generation_seconds", pa.float64()),
+        ("judge_seconds", pa.float64()),
+        ("generation_rate_limit_wait_seconds", pa.float64()),
+        ("generation_retry_wait_seconds", pa.float64()),
+        ("judge_rate_limit_wait_seconds", pa.float64()),
+        ("judge_retry_wait_seconds", pa.float64()),
+        ("signal_extraction_seconds", pa.float64()),
+        ("generation_ttft_seconds", pa.float64()),
+        ("generation_output_tokens", pa.int64()),
+        ("generation_output_tokens_source", pa.string()),
+        ("generation_tokens_per_second", pa.float64()),
+        ("generation_cache_hit", pa.bool_()),
+        ("judge_cache_hit", pa.bool_()),
+        ("retrieval_source_entries", pa.int64()),
+        ("retrieval_chunk_count", pa.int64()),
+        ("retrieval_unique_file_count", pa.int64()),
+        ("retrieval_unique_files", pa.list_(pa.string())),
+        ("retrieval_score_count", pa.int64()),
+        ("retrieval_avg_score", pa.float64()),
+        ("retrieval_links_present", pa.bool_()),
+        ("retrieval_author_mentions", pa.list_(pa.string())),
+        ("retrieval_author_count", pa.int64()),
+        ("retrieval_expected_authors", pa.list_(pa.string())),
+        ("retrieval_has_expected_author", pa.string()),
+        ("retrieval_author_mix_risk", pa.string()),
+    ]
+)
+
+
+def config_fingerprint(run_config: dict[str, Any]) -> str:
+    """Hash das chaves que tornam duas rodadas comparaveis (as mesmas usadas por --resume)."""
+    if not run_config:
+        return ""
+    payload = {key: get_nested(run_config, key) for key in RESUME_FINGERPRINT_KEYS}
+    return sha256_text(json.dumps(payload, sort_keys=True, ensure_ascii=False))
+
+
+def coerce_value(value: Any, field_type: pa.DataType) -> Any:
+    if value is None or value == "":
+        return None
+    try:
+        if pa.types.is_integer(field_type):
+            return int(value)
+        if pa.types.is_floating(field_type):
+            return float(value)
+        if pa.types.is_boolean(field_type):
+            return value if isinstance(value, bool) else str(value).strip().lower() in {"1", "true", "yes"}
+        if pa.types.is_list(field_type):
+            return [str(item) for item in value] if isinstance(value, list) else None
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def build_run_table(run_stem: str, rows: list[dict[str, Any]], run_config: dict[str, Any]) -> pa.Table:
+    run_fields: dict[str, Any] = {
+        "run": run_stem,
+        "config_fingerprint": config_fingerprint(run_config),
+    }
+    for column, dotted_key in CONFIG_FIELDS.items():
+        run_fields[column] = get_nested(run_config, dotted_key)
+
+    records = []
+    for row in rows:
+        record = {**row, **run_fields}
+        record["answer_chars"] = len(str(row.get("answer") or ""))
+        records.append(
+            {field.name: coerce_value(record.get(field.name), field.type) for field in WAREHOUSE_SCHEMA}
+        )
+    columns = {field.name: [record[field.name] for record in records] for field in WAREHOUSE_SCHEMA}
+    return pa.Table.from_pydict(columns, schema=WAREHOUSE_SCHEMA)
+
+
+def ingest_run(jsonl_path: Path, warehouse_dir: Path) -> Path:
+    config_path = jsonl_path.with_suffix(".run_config.json")
+    run_config = json.loads(config_path.read_text(encoding="utf-8")) if config_path.exists() else {}
+    rows = load_jsonl_rows(jsonl_path, allow_truncated_tail=True)
+    table = build_run_table(jsonl_path.stem, rows, run_config)
+    warehouse_dir.mkdir(parents=True, exist_ok=True)
+    output_path = warehouse_dir / f"{jsonl_path.stem}.parquet"
+    tmp_path = output_path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp_path)
+    tmp_path.replace(output_path)
+    return output_path
+
+
+def load_warehouse(warehouse_dir: Path, runs: list[str] | None = None) -> pd.DataFrame:
+    paths = sorted(warehouse_dir.glob("*.parquet"))
+    if runs is not None:
+        wanted = set(runs)
+        paths = [path for path in paths if path.stem in wanted]
+    if not paths:
+        return WAREHOUSE_SCHEMA.empty_table().to_pandas()
+    return pa.concat_tables(pq.read_table(path, schema=WAREHOUSE_SCHEMA) for path in paths).to_pandas()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ingere rodadas de avaliacao RAG no armazem parquet.")
+    parser.add_argument(
+        "jsonl_files",
+        nargs="*",
+        help="Arquivos JSONL das rodadas. Default: eval/results/rag_eval_*.jsonl",
+    )
+    parser.add_argument(
+        "--warehouse-dir",
+        default=str(DEFAULT_WAREHOUSE_DIR),
+        help="Diretorio do armazem parquet.",
+    )
+    args = parser.parse_args()
+
+    project_root = Path(__file__).resolve().parents[1]
+    if args.jsonl_files:
+        paths = [
+            (project_root / item).resolve() if not Path(item).is_absolute() else Path(item)
+            for item in args.jsonl_files
+        ]
+    else:
+        paths = sorted((project_root / "eval" / "results").glob("rag_eval_*.jsonl"))
+    if not paths:
+        raise SystemExit("Nenhum JSONL de rodada encontrado.")
+    warehouse_dir = (
+        (project_root / args.warehouse_dir).resolve()
+        if not Path(args.warehouse_dir).is_absolute()
+        else Path(args.warehouse_dir)
+    )
+
+    for path in paths:
+        print(ingest_run(path, warehouse_dir))
+    frame = load_warehouse(warehouse_dir)
+    print(f"{len(frame)} linhas de {frame['run'].nunique()} rodadas em {warehouse_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
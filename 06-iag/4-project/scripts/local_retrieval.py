@@ -0,0 +1,851 @@
+#!/usr/bin/env python3
+"""Recuperacao local (BM25 + vetorial) sobre `discursos_chunks.jsonl`, sem Open WebUI nem Chroma.
+
+O indice fica em um diretorio de arquivos `.npy` carregados com memory map:
+
+- BM25: indice invertido em formato CSR (offsets por termo, documentos e
+  frequencias), comprimento normalizado por documento e IDF por termo.
+- Vetorial: matriz `float32` normalizada, consultada por produto interno em
+  forca bruta. Os embeddings vem de hashing de termos ponderado por IDF
+  (offline, sem servico externo) ou do Ollama, com o mesmo modelo configurado
+  em `RAG_EMBEDDING_MODEL` para o Open WebUI.
+- Metadados: bitmap de chunks por autor e data de cada chunk. Com o filtro de
+  metadados ligado, autores citados na pergunta e indicacoes de mes/ano
+  restringem os candidatos antes do ranking.
+- Rerank opcional: um cross-encoder ONNX quantizado (int8) reordena, em CPU e
+  em lotes, os N primeiros candidatos. Os scores ficam em cache SQLite por
+  (modelo, pergunta, texto do chunk).
+
+O texto dos chunks nao e copiado: o indice guarda o offset de cada linha do
+JSONL e os documentos devolvidos sao renderizados no mesmo formato dos
+batches markdown, de modo que `run_retrieval_eval.py` e
+`extract_retrieval_signals` os leem sem adaptacao.
+
+Exemplo:
+  python scripts/local_retrieval.py --embedder hashing
+  python scripts/local_retrieval.py --query "Paulo Paim previdencia" --mode hybrid
+  python scripts/local_retrieval.py --query "Paulo Paim previdencia" --rerank-model cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+import requests
+
+try:
+    from scripts.build_openwebui_knowledge_from_hf import format_chunk_markdown
+    from scripts.run_rag_eval import (
+        configure_logging,
+        extract_question_author_candidates,
+        load_dotenv,
+        normalize_for_match,
+    )
+except ModuleNotFoundError:
+    from build_openwebui_knowledge_from_hf import format_chunk_markdown
+    from run_rag_eval import (
+        configure_logging,
+        extract_question_author_candidates,
+        load_dotenv,
+        normalize_for_match,
+    )
+
+
+LOGGER = logging.getLogger("local_retrieval")
+INDEX_VERSION = 2
+DEFAULT_INDEX_DIR = Path("knowledge_openwebui") / "local_index"
+RETRIEVAL_MODES = ("bm25", "vector", "hybrid")
+TOKEN_RE = re.compile(r"\w+")
+# Palavras funcionais mais frequentes do portugues, ja sem acento (mesma normalizacao de `normalize_for_match`).
+STOPWORDS = frozenset(
+    """
+    a ao aos as com como da das de do dos e ela elas ele eles em entre essa esse esta este eu foi for ha
+    isso isto ja la lhe mais mas me mesmo na nao nas nem no nos o os ou para pela pelas pelo pelos por
+    qual quando que quem se sem ser seu seus si sua suas sao so tambem te tem um uma umas uns voce
+    """.split()
+)
+RRF_K = 60
+MONTHS = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "marco": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+MONTH_RE = re.compile(r"\b(" + "|".join(MONTHS) + r")\b")
+CHUNK_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+DEFAULT_RERANK_ONNX_FILE = "onnx/model_quint8_avx2.onnx"
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall(normalize_for_match(text)) if len(token) > 1 and token not in STOPWORDS]
+
+
+def iter_chunk_lines(path: Path) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Percorre o JSONL devolvendo (offset em bytes da linha, registro)."""
+    offset = 0
+    with path.open("rb") as jsonl_file:
+        for line in jsonl_file:
+            if line.strip():
+                yield offset, json.loads(line)
+            offset += len(line)
+
+
+def date_to_int(value: str) -> int:
+    """`AAAA-MM-DD...` vira o inteiro AAAAMMDD; datas ausentes ou invalidas viram 0."""
+    match = CHUNK_DATE_RE.match(value or "")
+    return int("".join(match.groups())) if match else 0
+
+
+def parse_date_hint(question: str) -> tuple[int, int] | None:
+    """Intervalo AAAAMMDD sugerido pela pergunta.
+
+    Meses so restringem o intervalo quando a pergunta cita um unico ano
+    ("fevereiro e marco de 2019"); com varios anos vale do primeiro ao ultimo
+    ano inteiro. Na duvida o intervalo fica mais largo, nunca mais estreito.
+    """
+    normalized = normalize_for_match(question)
+    years = sorted({int(year) for year in YEAR_RE.findall(normalized)})
+    if not years:
+        return None
+    months = sorted({MONTHS[month] for month in MONTH_RE.findall(normalized)})
+    if len(years) == 1 and months:
+        return years[0] * 10000 + months[0] * 100 + 1, years[0] * 10000 + months[-1] * 100 + 31
+    return years[0] * 10000 + 101, years[-1] * 10000 + 1231
+
+
+def stable_term_hash(term: str) -> int:
+    # `hash()` muda entre processos; crc32 mantem os buckets iguais no build e na consulta.
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def hashed_projection(terms: list[str], dim: int) -> tuple[np.ndarray, np.ndarray]:
+    hashes = np.fromiter((stable_term_hash(term) for term in terms), dtype=np.uint64, count=len(terms))
+    buckets = (hashes % dim).astype(np.int64)
+    signs = np.where((hashes >> np.uint64(31)) & np.uint64(1), -1.0, 1.0).astype(np.float32)
+    return buckets, signs
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class OllamaEmbedder:
+    """Embeddings via `/api/embed` do Ollama, em lotes."""
+
+    def __init__(self, base_url: str, model: str, api_key: str = "", batch_size: int = 32) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.batch_size = max(1, batch_size)
+
+    def config(self) -> dict[str, Any]:
+        return {"name": "ollama", "model": self.model, "base_url": self.base_url}
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            response = requests.post(
+                f"{self.base_url}/api/embed",
+                headers=headers,
+                json={"model": self.model, "input": batch},
+                timeout=600,
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Falha ao gerar embeddings no Ollama: {response.status_code} {response.text[:300]}")
+            embeddings = response.json().get("embeddings") or []
+            if len(embeddings) != len(batch):
+                raise RuntimeError(f"Ollama devolveu {len(embeddings)} embeddings para {len(batch)} textos")
+            vectors.extend(embeddings)
+        return normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+
+def ollama_embedder_from_env(model: str = "") -> OllamaEmbedder:
+    return OllamaEmbedder(
+        base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+        model=model or os.getenv("RAG_EMBEDDING_MODEL", "qwen3-embedding:0.6b"),
+        api_key=os.getenv("OLLAMA_API_KEY", ""),
+        batch_size=int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", "32") or 32),
+    )
+
+
+class OnnxCrossEncoder:
+    """Cross-encoder exportado para ONNX, executado em CPU com onnxruntime.
+
+    ``model`` e um diretorio local ou um repositorio do Hugging Face com
+    ``tokenizer.json`` e o arquivo ``onnx_file`` (por padrao a exportacao
+    quantizada em int8 publicada pelo sentence-transformers).
+    """
+
+    def __init__(
+        self,
+        model: str,
+        onnx_file: str = DEFAULT_RERANK_ONNX_FILE,
+        max_length: int = 512,
+        threads: int = 0,
+    ) -> None:
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ModuleNotFoundError as exc:
+            raise RuntimeError("Rerank requer onnxruntime e tokenizers; rode pip install -r requirements.txt.") from exc
+        model_path = Path(model)
+        if model_path.is_dir():
+            onnx_path = model_path / onnx_file
+            tokenizer_path = model_path / "tokenizer.json"
+        else:
+            from huggingface_hub import hf_hub_download
+
+            onnx_path = Path(hf_hub_download(model, onnx_file))
+            tokenizer_path = Path(hf_hub_download(model, "tokenizer.json"))
+        self.name = f"{model}:{onnx_file}"
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_token = next(
+            (token for token in ("<pad>", "[PAD]") if self.tokenizer.token_to_id(token) is not None),
+            "[PAD]",
+        )
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        options = onnxruntime.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def __call__(self, pairs: list[tuple[str, str]]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(pairs)
+        feeds = {
+            "input_ids": np.asarray([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.asarray([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        logits = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+        return np.asarray(logits, dtype=np.float32).reshape(len(pairs), -1)[:, -1]
+
+
+class RerankScoreCache:
+    """Cache em SQLite de scores do cross-encoder, no mesmo arquivo entre rodadas.
+
+    A chave inclui o texto do chunk, nao o ``chunk_id``: reconstruir os chunks
+    invalida os scores sem precisar apagar o cache.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL)")
+        self._connection.commit()
+
+    @staticmethod
+    def key(model: str, query: str, text: str) -> str:
+        return hashlib.sha256("\x00".join((model, query, text)).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, float]:
+        found: dict[str, float] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(
+                    self._connection.execute(
+                        f"SELECT key, score FROM scores WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                )
+        return found
+
+    def put_many(self, scores: dict[str, float]) -> None:
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)", scores.items())
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class Reranker:
+    """Reordena candidatos por um score de pares (pergunta, texto) calculado em lotes.
+
+    ``scorer`` recebe uma lista de pares e devolve um array de scores; pares ja
+    presentes em ``cache`` nao sao recalculados. Os pares pendentes sao
+    ordenados por tamanho antes de formar os lotes, o que reduz o padding.
+    """
+
+    def __init__(
+        self,
+        scorer: Callable[[list[tuple[str, str]]], np.ndarray],
+        name: str,
+        batch_size: int = 16,
+        candidates: int = 30,
+        cache: RerankScoreCache | None = None,
+    ) -> None:
+        self.scorer = scorer
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.candidates = max(1, candidates)
+        self.cache = cache
+
+    @property
+    def config(self) -> dict[str, Any]:
+        return {
+            "model": self.name,
+            "candidates": self.candidates,
+            "batch_size": self.batch_size,
+            "cache_file": str(self.cache.path) if self.cache is not None else None,
+        }
+
+    def score(self, query: str, texts: list[str]) -> tuple[np.ndarray, int]:
+        """Devolve os scores de cada texto e quantos vieram do cache."""
+        keys = [RerankScoreCache.key(self.name, query, text) for text in texts]
+        cached = self.cache.get_many(keys) if self.cache is not None else {}
+        scores = np.zeros(len(texts), dtype=np.float32)
+        pending = []
+        for position, key in enumerate(keys):
+            if key in cached:
+                scores[position] = cached[key]
+            else:
+                pending.append(position)
+        pending.sort(key=lambda position: len(texts[position]))
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            scores[batch] = self.scorer([(query, texts[position]) for position in batch])
+        if self.cache is not None and pending:
+            self.cache.put_many({keys[position]: float(scores[position]) for position in pending})
+        return scores, len(texts) - len(pending)
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.close()
+
+
+def add_rerank_arguments(parser: argparse.ArgumentParser, prefix: str = "") -> None:
+    parser.add_argument(
+        f"--{prefix}rerank-model",
+        default="",
+        help="Cross-encoder ONNX (diretorio ou repositorio HF) que reordena os candidatos. Vazio desliga o rerank.",
+    )
+    parser.add_argument(
+        f"--{prefix}rerank-onnx-file",
+        default=DEFAULT_RERANK_ONNX_FILE,
+        help="Arquivo ONNX dentro do modelo; as variantes qint8/quint8 rodam quantizadas em CPU.",
+    )
+    parser.add_argument(
+        f"--{prefix}rerank-candidates",
+        type=int,
+        default=30,
+        help="Quantos candidatos da primeira etapa passam pelo cross-encoder.",
+    )
+    parser.add_argument(f"--{prefix}rerank-batch-size", type=int, default=16, help="Pares por lote de inferencia.")
+    parser.add_argument(
+        f"--{prefix}rerank-cache-file",
+        default="eval/cache/rerank_scores.sqlite3",
+        help="Arquivo SQLite do cache de scores do rerank. Vazio desliga o cache.",
+    )
+
+
+def reranker_from_args(args: argparse.Namespace, project_root: Path, prefix: str = "") -> Reranker | None:
+    attribute_prefix = prefix.replace("-", "_")
+    options = {
+        name[len(attribute_prefix) :]: value
+        for name, value in vars(args).items()
+        if name.startswith(f"{attribute_prefix}rerank_")
+    }
+    if not options["rerank_model"]:
+        return None
+    cache = None
+    if options["rerank_cache_file"]:
+        cache_path = Path(options["rerank_cache_file"])
+        cache = RerankScoreCache(cache_path if cache_path.is_absolute() else project_root / cache_path)
+    scorer = OnnxCrossEncoder(options["rerank_model"], options["rerank_onnx_file"])
+    return Reranker(
+        scorer,
+        scorer.name,
+        batch_size=options["rerank_batch_size"],
+        candidates=options["rerank_candidates"],
+        cache=cache,
+    )
+
+
+def build_index(
+    chunks_path: Path,
+    index_dir: Path,
+    *,
+    embedder: str = "hashing",
+    dim: int = 512,
+    k1: float = 1.2,
+    b: float = 0.75,
+    ollama_embedder: OllamaEmbedder | None = None,
+) -> dict[str, Any]:
+    """Constroi os indices BM25 e vetorial e grava tudo em `index_dir`."""
+    started_monotonic = time.monotonic()
+    vocabulary: dict[str, int] = {}
+    offsets: list[int] = []
+    doc_lengths: list[int] = []
+    term_ids_parts: list[np.ndarray] = []
+    tf_parts: list[np.ndarray] = []
+    texts_for_embedding: list[str] = []
+    chunk_authors: list[str] = []
+    chunk_dates: list[int] = []
+
+    for offset, record in iter_chunk_lines(chunks_path):
+        counts = Counter(tokenize(record.get("text", "")))
+        metadata = record.get("metadata") or {}
+        chunk_authors.append(" ".join(str(metadata.get("nome_autor") or "").split()))
+        chunk_dates.append(date_to_int(str(metadata.get("data") or "")))
+        offsets.append(offset)
+        doc_lengths.append(sum(counts.values()))
+        term_ids_parts.append(
+            np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in counts), dtype=np.int32, count=len(counts))
+        )
+        tf_parts.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        if embedder == "ollama":
+            texts_for_embedding.append(format_chunk_markdown(record))
+
+    doc_count = len(offsets)
+    if doc_count == 0:
+        raise ValueError(f"Nenhum chunk encontrado em {chunks_path}")
+    terms = [""] * len(vocabulary)
+    for term, term_id in vocabulary.items():
+        terms[term_id] = term
+
+    posting_terms = np.concatenate(term_ids_parts)
+    posting_tf = np.concatenate(tf_parts)
+    posting_docs = np.repeat(np.arange(doc_count, dtype=np.int32), [part.shape[0] for part in term_ids_parts])
+    order = np.argsort(posting_terms, kind="stable")
+    posting_terms = posting_terms[order]
+    posting_docs = posting_docs[order]
+    posting_tf = posting_tf[order]
+    document_frequency = np.bincount(posting_terms, minlength=len(terms))
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum(document_frequency, out=term_offsets[1:])
+
+    lengths = np.asarray(doc_lengths, dtype=np.float32)
+    avgdl = float(lengths.mean()) or 1.0
+    idf = np.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+    # Parte do denominador do BM25 que so depende do documento: k1 * (1 - b + b * |d| / avgdl).
+    doc_norm = (k1 * (1 - b + b * lengths / avgdl)).astype(np.float32)
+
+    if embedder == "hashing":
+        buckets, signs = hashed_projection(terms, dim)
+        weights = (1 + np.log(posting_tf)) * idf[posting_terms] * signs[posting_terms]
+        vectors = np.zeros((doc_count, dim), dtype=np.float32)
+        np.add.at(vectors, (posting_docs, buckets[posting_terms]), weights)
+        vectors = normalize_rows(vectors)
+        embedder_config: dict[str, Any] = {"name": "hashing", "dim": dim}
+    elif embedder == "ollama":
+        ollama_embedder = ollama_embedder or ollama_embedder_from_env()
+        vectors = ollama_embedder.embed(texts_for_embedding)
+        embedder_config = {**ollama_embedder.config(), "dim": int(vectors.shape[1])}
+    elif embedder == "none":
+        vectors = None
+        embedder_config = {"name": "none"}
+    else:
+        raise ValueError(f"Embedder desconhecido: {embedder}")
+
+    authors = sorted({author for author in chunk_authors if author})
+    author_index = {author: position for position, author in enumerate(authors)}
+    author_ids = np.asarray([author_index.get(author, -1) for author in chunk_authors], dtype=np.int32)
+    author_bitmaps = np.stack(
+        [np.packbits(author_ids == position) for position in range(len(authors))]
+    ) if authors else np.zeros((0, (doc_count + 7) // 8), dtype=np.uint8)
+
+    index_dir.mkdir(parents=True, exist_ok=True)
+    np.save(index_dir / "chunk_offsets.npy", np.asarray(offsets, dtype=np.int64))
+    np.save(index_dir / "meta_author_bitmaps.npy", author_bitmaps)
+    np.save(index_dir / "meta_dates.npy", np.asarray(chunk_dates, dtype=np.int32))
+    (index_dir / "meta_authors.json").write_text(json.dumps(authors, ensure_ascii=False), encoding="utf-8")
+    np.save(index_dir / "bm25_offsets.npy", term_offsets)
+    np.save(index_dir / "bm25_docs.npy", posting_docs)
+    np.save(index_dir / "bm25_tf.npy", posting_tf)
+    np.save(index_dir / "bm25_idf.npy", idf)
+    np.save(index_dir / "bm25_doc_norm.npy", doc_norm)
+    if vectors is not None:
+        np.save(index_dir / "vectors.npy", vectors)
+    (index_dir / "bm25_terms.json").write_text(json.dumps(terms, ensure_ascii=False), encoding="utf-8")
+
+    manifest = {
+        "version": INDEX_VERSION,
+        "built_at_utc": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "build_seconds": round(time.monotonic() - started_monotonic, 3),
+        "chunks_file": {"path": str(chunks_path.resolve()), "size_bytes": chunks_path.stat().st_size},
+        "chunk_count": doc_count,
+        "term_count": len(terms),
+        "posting_count": int(posting_docs.shape[0]),
+        "author_count": len(authors),
+        "bm25": {"k1": k1, "b": b, "avgdl": round(avgdl, 3)},
+        "embedder": embedder_config,
+    }
+    (index_dir / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    return manifest
+
+
+class LocalRetriever:
+    """Consulta um indice gravado por `build_index`; os arrays ficam em memory map."""
+
+    def __init__(
+        self,
+        index_dir: Path,
+        ollama_embedder: OllamaEmbedder | None = None,
+        reranker: Reranker | None = None,
+    ) -> None:
+        self.index_dir = index_dir
+        self.reranker = reranker
+        self.manifest = json.loads((index_dir / "manifest.json").read_text(encoding="utf-8"))
+        if self.manifest.get("version") != INDEX_VERSION:
+            raise ValueError(f"Versao de indice incompativel em {index_dir}; reconstrua com local_retrieval.py")
+        self.chunks_path = Path(self.manifest["chunks_file"]["path"])
+        if self.chunks_path.stat().st_size != self.manifest["chunks_file"]["size_bytes"]:
+            raise ValueError(f"{self.chunks_path} mudou desde a construcao do indice; reconstrua com local_retrieval.py")
+
+        def load(name: str) -> np.ndarray:
+            return np.load(index_dir / name, mmap_mode="r")
+
+        self.chunk_offsets = load("chunk_offsets.npy")
+        self.term_offsets = load("bm25_offsets.npy")
+        self.posting_docs = load("bm25_docs.npy")
+        self.posting_tf = load("bm25_tf.npy")
+        self.idf = load("bm25_idf.npy")
+        self.doc_norm = load("bm25_doc_norm.npy")
+        self.k1 = float(self.manifest["bm25"]["k1"])
+        terms = json.loads((index_dir / "bm25_terms.json").read_text(encoding="utf-8"))
+        self.vocabulary = {term: term_id for term_id, term in enumerate(terms)}
+        self.embedder_config = self.manifest["embedder"]
+        self.vectors = load("vectors.npy") if (index_dir / "vectors.npy").exists() else None
+        self.ollama_embedder = ollama_embedder
+        if self.embedder_config["name"] == "ollama" and self.ollama_embedder is None:
+            self.ollama_embedder = ollama_embedder_from_env(self.embedder_config.get("model", ""))
+        self.hash_buckets, self.hash_signs = (
+            hashed_projection(terms, int(self.embedder_config["dim"]))
+            if self.embedder_config["name"] == "hashing"
+            else (None, None)
+        )
+        self.authors = json.loads((index_dir / "meta_authors.json").read_text(encoding="utf-8"))
+        self.author_tokens = [set(normalize_for_match(author).split()) for author in self.authors]
+        self.author_bitmaps = load("meta_author_bitmaps.npy")
+        self.dates = load("meta_dates.npy")
+        self._chunks_file = self.chunks_path.open("rb")
+        self._chunks_map = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return int(self.chunk_offsets.shape[0])
+
+    def close(self) -> None:
+        if self.reranker is not None:
+            self.reranker.close()
+        self._chunks_map.close()
+        self._chunks_file.close()
+
+    def record(self, doc_index: int) -> dict[str, Any]:
+        start = int(self.chunk_offsets[doc_index])
+        end = self._chunks_map.find(b"\n", start)
+        return json.loads(self._chunks_map[start : end if end >= 0 else len(self._chunks_map)])
+
+    def bm25_scores(self, query: str, mask: np.ndarray | None = None) -> np.ndarray:
+        """Scores BM25 de todos os chunks; fora de `mask`, os postings nem sao somados."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+            docs = self.posting_docs[start:end]
+            tf = self.posting_tf[start:end]
+            if mask is not None:
+                keep = mask[docs]
+                docs, tf = docs[keep], tf[keep]
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + self.doc_norm[docs])
+        return scores
+
+    def embed_query(self, query: str) -> np.ndarray:
+        if self.embedder_config["name"] == "hashing":
+            vector = np.zeros(int(self.embedder_config["dim"]), dtype=np.float32)
+            for term, count in Counter(tokenize(query)).items():
+                term_id = self.vocabulary.get(term)
+                if term_id is not None:
+                    vector[self.hash_buckets[term_id]] += (1 + math.log(count)) * self.idf[term_id] * self.hash_signs[term_id]
+            return normalize_rows(vector[None, :])[0]
+        if self.ollama_embedder is None:
+            raise ValueError("Indice construido sem embeddings; use o modo bm25 ou reconstrua com --embedder.")
+        return self.ollama_embedder.embed([query])[0]
+
+    def vector_ranking(self, query: str, k: int, mask: np.ndarray | None = None) -> list[tuple[int, float]]:
+        if self.vectors is None:
+            raise ValueError("Indice construido sem embeddings; use o modo bm25 ou reconstrua com --embedder.")
+        query_vector = self.embed_query(query)
+        if mask is None:
+            return self.top_k(self.vectors @ query_vector, k)
+        # So as linhas candidatas sao lidas do memory map e multiplicadas.
+        candidates = np.flatnonzero(mask)
+        ranking = self.top_k(self.vectors[candidates] @ query_vector, k)
+        return [(int(candidates[position]), score) for position, score in ranking]
+
+    def bm25_ranking(self, query: str, k: int, mask: np.ndarray | None = None) -> list[tuple[int, float]]:
+        scores = self.bm25_scores(query, mask)
+        return self.top_k(scores, k, positive_only=True)
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, *, positive_only: bool = False) -> list[tuple[int, float]]:
+        candidates = np.flatnonzero(scores > 0) if positive_only else np.arange(scores.shape[0])
+        if candidates.shape[0] == 0:
+            return []
+        k = min(k, candidates.shape[0])
+        candidate_scores = scores[candidates]
+        best = np.argpartition(-candidate_scores, k - 1)[:k]
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return [(int(candidates[index]), float(candidate_scores[index])) for index in best]
+
+    def match_authors(self, question: str) -> list[str]:
+        """Autores do corpus citados na pergunta, pelos mesmos candidatos de `QUESTION_NAME_RE`.
+
+        O trecho capturado costuma vir com palavras vizinhas ("Como Paulo Rocha",
+        "Paulo Paim Usa Ao"), entao basta o nome do autor estar contido nele, ou o
+        trecho (com ao menos dois termos) estar contido no nome do autor.
+        """
+        matched: list[str] = []
+        for candidate in extract_question_author_candidates(question):
+            tokens = set(normalize_for_match(candidate).split())
+            for author, author_tokens in zip(self.authors, self.author_tokens):
+                if author in matched:
+                    continue
+                if (len(author_tokens) >= 2 and author_tokens <= tokens) or (len(tokens) >= 2 and tokens <= author_tokens):
+                    matched.append(author)
+        return matched
+
+    def parse_filters(self, question: str) -> dict[str, Any]:
+        date_range = parse_date_hint(question)
+        return {
+            "authors": self.match_authors(question),
+            "date_from": date_range[0] if date_range else None,
+            "date_to": date_range[1] if date_range else None,
+        }
+
+    def candidate_mask(self, filters: dict[str, Any]) -> np.ndarray | None:
+        mask = None
+        if filters.get("authors"):
+            positions = [self.authors.index(author) for author in filters["authors"]]
+            packed = np.bitwise_or.reduce(self.author_bitmaps[positions], axis=0)
+            mask = np.unpackbits(packed, count=len(self)).astype(bool)
+        if filters.get("date_from") is not None:
+            # Chunks sem data nao sao descartados pelo filtro de periodo.
+            in_range = (self.dates == 0) | ((self.dates >= filters["date_from"]) & (self.dates <= filters["date_to"]))
+            mask = in_range if mask is None else mask & in_range
+        return mask
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        mode: str = "hybrid",
+        candidate_k: int = 100,
+        mask: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Devolve (indice do chunk, score) em ordem decrescente, opcionalmente restrito a `mask`."""
+        if mode == "bm25":
+            return self.bm25_ranking(query, k, mask)
+        if mode == "vector":
+            return self.vector_ranking(query, k, mask)
+        if mode != "hybrid":
+            raise ValueError(f"Modo de recuperacao desconhecido: {mode}")
+        # Reciprocal rank fusion: combina posicoes, nao escalas de score diferentes.
+        fused: dict[int, float] = {}
+        for ranking in (
+            self.bm25_ranking(query, candidate_k, mask),
+            self.vector_ranking(query, candidate_k, mask),
+        ):
+            for rank, (doc_index, _) in enumerate(ranking, start=1):
+                fused[doc_index] = fused.get(doc_index, 0.0) + 1 / (RRF_K + rank)
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def query(self, query: str, k: int, mode: str = "hybrid", metadata_filter: bool = False) -> dict[str, Any]:
+        """Resultado no formato de `/api/v1/retrieval/query/collection` (listas aninhadas do Chroma).
+
+        Com ``metadata_filter``, ``filters`` registra autores e periodo extraidos
+        da pergunta e quantos chunks sobraram; se nenhum sobrar, a busca volta a
+        considerar o corpus inteiro (``fallback``).
+
+        Com rerank, os ``reranker.candidates`` primeiros resultados sao
+        reordenados pelo cross-encoder; ``rerank`` traz o tempo gasto e
+        ``first_stage`` os k primeiros na ordem anterior, no mesmo formato, para
+        medir o ganho do rerank na mesma rodada.
+        """
+        mask = None
+        filters: dict[str, Any] | None = None
+        if metadata_filter:
+            filters = self.parse_filters(query)
+            mask = self.candidate_mask(filters)
+            filters["candidates"] = int(mask.sum()) if mask is not None else len(self)
+            filters["fallback"] = mask is not None and filters["candidates"] == 0
+            if filters["fallback"]:
+                mask = None
+        first_stage_k = max(k, self.reranker.candidates) if self.reranker is not None else k
+        hits = [
+            (doc_index, score, self.record(doc_index))
+            for doc_index, score in self.search(query, first_stage_k, mode, mask=mask)
+        ]
+        rerank: dict[str, Any] | None = None
+        first_stage: dict[str, Any] | None = None
+        if self.reranker is not None:
+            first_stage = self.hits_payload(hits[:k])
+            rerank_started = time.monotonic()
+            rerank_scores, cache_hits = self.reranker.score(query, [record.get("text", "") for _, _, record in hits])
+            order = np.argsort(-rerank_scores, kind="stable")
+            hits = [(hits[position][0], float(rerank_scores[position]), hits[position][2]) for position in order]
+            rerank = {
+                "candidates": len(order),
+                "cache_hits": cache_hits,
+                "seconds": round(time.monotonic() - rerank_started, 4),
+            }
+        payload = self.hits_payload(hits[:k])
+        if filters is not None:
+            payload["filters"] = filters
+        if rerank is not None:
+            payload["rerank"] = rerank
+            payload["first_stage"] = first_stage
+        return payload
+
+    def hits_payload(self, hits: list[tuple[int, float, dict[str, Any]]]) -> dict[str, Any]:
+        documents: list[str] = []
+        metadatas: list[dict[str, Any]] = []
+        scores: list[float] = []
+        for _, score, record in hits:
+            metadata = record.get("metadata") or {}
+            documents.append(format_chunk_markdown(record))
+            metadatas.append(
+                {
+                    # `name` identifica o discurso, como o arquivo no Open WebUI; o store vai em `source`.
+                    "name": record.get("source_id") or record.get("chunk_id", ""),
+                    "source": self.chunks_path.name,
+                    "chunk_id": record.get("chunk_id", ""),
+                    "source_id": record.get("source_id", ""),
+                    "nome_autor": metadata.get("nome_autor", ""),
+                    "data": metadata.get("data", ""),
+                    "score": round(score, 6),
+                }
+            )
+            scores.append(round(score, 6))
+        return {"documents": [documents], "metadatas": [metadatas], "distances": [scores]}
+
+    def retrieve_sources(
+        self,
+        query: str,
+        k: int,
+        mode: str = "hybrid",
+        metadata_filter: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Mesmos chunks de `query`, no formato do campo `sources` das respostas do Open WebUI."""
+        payload = self.query(query, k, mode, metadata_filter)
+        source: dict[str, Any] = {"type": "local", "name": self.chunks_path.name, "mode": mode}
+        if "filters" in payload:
+            source["filters"] = payload["filters"]
+        if "rerank" in payload:
+            source["rerank"] = payload["rerank"]
+        return [
+            {
+                "source": source,
+                "document": payload["documents"][0],
+                "metadata": payload["metadatas"][0],
+                "distances": payload["distances"][0],
+            }
+        ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Constroi ou consulta o indice local BM25 + vetorial dos chunks.")
+    parser.add_argument(
+        "--chunks-file",
+        default="knowledge_openwebui/discursos_chunks.jsonl",
+        help="JSONL de chunks gerado por build_openwebui_knowledge_from_hf.py.",
+    )
+    parser.add_argument("--index-dir", default=str(DEFAULT_INDEX_DIR), help="Diretorio do indice.")
+    parser.add_argument(
+        "--embedder",
+        choices=("hashing", "ollama", "none"),
+        default="hashing",
+        help="Origem dos embeddings: hashing de termos (offline), Ollama (RAG_EMBEDDING_MODEL) ou nenhum (so BM25).",
+    )
+    parser.add_argument("--dim", type=int, default=512, help="Dimensao dos vetores do embedder hashing.")
+    parser.add_argument("--embedding-model", default="", help="Modelo do Ollama. Default: RAG_EMBEDDING_MODEL.")
+    parser.add_argument("--k1", type=float, default=1.2, help="Parametro k1 do BM25.")
+    parser.add_argument("--b", type=float, default=0.75, help="Parametro b do BM25.")
+    parser.add_argument("--query", default="", help="Consulta o indice existente em vez de construi-lo.")
+    parser.add_argument("--mode", choices=RETRIEVAL_MODES, default="hybrid", help="Modo usado com --query.")
+    parser.add_argument("--k", type=int, default=5, help="Quantidade de chunks devolvidos com --query.")
+    parser.add_argument(
+        "--metadata-filter",
+        action="store_true",
+        help="Com --query, restringe os candidatos a autores e periodo citados na pergunta.",
+    )
+    add_rerank_arguments(parser)
+    parser.add_argument("--verbose", action="store_true", help="Ativa logs detalhados.")
+    args = parser.parse_args()
+
+    configure_logging(args.verbose)
+    project_root = Path(__file__).resolve().parents[1]
+    load_dotenv(project_root / ".env")
+    index_dir = (project_root / args.index_dir).resolve() if not Path(args.index_dir).is_absolute() else Path(args.index_dir)
+
+    if args.query:
+        retriever = LocalRetriever(index_dir, reranker=reranker_from_args(args, project_root))
+        started_monotonic = time.monotonic()
+        payload = retriever.query(args.query, args.k, args.mode, args.metadata_filter)
+        elapsed_ms = (time.monotonic() - started_monotonic) * 1000
+        for rank, (metadata, score) in enumerate(zip(payload["metadatas"][0], payload["distances"][0]), start=1):
+            print(f"{rank:>2}. {metadata['chunk_id']} {metadata['nome_autor']} ({metadata['data']}) score={score:.4f}")
+        if "filters" in payload:
+            print(f"filtros: {json.dumps(payload['filters'], ensure_ascii=False)}")
+        if "rerank" in payload:
+            print(f"rerank: {json.dumps(payload['rerank'], ensure_ascii=False)}")
+        print(f"{args.mode}: {elapsed_ms:.1f} ms")
+        retriever.close()
+        return 0
+
+    chunks_path = (
+        (project_root / args.chunks_file).resolve() if not Path(args.chunks_file).is_absolute() else Path(args.chunks_file)
+    )
+    if not chunks_path.exists():
+        raise SystemExit(f"Arquivo de chunks nao encontrado: {chunks_path}. Rode build_openwebui_knowledge_from_hf.py.")
+    manifest = build_index(
+        chunks_path,
+        index_dir,
+        embedder=args.embedder,
+        dim=args.dim,
+        k1=args.k1,
+        b=args.b,
+        ollama_embedder=ollama_embedder_from_env(args.embedding_model) if args.embedder == "ollama" else None,
+    )
+    print(json.dumps(manifest, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Recalcula sinais de recuperacao e leituras analiticas de rodadas antigas, sem chamar o Open WebUI.
+
+Le cada `rag_eval_*.jsonl` linha a linha, reaplica `extract_retrieval_signals`
+ao payload `response` gravado e as classificacoes de
+`build_question_analysis.py`, distribuindo os arquivos entre processos, e
+consolida tudo em um unico parquet.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+
+try:
+    from scripts.build_question_analysis import analyze_rows
+    from scripts.run_rag_eval import AuthorLexicon, extract_retrieval_signals
+except ModuleNotFoundError:
+    from build_question_analysis import analyze_rows
+    from run_rag_eval import AuthorLexicon, extract_retrieval_signals
+
+
+LOGGER = logging.getLogger("replay_eval_signals")
+
+ANALYSIS_FIELDS = (
+    "retrieval_quality",
+    "context_faithfulness",
+    "reference_use",
+    "main_limitation",
+    "source_entries",
+    "retrieved_chunks",
+    "unique_files",
+    "avg_retrieval_score",
+)
+
+_AUTHOR_LEXICON: AuthorLexicon | None = None
+
+
+def init_worker(author_lexicon_path: str) -> None:
+    global _AUTHOR_LEXICON
+    _AUTHOR_LEXICON = AuthorLexicon.from_chunks_jsonl(Path(author_lexicon_path)) if author_lexicon_path else None
+
+
+def empty_to_none(value: Any) -> Any:
+    return None if value == "" else value
+
+
+def replay_row(
+    row: dict[str, Any],
+    *,
+    run_stem: str,
+    line_number: int,
+    author_lexicon: AuthorLexicon | None = None,
+) -> dict[str, Any]:
+    signals = extract_retrieval_signals(row.get("response"), str(row.get("question", "")), author_lexicon)
+    analysis = analyze_rows([row])[0]
+    record: dict[str, Any] = {
+        "run": run_stem,
+        "line": line_number,
+        "id": row.get("id", ""),
+        "category": row.get("category", ""),
+        "status": row.get("status", ""),
+        "total_score": empty_to_none(row.get("total_score")),
+        "duration_seconds": row.get("duration_seconds"),
+    }
+    record.update(signals)
+    record.update({field: empty_to_none(analysis[field]) for field in ANALYSIS_FIELDS})
+    # Campos cujo valor recalculado difere do gravado na rodada original.
+    record["signals_changed"] = sorted(
+        field for field, value in signals.items() if field in row and row[field] != value
+    )
+    return record
+
+
+def replay_file(path: Path, author_lexicon: AuthorLexicon | None = None) -> list[dict[str, Any]]:
+    lexicon = author_lexicon if author_lexicon is not None else _AUTHOR_LEXICON
+    records: list[dict[str, Any]] = []
+    # Linha invalida so e tolerada se for a ultima (rodada interrompida na gravacao).
+    bad_line: int | None = None
+    with path.open(encoding="utf-8") as jsonl_file:
+        for line_number, line in enumerate(jsonl_file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if bad_line is not None:
+                raise ValueError(f"{path}: linha {bad_line} nao e JSON valido e nao e a ultima do arquivo")
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                bad_line = line_number
+                continue
+            records.append(
+                replay_row(row, run_stem=path.stem, line_number=line_number, author_lexicon=lexicon)
+            )
+    if bad_line is not None:
+        LOGGER.warning("%s: 1 linha descartada (ultima linha incompleta, linha %d)", path, bad_line)
+    return records
+
+
+def replay_files(
+    paths: list[Path],
+    *,
+    workers: int,
+    author_lexicon_path: Path | None = None,
+) -> pd.DataFrame:
+    lexicon_arg = str(author_lexicon_path) if author_lexicon_path is not None else ""
+    records: list[dict[str, Any]] = []
+    if workers <= 1:
+        init_worker(lexicon_arg)
+        for path in paths:
+            records.extend(replay_file(path))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(lexicon_arg,),
+        ) as pool:
+            for file_records in pool.map(replay_file, paths):
+                records.extend(file_records)
+    return pd.DataFrame.from_records(records)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Recalcula sinais de recuperacao e leituras analiticas de rodadas antigas em um parquet."
+    )
+    parser.add_argument(
+        "jsonl_files",
+        nargs="*",
+        help="Arquivos JSONL das rodadas. Default: eval/results/rag_eval_*.jsonl",
+    )
+    parser.add_argument(
+        "--output",
+        default="",
+        help="Parquet de saida. Se vazio, usa eval/results/replay_signals_<timestamp>.parquet",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Quantidade de processos. 1 = executa no processo atual.",
+    )
+    parser.add_argument(
+        "--author-lexicon-file",
+        default="knowledge_openwebui/discursos_chunks.jsonl",
+        help="JSONL de chunks usado como lexico de autores. Ignorado se nao existir.",
+    )
+    args = parser.parse_args()
+
+    project_root = Path(__file__).resolve().parents[1]
+    if args.jsonl_files:
+        paths = [
+            (project_root / item).resolve() if not Path(item).is_absolute() else Path(item)
+            for item in args.jsonl_files
+        ]
+    else:
+        paths = sorted((project_root / "eval" / "results").glob("rag_eval_*.jsonl"))
+    if not paths:
+        raise SystemExit("Nenhum JSONL de rodada encontrado.")
+
+    author_lexicon_path = (
+        (project_root / args.author_lexicon_file).resolve()
+        if not Path(args.author_lexicon_file).is_absolute()
+        else Path(args.author_lexicon_file)
+    )
+    frame = replay_files(
+        paths,
+        workers=args.workers,
+        author_lexicon_path=author_lexicon_path if author_lexicon_path.exists() else None,
+    )
+
+    if args.output:
+        output_path = (project_root / args.output).resolve() if not Path(args.output).is_absolute() else Path(args.output)
+    else:
+        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_path = project_root / "eval" / "results" / f"replay_signals_{ts}.parquet"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    frame.to_parquet(output_path, index=False)
+    print(output_path)
+    print(f"{len(frame)} linhas de {len(paths)} rodadas")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
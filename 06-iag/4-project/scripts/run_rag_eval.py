@@ -14,19 +14,31 @@ import csv
 import hashlib
 import json
 import logging
+import math
 import os
+import queue
 import random
 import re
+import sqlite3
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable
 
 import requests
 
 LOGGER = logging.getLogger("run_rag_eval")
-SPEAKER_RE = re.compile(r"\b(?:O SR\.|A SRA\.)\s+([A-ZÁÉÍÓÚÂÊÔÃÕÇ][A-ZÁÉÍÓÚÂÊÔÃÕÇ\s.'-]{2,80}?)(?:\s*\(|\s+-)")
-MARKDOWN_AUTHOR_RE = re.compile(r"^- Autor:\s*(.+)$", re.MULTILINE)
+# Linha "- Autor:" dos lotes Markdown ou marcacao de orador das notas taquigraficas, em uma unica passada.
+AUTHOR_MENTION_RE = re.compile(
+    r"^- Autor:\s*(?P<markdown>.+)$"
+    r"|\b(?:O SR\.|A SRA\.)\s+(?P<speaker>[A-ZÁÉÍÓÚÂÊÔÃÕÇ][A-ZÁÉÍÓÚÂÊÔÃÕÇ\s.'-]{2,80}?)(?:\s*\(|\s+-)",
+    re.MULTILINE,
+)
+SPEAKER_STOPWORDS = {"Presidente", "Orador"}
+NOME_AUTOR_JSON_RE = re.compile(r'"nome_autor":\s*"((?:[^"\\]|\\.)*)"')
+MATCH_TRANSLATION = str.maketrans("áàâãéêíóôõúç", "aaaaeeiooouc")
 QUESTION_NAME_RE = re.compile(
     r"\b([A-ZÁÉÍÓÚÂÊÔÃÕÇ][a-záéíóúâêôãõç]+(?:\s+"
     r"(?:[A-ZÁÉÍÓÚÂÊÔÃÕÇ][a-záéíóúâêôãõç]+|[a-z]{2,3})){1,3})\b"
@@ -37,6 +49,70 @@ QUESTION_NAME_STOPWORDS = {
     "Data Link",
     "Fonte Link",
 }
+JUDGE_FIELDS = (
+    "adherence_score",
+    "factual_score",
+    "source_focus_score",
+    "synthesis_score",
+    "hallucination_score",
+    "total_score",
+    "review_notes",
+    "judge_response",
+    "judge_cache_hit",
+    "judge_rate_limit_wait_seconds",
+    "judge_retry_wait_seconds",
+)
+RESUME_FINGERPRINT_KEYS = (
+    "knowledge_id",
+    "questions_file.sha256",
+    "generator.model",
+    "generator.prompt_sha256",
+    "generator.prompt_application_role",
+    "generator.temperature",
+    "generator.top_p",
+    "generator.max_tokens",
+    "generator.seed",
+    "judge.model",
+    "judge.system_prompt_sha256",
+    "judge.user_prompt_sha256",
+    "judge.auto_score_enabled",
+    "rubric.sha256",
+    "knowledge_artifacts.build_metadata.sha256",
+    "knowledge_artifacts.discursos_chunks.sha256",
+    "knowledge_artifacts.md_batches.file_count",
+    "knowledge_artifacts.md_batches.sample_first_file_sha256",
+    "retriever.backend",
+    "retriever.mode",
+    "retriever.top_k",
+    "retriever.metadata_filter",
+    "retriever.rerank.model",
+    "retriever.rerank.candidates",
+    "retriever.index_built_at_utc",
+)
+# Medidas da geracao; numa linha reaproveitada de outra execucao ficam com prefixo
+# `source_`, para nao entrarem nos tempos e contagens da execucao atual.
+GENERATION_RUN_FIELDS = (
+    "generation_seconds",
+    "generation_ttft_seconds",
+    "generation_output_tokens",
+    "generation_output_tokens_source",
+    "generation_tokens_per_second",
+    "generation_cache_hit",
+    "generation_rate_limit_wait_seconds",
+    "generation_retry_wait_seconds",
+    "signal_extraction_seconds",
+    "local_retrieval_seconds",
+)
+PHASE_FIELDS = {
+    "generation": "generation_seconds",
+    "generation_rate_limit_wait": "generation_rate_limit_wait_seconds",
+    "generation_retry_wait": "generation_retry_wait_seconds",
+    "signal_extraction": "signal_extraction_seconds",
+    "local_retrieval": "local_retrieval_seconds",
+    "judge": "judge_seconds",
+    "judge_rate_limit_wait": "judge_rate_limit_wait_seconds",
+    "judge_retry_wait": "judge_retry_wait_seconds",
+}
 
 
 def json_dumps_compact(value: Any) -> str:
@@ -109,6 +185,116 @@ def extract_answer(payload: Any) -> str:
     return json.dumps(payload, ensure_ascii=True)
 
 
+class RateLimiter:
+    """Garante um intervalo minimo entre inicios de requisicoes de um mesmo estagio."""
+
+    def __init__(self, min_interval: float) -> None:
+        self.min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> float:
+        """Bloqueia ate o proximo horario livre e devolve os segundos esperados."""
+        if self.min_interval <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+            return slot - now
+        return 0.0
+
+
+class ResponseCache:
+    """Cache em SQLite de respostas de /api/chat/completions, com expiracao e descarte LRU.
+
+    A chave e a impressao digital completa da requisicao (ver
+    ``request_fingerprint``). Apenas respostas bem-sucedidas sao gravadas.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: float = 0.0, max_entries: int = 0) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.max_entries = max(0, max_entries)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        now = time.time()
+        with self._lock:
+            found = self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if found is None:
+                return None
+            if self.ttl_seconds and now - found[1] > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self._connection.commit()
+        return json.loads(found[0])
+
+    def put(self, key: str, response: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json_dumps_compact(response), now, now),
+            )
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds:
+            self._connection.execute(
+                "DELETE FROM responses WHERE created_at < ?",
+                (now - self.ttl_seconds,),
+            )
+        if self.max_entries:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def request_fingerprint(base_url: str, payload: dict[str, Any]) -> str:
+    """Hash de tudo que define a resposta: servidor, modelo, mensagens, knowledge e amostragem."""
+    material = {
+        "url": f"{base_url}/api/chat/completions",
+        "payload": {key: value for key, value in payload.items() if key != "stream"},
+    }
+    return sha256_text(json.dumps(material, ensure_ascii=True, sort_keys=True, separators=(",", ":")))
+
+
 def build_generation_messages(
     question: str,
     answer_prompt: str,
@@ -140,6 +326,121 @@ def build_generation_messages(
     raise ValueError(f"answer_prompt_role invalido: {answer_prompt_role}")
 
 
+def inject_retrieved_context(
+    messages: list[dict[str, str]],
+    sources: list[dict[str, Any]],
+) -> list[dict[str, str]]:
+    """Anexa os chunks recuperados localmente a ultima mensagem do usuario.
+
+    Faz o papel do RAG_TEMPLATE do Open WebUI quando a recuperacao nao passa
+    pela knowledge do servidor (``--retriever local``).
+    """
+    documents = [document for source in sources for document in source.get("document") or []]
+    context = "\n\n".join(
+        f'<source id="{index}">\n{document}\n</source>' for index, document in enumerate(documents, start=1)
+    )
+    injected = [dict(message) for message in messages]
+    for message in reversed(injected):
+        if message["role"] == "user":
+            message["content"] = f"<context>\n{context}\n</context>\n\n{message['content']}"
+            break
+    return injected
+
+
+def rebuild_streamed_completion(
+    lines: Iterable[str | bytes],
+    request_started_monotonic: float,
+    stats: dict[str, Any],
+) -> dict[str, Any]:
+    """Reconstroi o payload nao-streaming a partir dos eventos SSE de /api/chat/completions.
+
+    O resultado tem o mesmo formato consumido por ``extract_answer`` e
+    ``extract_retrieval_signals`` (``choices[0].message.content`` e ``sources``).
+    Preenche ``stats`` com tempo ate o primeiro token, tempo total do stream,
+    tokens de saida e tokens por segundo na fase de decodificacao.
+    """
+    payload: dict[str, Any] = {}
+    content_parts: list[str] = []
+    sources: list[Any] | None = None
+    usage: dict[str, Any] | None = None
+    finish_reason = None
+    first_token_monotonic: float | None = None
+
+    for raw_line in lines:
+        line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+        line = line.strip()
+        if not line.startswith("data:"):
+            continue
+        data_text = line[len("data:") :].strip()
+        if data_text == "[DONE]":
+            break
+        try:
+            chunk = json.loads(data_text)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(chunk, dict):
+            continue
+        if chunk.get("error"):
+            raise RuntimeError(f"Erro no stream de /api/chat/completions: {chunk['error']}")
+        if isinstance(chunk.get("sources"), list):
+            sources = (sources or []) + chunk["sources"]
+        if isinstance(chunk.get("usage"), dict):
+            usage = chunk["usage"]
+        for key in ("id", "model", "created"):
+            if key in chunk:
+                payload.setdefault(key, chunk[key])
+        for choice in chunk.get("choices") or []:
+            if not isinstance(choice, dict):
+                continue
+            delta = choice.get("delta") or {}
+            text = delta.get("content") if isinstance(delta, dict) else None
+            if text:
+                if first_token_monotonic is None:
+                    first_token_monotonic = time.monotonic()
+                content_parts.append(str(text))
+            if choice.get("finish_reason"):
+                finish_reason = choice["finish_reason"]
+
+    finished_monotonic = time.monotonic()
+    payload["object"] = "chat.completion"
+    payload["choices"] = [
+        {
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(content_parts)},
+            "finish_reason": finish_reason,
+        }
+    ]
+    if sources is not None:
+        payload["sources"] = sources
+    if usage is not None:
+        payload["usage"] = usage
+
+    completion_tokens = (usage or {}).get("completion_tokens")
+    if isinstance(completion_tokens, (int, float)):
+        output_tokens = int(completion_tokens)
+        stats["output_tokens_source"] = "usage"
+    else:
+        output_tokens = len(content_parts)
+        stats["output_tokens_source"] = "stream_chunks"
+    decode_seconds = (
+        finished_monotonic - first_token_monotonic if first_token_monotonic is not None else None
+    )
+    stats["ttft_seconds"] = (
+        round(first_token_monotonic - request_started_monotonic, 3)
+        if first_token_monotonic is not None
+        else None
+    )
+    stats["stream_seconds"] = round(finished_monotonic - request_started_monotonic, 3)
+    stats["output_tokens"] = output_tokens
+    # Eventos de conteudo nao sao tokens: sem `usage`, a taxa nao e comparavel.
+    stats["tokens_per_second"] = (
+        round(output_tokens / decode_seconds, 3)
+        if stats["output_tokens_source"] == "usage" and decode_seconds and decode_seconds > 0
+        else None
+    )
+    return payload
+
+
 def ask_openwebui(
     base_url: str,
     token: str,
@@ -152,11 +453,27 @@ def ask_openwebui(
     top_p: float | None = None,
     max_tokens: int | None = None,
     seed: int | None = None,
+    cache: ResponseCache | None = None,
+    stats: dict[str, Any] | None = None,
+    stream: bool = False,
 ) -> dict[str, Any]:
+    """Envia a conversa ao Open WebUI com retries.
+
+    Quando ``stats`` e informado, recebe ``cache_hit`` indicando se a resposta
+    veio de ``cache`` em vez de uma nova chamada, ``attempts`` e
+    ``retry_wait_seconds`` (tempo dormindo em backoff entre tentativas). Com ``stream=True``, a
+    resposta e consumida como SSE e ``stats`` recebe tambem as metricas de
+    ``rebuild_streamed_completion``.
+    """
+    if stats is None:
+        stats = {}
+    stats["cache_hit"] = False
+    stats["attempts"] = 0
+    stats["retry_wait_seconds"] = 0.0
     payload = {
         "model": model,
         "messages": messages,
-        "stream": False,
+        "stream": stream,
     }
     if temperature is not None:
         payload["temperature"] = temperature
@@ -169,14 +486,25 @@ def ask_openwebui(
     if knowledge_id:
         payload["files"] = [{"type": "collection", "id": knowledge_id}]
 
+    cache_key = ""
+    if cache is not None:
+        cache_key = request_fingerprint(base_url, payload)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            stats["cache_hit"] = True
+            return cached
+
     attempt = 0
     while True:
         try:
+            stats["attempts"] += 1
+            request_started_monotonic = time.monotonic()
             response = requests.post(
                 f"{base_url}/api/chat/completions",
                 headers=api_headers(token),
                 json=payload,
                 timeout=300,
+                stream=stream,
             )
             if response.status_code == 429:
                 raise RuntimeError("429 rate limit")
@@ -187,7 +515,14 @@ def ask_openwebui(
                     f"{response.status_code} error from /api/chat/completions: {body_excerpt}"
                 )
             response.raise_for_status()
-            data = response.json()
+            if stream:
+                data = rebuild_streamed_completion(
+                    response.iter_lines(),
+                    request_started_monotonic,
+                    stats,
+                )
+            else:
+                data = response.json()
             if data is None:
                 raise RuntimeError("Resposta nula retornada por /api/chat/completions.")
             if not isinstance(data, dict):
@@ -195,6 +530,8 @@ def ask_openwebui(
                     "Resposta em formato inesperado retornada por /api/chat/completions: "
                     f"{type(data).__name__}"
                 )
+            if cache is not None:
+                cache.put(cache_key, data)
             return data
         except Exception as exc:  # noqa: BLE001
             attempt += 1
@@ -209,6 +546,7 @@ def ask_openwebui(
                 exc,
             )
             time.sleep(sleep_seconds)
+            stats["retry_wait_seconds"] = round(stats["retry_wait_seconds"] + sleep_seconds, 3)
 
 
 def parse_json_object(text: str) -> dict[str, Any]:
@@ -232,6 +570,26 @@ def load_text(path: Path) -> str:
     return path.read_text(encoding="utf-8").strip()
 
 
+def load_jsonl_rows(path: Path, *, allow_truncated_tail: bool = False) -> list[dict[str, Any]]:
+    """Le um JSONL de resultados.
+
+    Com ``allow_truncated_tail``, uma ultima linha incompleta (rodada
+    interrompida no meio da gravacao) e descartada em vez de gerar erro.
+    """
+    lines = [line.strip() for line in path.read_text(encoding="utf-8").splitlines()]
+    lines = [line for line in lines if line]
+    rows: list[dict[str, Any]] = []
+    for position, line in enumerate(lines, start=1):
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError:
+            if allow_truncated_tail and position == len(lines):
+                LOGGER.warning("ultima linha incompleta descartada em %s", path)
+                continue
+            raise
+    return rows
+
+
 def env_float(name: str) -> float | None:
     raw = os.getenv(name, "").strip()
     if not raw:
@@ -280,24 +638,39 @@ def normalize_author_name(value: str) -> str:
 
 
 def normalize_for_match(value: str) -> str:
-    normalized = value.lower()
-    replacements = {
-        "á": "a",
-        "à": "a",
-        "â": "a",
-        "ã": "a",
-        "é": "e",
-        "ê": "e",
-        "í": "i",
-        "ó": "o",
-        "ô": "o",
-        "õ": "o",
-        "ú": "u",
-        "ç": "c",
-    }
-    for source, target in replacements.items():
-        normalized = normalized.replace(source, target)
-    return " ".join(normalized.split())
+    return " ".join(value.lower().translate(MATCH_TRANSLATION).split())
+
+
+class AuthorLexicon:
+    """Nomes canonicos dos autores do corpus, indexados pela forma normalizada.
+
+    Permite que a marcacao de orador em caixa alta e sem acentos
+    ("O SR. CONFUCIO MOURA") e a linha "- Autor:" resultem no mesmo nome.
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.by_normalized: dict[str, str] = {}
+        for name in names:
+            name = " ".join(str(name).split())
+            if name:
+                self.by_normalized.setdefault(normalize_for_match(name), name)
+
+    def __len__(self) -> int:
+        return len(self.by_normalized)
+
+    def canonical(self, name: str) -> str:
+        return self.by_normalized.get(normalize_for_match(name), name)
+
+    @classmethod
+    def from_chunks_jsonl(cls, path: Path) -> "AuthorLexicon":
+        """Le apenas o campo ``nome_autor`` de cada linha, sem decodificar o texto dos chunks."""
+        names: set[str] = set()
+        with path.open(encoding="utf-8") as jsonl_file:
+            for line in jsonl_file:
+                match = NOME_AUTOR_JSON_RE.search(line)
+                if match:
+                    names.add(json.loads(f'"{match.group(1)}"'))
+        return cls(names)
 
 
 def extract_question_author_candidates(question: str) -> list[str]:
@@ -310,19 +683,27 @@ def extract_question_author_candidates(question: str) -> list[str]:
     return sorted(candidates)
 
 
-def extract_author_mentions_from_text(text: str) -> list[str]:
+def extract_author_mentions_from_text(text: str, author_lexicon: AuthorLexicon | None = None) -> list[str]:
     authors: set[str] = set()
-    for match in MARKDOWN_AUTHOR_RE.findall(text):
-        author = normalize_author_name(match)
-        if author:
-            authors.add(author)
-    for match in SPEAKER_RE.findall(text):
-        author = normalize_author_name(match)
-        if author and author not in {"Presidente", "Orador"}:
-            authors.add(author)
+    for match in AUTHOR_MENTION_RE.finditer(text):
+        speaker = match.group("speaker")
+        author = normalize_author_name(speaker or match.group("markdown"))
+        if not author or (speaker and author in SPEAKER_STOPWORDS):
+            continue
+        authors.add(author_lexicon.canonical(author) if author_lexicon is not None else author)
     return sorted(authors)
 
 
+def contains_url(value: Any) -> bool:
+    if isinstance(value, str):
+        return "http://" in value or "https://" in value
+    if isinstance(value, dict):
+        return any(contains_url(item) for item in value.values())
+    if isinstance(value, list):
+        return any(contains_url(item) for item in value)
+    return False
+
+
 def iter_source_metadata(source: dict[str, Any]) -> list[dict[str, Any]]:
     metadata = source.get("metadata")
     if isinstance(metadata, list):
@@ -332,7 +713,11 @@ def iter_source_metadata(source: dict[str, Any]) -> list[dict[str, Any]]:
     return []
 
 
-def extract_retrieval_signals(response: Any, question: str) -> dict[str, Any]:
+def extract_retrieval_signals(
+    response: Any,
+    question: str,
+    author_lexicon: AuthorLexicon | None = None,
+) -> dict[str, Any]:
     if not isinstance(response, dict):
         return {
             "retrieval_source_entries": 0,
@@ -364,9 +749,9 @@ def extract_retrieval_signals(response: Any, question: str) -> dict[str, Any]:
         documents = document if isinstance(document, list) else [document] if isinstance(document, str) else []
         chunk_count += len(documents)
         for document_text in documents:
-            if "http://" in document_text or "https://" in document_text:
+            if not links_present and ("http://" in document_text or "https://" in document_text):
                 links_present = True
-            author_mentions.update(extract_author_mentions_from_text(document_text))
+            author_mentions.update(extract_author_mentions_from_text(document_text, author_lexicon))
 
         for item in iter_source_metadata(source):
             file_name = item.get("name") or item.get("source") or item.get("file_id")
@@ -375,8 +760,7 @@ def extract_retrieval_signals(response: Any, question: str) -> dict[str, Any]:
             score = item.get("score")
             if isinstance(score, (int, float)):
                 scores.append(float(score))
-            metadata_text = json.dumps(item, ensure_ascii=False)
-            if "http://" in metadata_text or "https://" in metadata_text:
+            if not links_present and contains_url(item):
                 links_present = True
 
     expected_authors = extract_question_author_candidates(question)
@@ -386,16 +770,22 @@ def extract_retrieval_signals(response: Any, question: str) -> dict[str, Any]:
         for author in expected_authors
         if normalize_for_match(author) in normalized_question
     ]
-    normalized_mentions = [normalize_for_match(author) for author in author_mentions]
-    if expected_authors:
-        has_expected_author = any(
-            normalize_for_match(expected) in mention or mention in normalize_for_match(expected)
-            for expected in expected_authors
+    if author_lexicon is not None:
+        expected_authors = [author_lexicon.canonical(author) for author in expected_authors]
+    if not expected_authors:
+        expected_author_flag = "unknown"
+    elif author_lexicon is not None:
+        # Perguntas e mencoes ja estao em nomes canonicos: basta a intersecao.
+        expected_author_flag = "no" if author_mentions.isdisjoint(expected_authors) else "yes"
+    else:
+        normalized_mentions = {normalize_for_match(author) for author in author_mentions}
+        normalized_expected = [normalize_for_match(expected) for expected in expected_authors]
+        has_expected_author = any(expected in normalized_mentions for expected in normalized_expected) or any(
+            expected in mention or mention in expected
+            for expected in normalized_expected
             for mention in normalized_mentions
         )
         expected_author_flag = "yes" if has_expected_author else "no"
-    else:
-        expected_author_flag = "unknown"
 
     if len(author_mentions) >= 3:
         author_mix_risk = "high"
@@ -449,6 +839,77 @@ def collect_knowledge_artifact_fingerprints(project_root: Path) -> dict[str, dic
     return snapshots
 
 
+def get_nested(payload: dict[str, Any], dotted_key: str) -> Any:
+    value: Any = payload
+    for key in dotted_key.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def run_config_mismatches(previous: dict[str, Any], current: dict[str, Any]) -> list[str]:
+    """Lista as impressoes digitais que impedem retomar uma rodada com a configuracao atual."""
+    mismatches = []
+    for key in RESUME_FINGERPRINT_KEYS:
+        previous_value = get_nested(previous, key)
+        current_value = get_nested(current, key)
+        if previous_value != current_value:
+            mismatches.append(f"{key}: {previous_value!r} != {current_value!r}")
+    return mismatches
+
+
+def select_resume_rows(
+    previous_rows: list[dict[str, Any]],
+    items: list[dict[str, Any]],
+    *,
+    retry_errors: bool,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """Separa as linhas ja concluidas das perguntas que ainda precisam rodar.
+
+    Em IDs repetidos vale a ultima linha gravada. Com ``retry_errors``, linhas
+    com erro voltam para a fila; se a resposta ja tinha sido gerada e so o juiz
+    falhou, a linha volta como esta e apenas o juiz e refeito.
+    """
+    latest: dict[str, dict[str, Any]] = {}
+    for row in previous_rows:
+        if "id" in row:
+            latest[row["id"]] = row
+    kept = [row for row in latest.values() if row.get("status") == "ok" or not retry_errors]
+    kept_ids = {row["id"] for row in kept}
+    pending = []
+    for item in items:
+        if item["id"] in kept_ids:
+            continue
+        previous = latest.get(item["id"])
+        if previous is not None and previous.get("error_stage") == "judge" and has_generated_answer(previous):
+            pending.append(previous)
+        else:
+            pending.append(item)
+    return kept, pending
+
+
+def merge_resume_rows(
+    items: list[dict[str, Any]],
+    kept_rows: list[dict[str, Any]],
+    new_rows: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    by_id = {row["id"]: row for row in kept_rows}
+    by_id.update({row["id"]: row for row in new_rows})
+    merged = [by_id.pop(item["id"]) for item in items if item["id"] in by_id]
+    # Linhas de perguntas fora da lista atual (ex.: --limit menor) sao preservadas no fim.
+    merged.extend(by_id.values())
+    return merged
+
+
+def rewrite_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as tmp_file:
+        for row in rows:
+            tmp_file.write(json_dumps_compact(row) + "\n")
+    tmp_path.replace(path)
+
+
 def write_run_config(path: Path, payload: dict[str, Any]) -> None:
     path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -463,6 +924,64 @@ def summarize_numeric(values: list[float]) -> dict[str, float | None]:
     }
 
 
+def percentile(values: list[float], q: float) -> float | None:
+    """Percentil com interpolacao linear entre as posicoes vizinhas."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize_latency(values: list[float]) -> dict[str, float | None]:
+    summary = summarize_numeric(values)
+    for q in (50, 90, 95, 99):
+        value = percentile(values, q)
+        summary[f"p{q}"] = round(value, 3) if value is not None else None
+    return summary
+
+
+def numeric_values(rows: list[dict[str, Any]], field: str) -> list[float]:
+    return [
+        float(row[field])
+        for row in rows
+        if isinstance(row.get(field), (int, float)) and not isinstance(row.get(field), bool)
+    ]
+
+
+def summarize_phases(rows: list[dict[str, Any]]) -> dict[str, dict[str, float | None]]:
+    return {phase: summarize_latency(numeric_values(rows, field)) for phase, field in PHASE_FIELDS.items()}
+
+
+def build_phase_timing(
+    rows: list[dict[str, Any]],
+    file_write_seconds: dict[str, list[float]] | None = None,
+) -> dict[str, Any]:
+    """Percentis e totais por fase, geral e por categoria.
+
+    As fases de geracao e juiz medem a chamada inteira; esperas de rate limit,
+    backoff de retry e extracao de sinais sao subconjuntos delas e aparecem
+    separadas para mostrar onde o tempo de parede e gasto.
+    """
+    categories: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        categories.setdefault(str(row.get("category") or ""), []).append(row)
+    file_writes = file_write_seconds or {}
+    return {
+        "phases": summarize_phases(rows),
+        "phase_totals_seconds": {
+            phase: round(sum(numeric_values(rows, field)), 3) for phase, field in PHASE_FIELDS.items()
+        },
+        "by_category": {category: summarize_phases(category_rows) for category, category_rows in sorted(categories.items())},
+        "file_writes": {
+            name: {**summarize_latency(values), "total": round(sum(values), 4)}
+            for name, values in file_writes.items()
+        },
+    }
+
+
 def build_run_summary(
     *,
     executed_at_utc: str,
@@ -474,6 +993,7 @@ def build_run_summary(
     csv_path: Path,
     config_path: Path,
     summary_path: Path,
+    file_write_seconds: dict[str, list[float]] | None = None,
 ) -> dict[str, Any]:
     ok_count = sum(1 for row in rows if row.get("status") == "ok")
     error_count = len(rows) - ok_count
@@ -502,6 +1022,10 @@ def build_run_summary(
         "no": sum(1 for row in rows if row.get("retrieval_has_expected_author") == "no"),
         "unknown": sum(1 for row in rows if row.get("retrieval_has_expected_author") == "unknown"),
     }
+    cache_hit_counts = {
+        "generation": sum(1 for row in rows if row.get("generation_cache_hit") is True),
+        "judge": sum(1 for row in rows if row.get("judge_cache_hit") is True),
+    }
     author_mix_risk_counts = {
         label: sum(1 for row in rows if row.get("retrieval_author_mix_risk") == label)
         for label in ("low", "medium", "high", "unknown")
@@ -516,8 +1040,18 @@ def build_run_summary(
             "error": error_count,
         },
         "scores": summarize_numeric(total_scores),
+        "cache_hits": cache_hit_counts,
         "timing": {
             "question_duration_seconds": summarize_numeric(question_durations),
+            "latency_percentiles": {
+                "question_duration_seconds": summarize_latency(question_durations),
+                "generation_seconds": summarize_latency(numeric_values(rows, "generation_seconds")),
+                "generation_ttft_seconds": summarize_latency(numeric_values(rows, "generation_ttft_seconds")),
+                "generation_tokens_per_second": summarize_latency(
+                    numeric_values(rows, "generation_tokens_per_second")
+                ),
+            },
+            **build_phase_timing(rows, file_write_seconds),
         },
         "retrieval": {
             "chunk_count": summarize_numeric(retrieval_chunk_counts),
@@ -559,6 +1093,8 @@ def judge_answer(
     answer: str,
     max_retries: int,
     initial_backoff: float,
+    cache: ResponseCache | None = None,
+    stats: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
     judge_prompt = build_prompt_from_template(
         template=judge_user_template,
@@ -568,6 +1104,7 @@ def judge_answer(
             "answer": answer,
         },
     )
+    call_stats: dict[str, Any] = {} if stats is None else stats
     response = ask_openwebui(
         base_url=base_url,
         token=token,
@@ -579,6 +1116,8 @@ def judge_answer(
         ],
         max_retries=max_retries,
         initial_backoff=initial_backoff,
+        cache=cache,
+        stats=call_stats,
     )
     parsed = parse_json_object(extract_answer(response))
     adherence_score = coerce_score(parsed.get("adherence_score"), "adherence_score")
@@ -602,9 +1141,244 @@ def judge_answer(
         ),
         "review_notes": review_notes,
         "judge_response": response,
+        "judge_cache_hit": call_stats["cache_hit"],
     }
 
 
+def build_error_row(item: dict[str, Any], exc: Exception, stage: str) -> dict[str, Any]:
+    row = {
+        "id": item["id"],
+        "category": item["category"],
+        "question": item["question"],
+        "answer": "",
+        "status": f"error: {exc}",
+        "error_stage": stage,
+        "response": None,
+        "review_notes": "",
+    }
+    row.update(extract_retrieval_signals(None, item["question"]))
+    return row
+
+
+def has_generated_answer(row: dict[str, Any]) -> bool:
+    return isinstance(row.get("response"), dict)
+
+
+def prepare_row_for_judge(row: dict[str, Any]) -> dict[str, Any]:
+    """Remove a avaliacao anterior de uma linha ja gerada, preservando resposta e retrieval.
+
+    A geracao foi feita em outra execucao: seus tempos passam para `source_<campo>`,
+    de modo que `duration_seconds` e o resumo por fase so contem o juiz desta execucao.
+    """
+    prepared = {key: value for key, value in row.items() if key not in JUDGE_FIELDS}
+    for field in GENERATION_RUN_FIELDS:
+        if field in prepared:
+            prepared[f"source_{field}"] = prepared.pop(field)
+    if has_generated_answer(prepared):
+        prepared["status"] = "ok"
+        prepared.pop("error_stage", None)
+    prepared["judge_seconds"] = 0.0
+    return prepared
+
+
+def generate_answer_row(
+    item: dict[str, Any],
+    *,
+    base_url: str,
+    token: str,
+    model: str,
+    knowledge_id: str,
+    answer_prompt: str,
+    answer_prompt_role: str,
+    max_retries: int,
+    initial_backoff: float,
+    temperature: float | None = None,
+    top_p: float | None = None,
+    max_tokens: int | None = None,
+    seed: int | None = None,
+    rate_limiter: RateLimiter | None = None,
+    cache: ResponseCache | None = None,
+    stream: bool = False,
+    author_lexicon: AuthorLexicon | None = None,
+    retrieve_sources: Callable[[str], list[dict[str, Any]]] | None = None,
+) -> dict[str, Any]:
+    """Gera a resposta de uma pergunta.
+
+    Com ``retrieve_sources`` (recuperacao local), os chunks sao buscados antes
+    da chamada, injetados na conversa e gravados em ``response["sources"]``;
+    o Open WebUI recebe a pergunta sem knowledge anexada.
+    """
+    started_monotonic = time.monotonic()
+    call_stats: dict[str, Any] = {"cache_hit": False}
+    rate_limit_wait_seconds = 0.0
+    signal_extraction_seconds = 0.0
+    local_retrieval_seconds = None
+    local_sources = None
+    try:
+        generation_messages = build_generation_messages(
+            question=item["question"],
+            answer_prompt=answer_prompt,
+            answer_prompt_role=answer_prompt_role,
+        )
+        if retrieve_sources is not None:
+            retrieval_started = time.monotonic()
+            local_sources = retrieve_sources(item["question"])
+            local_retrieval_seconds = round(time.monotonic() - retrieval_started, 4)
+            generation_messages = inject_retrieved_context(generation_messages, local_sources)
+            knowledge_id = ""
+        if rate_limiter is not None:
+            rate_limit_wait_seconds = rate_limiter.wait()
+        response = ask_openwebui(
+            base_url=base_url,
+            token=token,
+            model=model,
+            knowledge_id=knowledge_id,
+            messages=generation_messages,
+            max_retries=max_retries,
+            initial_backoff=initial_backoff,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            seed=seed,
+            cache=cache,
+            stats=call_stats,
+            stream=stream,
+        )
+        if local_sources is not None:
+            response = {**response, "sources": local_sources}
+        row = {
+            "id": item["id"],
+            "category": item["category"],
+            "question": item["question"],
+            "answer": extract_answer(response),
+            "status": "ok",
+            "response": response,
+        }
+        signals_started = time.monotonic()
+        row.update(extract_retrieval_signals(response, item["question"], author_lexicon))
+        signal_extraction_seconds = time.monotonic() - signals_started
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("erro na geracao de %s: %s", item["id"], exc)
+        row = build_error_row(item, exc, "generation")
+    row["generation_cache_hit"] = call_stats["cache_hit"]
+    row["generation_rate_limit_wait_seconds"] = round(rate_limit_wait_seconds, 3)
+    row["generation_retry_wait_seconds"] = call_stats.get("retry_wait_seconds", 0.0)
+    row["signal_extraction_seconds"] = round(signal_extraction_seconds, 4)
+    if retrieve_sources is not None:
+        row["local_retrieval_seconds"] = local_retrieval_seconds
+    row["generation_ttft_seconds"] = call_stats.get("ttft_seconds")
+    row["generation_output_tokens"] = call_stats.get("output_tokens")
+    row["generation_output_tokens_source"] = call_stats.get("output_tokens_source")
+    row["generation_tokens_per_second"] = call_stats.get("tokens_per_second")
+    row["generation_seconds"] = round(time.monotonic() - started_monotonic, 3)
+    return row
+
+
+def judge_row(
+    row: dict[str, Any],
+    *,
+    base_url: str,
+    token: str,
+    model: str,
+    rubric_text: str,
+    judge_system_prompt: str,
+    judge_user_template: str,
+    max_retries: int,
+    initial_backoff: float,
+    rate_limiter: RateLimiter | None = None,
+    cache: ResponseCache | None = None,
+) -> dict[str, Any]:
+    started_monotonic = time.monotonic()
+    judged = dict(row)
+    call_stats: dict[str, Any] = {"cache_hit": False}
+    rate_limit_wait_seconds = 0.0
+    LOGGER.info("avaliando %s com rubrica via modelo %s", row["id"], model)
+    try:
+        if rate_limiter is not None:
+            rate_limit_wait_seconds = rate_limiter.wait()
+        judged.update(
+            judge_answer(
+                base_url=base_url,
+                token=token,
+                model=model,
+                rubric_text=rubric_text,
+                judge_system_prompt=judge_system_prompt,
+                judge_user_template=judge_user_template,
+                question=row["question"],
+                answer=row["answer"],
+                max_retries=max_retries,
+                initial_backoff=initial_backoff,
+                cache=cache,
+                stats=call_stats,
+            )
+        )
+    except Exception as exc:  # noqa: BLE001
+        LOGGER.error("erro na avaliacao de %s: %s", row["id"], exc)
+        judged["status"] = f"error: {exc}"
+        judged["error_stage"] = "judge"
+        judged.setdefault("review_notes", "")
+    judged["judge_rate_limit_wait_seconds"] = round(rate_limit_wait_seconds, 3)
+    judged["judge_retry_wait_seconds"] = call_stats.get("retry_wait_seconds", 0.0)
+    judged["judge_seconds"] = round(time.monotonic() - started_monotonic, 3)
+    return judged
+
+
+def run_eval_pipeline(
+    items: list[dict[str, Any]],
+    *,
+    generate: Any,
+    judge: Any | None,
+    on_row_done: Any,
+    generation_workers: int = 1,
+    judge_workers: int = 1,
+) -> list[dict[str, Any]]:
+    """Executa geracao e avaliacao como estagios independentes.
+
+    Os workers de geracao alimentam a fila do juiz assim que cada resposta fica
+    pronta, de modo que o modelo gerador e o modelo juiz trabalham ao mesmo
+    tempo. ``on_row_done`` e chamado na thread principal, na ordem de conclusao;
+    a lista retornada preserva a ordem de ``items``.
+    """
+    finished: queue.Queue[tuple[int, dict[str, Any]]] = queue.Queue()
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, judge_workers), thread_name_prefix="judge"
+    ) as judge_pool, ThreadPoolExecutor(
+        max_workers=max(1, generation_workers), thread_name_prefix="generation"
+    ) as generation_pool:
+
+        def judge_stage(index: int, row: dict[str, Any]) -> None:
+            try:
+                finished.put((index, judge(row)))
+            except Exception as exc:  # noqa: BLE001
+                # Mantem resposta e tempos da geracao, como judge_row faz.
+                LOGGER.error("erro na avaliacao de %s: %s", row["id"], exc)
+                judged = {**row, "status": f"error: {exc}", "error_stage": "judge"}
+                judged.setdefault("review_notes", "")
+                finished.put((index, judged))
+
+        def generation_stage(index: int, item: dict[str, Any]) -> None:
+            try:
+                row = generate(item)
+            except Exception as exc:  # noqa: BLE001
+                finished.put((index, build_error_row(item, exc, "generation")))
+                return
+            if judge is not None and row.get("status") == "ok" and has_generated_answer(row):
+                judge_pool.submit(judge_stage, index, row)
+            else:
+                finished.put((index, row))
+
+        for index, item in enumerate(items):
+            generation_pool.submit(generation_stage, index, item)
+
+        rows: list[dict[str, Any]] = [{} for _ in items]
+        for _ in items:
+            index, row = finished.get()
+            rows[index] = row
+            on_row_done(index, row)
+    return rows
+
+
 def write_markdown_summary(path: Path, rows: list[dict[str, Any]]) -> None:
     lines = ["# RAG Eval Results", ""]
     for row in rows:
@@ -645,6 +1419,10 @@ def write_markdown_summary(path: Path, rows: list[dict[str, Any]]) -> None:
     path.write_text("\n".join(lines), encoding="utf-8")
 
 
+def csv_value(value: Any) -> Any:
+    return "" if value is None else value
+
+
 def write_csv_template(path: Path, rows: list[dict[str, Any]]) -> None:
     fieldnames = [
         "id",
@@ -659,6 +1437,13 @@ def write_csv_template(path: Path, rows: list[dict[str, Any]]) -> None:
         "hallucination_score",
         "total_score",
         "duration_seconds",
+        "generation_seconds",
+        "generation_ttft_seconds",
+        "generation_output_tokens",
+        "generation_output_tokens_source",
+        "generation_tokens_per_second",
+        "generation_cache_hit",
+        "judge_cache_hit",
         "retrieval_source_entries",
         "retrieval_chunk_count",
         "retrieval_unique_file_count",
@@ -692,6 +1477,13 @@ def write_csv_template(path: Path, rows: list[dict[str, Any]]) -> None:
                     "hallucination_score": row.get("hallucination_score", ""),
                     "total_score": row.get("total_score", ""),
                     "duration_seconds": row.get("duration_seconds", ""),
+                    "generation_seconds": row.get("generation_seconds", ""),
+                    "generation_ttft_seconds": csv_value(row.get("generation_ttft_seconds")),
+                    "generation_output_tokens": csv_value(row.get("generation_output_tokens")),
+                    "generation_output_tokens_source": csv_value(row.get("generation_output_tokens_source")),
+                    "generation_tokens_per_second": csv_value(row.get("generation_tokens_per_second")),
+                    "generation_cache_hit": row.get("generation_cache_hit", ""),
+                    "judge_cache_hit": row.get("judge_cache_hit", ""),
                     "retrieval_source_entries": row.get("retrieval_source_entries", ""),
                     "retrieval_chunk_count": row.get("retrieval_chunk_count", ""),
                     "retrieval_unique_file_count": row.get("retrieval_unique_file_count", ""),
@@ -710,6 +1502,12 @@ def write_csv_template(path: Path, rows: list[dict[str, Any]]) -> None:
 
 
 def main() -> int:
+    # Import dentro de main: local_retrieval importa funcoes deste modulo.
+    try:
+        from scripts.local_retrieval import LocalRetriever, add_rerank_arguments, reranker_from_args
+    except ModuleNotFoundError:
+        from local_retrieval import LocalRetriever, add_rerank_arguments, reranker_from_args
+
     parser = argparse.ArgumentParser(description="Executa perguntas de avaliacao no Open WebUI com RAG.")
     parser.add_argument(
         "--questions-file",
@@ -772,7 +1570,40 @@ def main() -> int:
         "--sleep-between",
         type=float,
         default=3.0,
-        help="Pausa entre perguntas.",
+        help="Intervalo minimo, em segundos, entre os inicios de duas chamadas de geracao.",
+    )
+    parser.add_argument(
+        "--judge-sleep-between",
+        type=float,
+        default=0.0,
+        help="Intervalo minimo, em segundos, entre os inicios de duas chamadas do juiz.",
+    )
+    parser.add_argument(
+        "--generation-workers",
+        type=int,
+        default=1,
+        help="Quantidade de chamadas de geracao executadas em paralelo.",
+    )
+    parser.add_argument(
+        "--judge-workers",
+        type=int,
+        default=1,
+        help="Quantidade de chamadas do juiz executadas em paralelo. O juiz consome as respostas enquanto a geracao continua.",
+    )
+    parser.add_argument(
+        "--judge-only",
+        default="",
+        help="JSONL de uma rodada anterior. Reaplica apenas a rubrica as respostas ja geradas, sem chamar o modelo gerador.",
+    )
+    parser.add_argument(
+        "--resume",
+        default="",
+        help="JSONL de uma rodada interrompida. Continua a mesma rodada, pulando as perguntas ja concluidas.",
+    )
+    parser.add_argument(
+        "--retry-errors",
+        action="store_true",
+        help="Com --resume, executa novamente as perguntas gravadas com status de erro.",
     )
     parser.add_argument(
         "--max-retries",
@@ -810,6 +1641,67 @@ def main() -> int:
         default=env_int("RAG_EVAL_SEED"),
         help="Seed enviada ao modelo gerador, quando suportado. Default: usar `RAG_EVAL_SEED` se definido.",
     )
+    parser.add_argument(
+        "--author-lexicon-file",
+        default="knowledge_openwebui/discursos_chunks.jsonl",
+        help="JSONL de chunks cujo campo nome_autor define os nomes canonicos dos autores. Ignorado se nao existir.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Consome a geracao em streaming (SSE) e registra tempo ate o primeiro token e tokens por segundo.",
+    )
+    parser.add_argument(
+        "--retriever",
+        choices=("openwebui", "local"),
+        default="openwebui",
+        help="Origem dos chunks: knowledge do Open WebUI ou indice local de local_retrieval.py injetado no prompt.",
+    )
+    parser.add_argument(
+        "--local-index-dir",
+        default="knowledge_openwebui/local_index",
+        help="Diretorio do indice local usado com --retriever local.",
+    )
+    parser.add_argument(
+        "--local-mode",
+        choices=("bm25", "vector", "hybrid"),
+        default="hybrid",
+        help="Modo de busca do indice local.",
+    )
+    parser.add_argument(
+        "--local-metadata-filter",
+        action="store_true",
+        help="Restringe a busca local aos autores e ao periodo citados na pergunta antes do ranking.",
+    )
+    parser.add_argument(
+        "--local-top-k",
+        type=int,
+        default=5,
+        help="Quantidade de chunks recuperados localmente por pergunta.",
+    )
+    add_rerank_arguments(parser, prefix="local-")
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reutiliza respostas identicas do gerador e do juiz gravadas em disco por rodadas anteriores.",
+    )
+    parser.add_argument(
+        "--cache-file",
+        default="eval/cache/responses.sqlite3",
+        help="Arquivo SQLite do cache de respostas usado com --cache.",
+    )
+    parser.add_argument(
+        "--cache-ttl-hours",
+        type=float,
+        default=0.0,
+        help="Validade das entradas do cache em horas. 0 = sem expiracao.",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=int,
+        default=20000,
+        help="Quantidade maxima de respostas no cache; as menos usadas recentemente sao descartadas. 0 = sem limite.",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -823,43 +1715,118 @@ def main() -> int:
 
     base_url = require_env("OPENWEBUI_URL").rstrip("/")
     token = require_env("OPENWEBUI_API_KEY")
-    questions_path = (project_root / args.questions_file).resolve()
     rubric_path = (project_root / args.rubric_file).resolve()
     answer_system_prompt_path = (project_root / args.answer_system_prompt_file).resolve()
     judge_system_prompt_path = (project_root / args.judge_system_prompt_file).resolve()
     judge_user_prompt_path = (project_root / args.judge_user_prompt_file).resolve()
-    questions = json.loads(questions_path.read_text(encoding="utf-8"))
     rubric_text = rubric_path.read_text(encoding="utf-8")
     answer_system_prompt = load_text(answer_system_prompt_path)
     judge_system_prompt = load_text(judge_system_prompt_path)
     judge_user_template = load_text(judge_user_prompt_path)
     judge_model = args.judge_model.strip() or args.model
-    if args.limit > 0:
-        questions = questions[: args.limit]
 
-    knowledge_id = get_knowledge_id(base_url, token, args.knowledge_name)
-
-    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
-    output_dir = project_root / "eval" / "results"
+    judge_only_path: Path | None = None
+    source_run_config: dict[str, Any] = {}
+    if args.judge_only:
+        if args.no_auto_score:
+            raise SystemExit("--judge-only nao pode ser combinado com --no-auto-score.")
+        judge_only_path = (
+            (project_root / args.judge_only).resolve()
+            if not Path(args.judge_only).is_absolute()
+            else Path(args.judge_only)
+        )
+        items = load_jsonl_rows(judge_only_path)
+        source_config_path = judge_only_path.with_suffix(".run_config.json")
+        if source_config_path.exists():
+            source_run_config = json.loads(source_config_path.read_text(encoding="utf-8"))
+        knowledge_id = str(source_run_config.get("knowledge_id", ""))
+    else:
+        questions_path = (project_root / args.questions_file).resolve()
+        items = json.loads(questions_path.read_text(encoding="utf-8"))
+        knowledge_id = get_knowledge_id(base_url, token, args.knowledge_name) if args.retriever == "openwebui" else ""
+    if args.limit > 0:
+        items = items[: args.limit]
+
+    resume_path: Path | None = None
+    previous_run_config: dict[str, Any] = {}
+    if args.retry_errors and not args.resume:
+        raise SystemExit("--retry-errors so pode ser usado com --resume.")
+    if args.resume:
+        if judge_only_path is not None:
+            raise SystemExit("--resume nao pode ser combinado com --judge-only.")
+        resume_path = (
+            (project_root / args.resume).resolve()
+            if not Path(args.resume).is_absolute()
+            else Path(args.resume)
+        )
+        resume_config_path = resume_path.with_suffix(".run_config.json")
+        if not resume_path.exists() or not resume_config_path.exists():
+            raise SystemExit(f"--resume exige o JSONL e o run_config.json da rodada: {resume_path}")
+        previous_run_config = json.loads(resume_config_path.read_text(encoding="utf-8"))
+
+    if resume_path is not None:
+        ts = str(previous_run_config.get("executed_at_utc", ""))
+        output_dir = resume_path.parent
+        run_stem = resume_path.stem
+    else:
+        ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output_dir = project_root / "eval" / "results"
+        run_stem = f"rag_eval_{ts}"
     output_dir.mkdir(parents=True, exist_ok=True)
-    jsonl_path = output_dir / f"rag_eval_{ts}.jsonl"
-    md_path = output_dir / f"rag_eval_{ts}.md"
-    csv_path = output_dir / f"rag_eval_{ts}.csv"
-    config_path = output_dir / f"rag_eval_{ts}.run_config.json"
-    summary_path = output_dir / f"rag_eval_{ts}.run_summary.json"
+    jsonl_path = output_dir / f"{run_stem}.jsonl"
+    md_path = output_dir / f"{run_stem}.md"
+    csv_path = output_dir / f"{run_stem}.csv"
+    config_path = output_dir / f"{run_stem}.run_config.json"
+    summary_path = output_dir / f"{run_stem}.run_summary.json"
+    cache_path = (
+        (project_root / args.cache_file).resolve()
+        if not Path(args.cache_file).is_absolute()
+        else Path(args.cache_file)
+    )
+    response_cache = (
+        ResponseCache(
+            cache_path,
+            ttl_seconds=args.cache_ttl_hours * 3600,
+            max_entries=args.cache_max_entries,
+        )
+        if args.cache
+        else None
+    )
+    author_lexicon_path = (
+        (project_root / args.author_lexicon_file).resolve()
+        if not Path(args.author_lexicon_file).is_absolute()
+        else Path(args.author_lexicon_file)
+    )
+    author_lexicon: AuthorLexicon | None = None
+    if author_lexicon_path.exists():
+        author_lexicon = AuthorLexicon.from_chunks_jsonl(author_lexicon_path)
+        LOGGER.info("lexico de autores carregado: %s nomes de %s", len(author_lexicon), author_lexicon_path)
+    else:
+        LOGGER.info("lexico de autores ausente (%s); nomes ficam como extraidos do texto", author_lexicon_path)
+
+    local_retriever = None
+    if args.retriever == "local" and judge_only_path is None:
+        local_index_dir = (
+            (project_root / args.local_index_dir).resolve()
+            if not Path(args.local_index_dir).is_absolute()
+            else Path(args.local_index_dir)
+        )
+        local_retriever = LocalRetriever(
+            local_index_dir, reranker=reranker_from_args(args, project_root, prefix="local-")
+        )
+        LOGGER.info("indice local carregado: %s chunks de %s", len(local_retriever), local_index_dir)
 
-    run_config = {
-        "protocol_variant": "A",
-        "executed_at_utc": ts,
-        "openwebui_base_url": base_url,
-        "knowledge_name": args.knowledge_name,
-        "knowledge_id": knowledge_id,
-        "questions_file": {
+    if judge_only_path is not None:
+        questions_file_config = source_run_config.get("questions_file") or {"path": "", "sha256": ""}
+        questions_file_config = {**questions_file_config, "count": len(items)}
+        generator_config = source_run_config.get("generator") or {}
+    else:
+        questions_file_config = {
             "path": str(questions_path),
             "sha256": sha256_file(questions_path),
-            "count": len(questions),
-        },
-        "generator": {
+            "count": len(items),
+        }
+        generator_config = {
             "model": args.model,
             "prompt_file": str(answer_system_prompt_path),
             "prompt_sha256": sha256_file(answer_system_prompt_path),
@@ -873,102 +1840,201 @@ def main() -> int:
             "top_p": args.top_p,
             "max_tokens": args.max_tokens,
             "seed": args.seed,
-        },
+            "stream": args.stream,
+        }
+
+    run_config = {
+        "protocol_variant": "A",
+        "executed_at_utc": ts,
+        "openwebui_base_url": base_url,
+        "knowledge_name": source_run_config.get("knowledge_name", args.knowledge_name)
+        if judge_only_path is not None
+        else args.knowledge_name,
+        "knowledge_id": knowledge_id,
+        "questions_file": questions_file_config,
+        "generator": generator_config,
         "judge": {
             "model": judge_model,
             "system_prompt_file": str(judge_system_prompt_path),
             "system_prompt_sha256": sha256_file(judge_system_prompt_path),
             "user_prompt_file": str(judge_user_prompt_path),
             "user_prompt_sha256": sha256_file(judge_user_prompt_path),
-            "same_model_as_generator": judge_model == args.model,
+            "same_model_as_generator": judge_model == generator_config.get("model", args.model),
             "auto_score_enabled": not args.no_auto_score,
         },
         "rubric": {
             "path": str(rubric_path),
             "sha256": sha256_file(rubric_path),
         },
+        "pipeline": {
+            "generation_workers": args.generation_workers,
+            "judge_workers": args.judge_workers,
+            "generation_min_interval_seconds": args.sleep_between,
+            "judge_min_interval_seconds": args.judge_sleep_between,
+        },
+        "cache": {
+            "enabled": args.cache,
+            "path": str(cache_path) if args.cache else "",
+            "ttl_hours": args.cache_ttl_hours,
+            "max_entries": args.cache_max_entries,
+        },
+        "author_lexicon": {
+            "path": str(author_lexicon_path) if author_lexicon is not None else "",
+            "author_count": len(author_lexicon) if author_lexicon is not None else 0,
+        },
         "knowledge_artifacts": collect_knowledge_artifact_fingerprints(project_root),
     }
+    if local_retriever is not None:
+        run_config["retriever"] = {
+            "backend": "local",
+            "mode": args.local_mode,
+            "top_k": args.local_top_k,
+            "metadata_filter": args.local_metadata_filter,
+            "rerank": local_retriever.reranker.config if local_retriever.reranker is not None else None,
+            "index_dir": str(local_retriever.index_dir),
+            "index_built_at_utc": local_retriever.manifest.get("built_at_utc"),
+            "embedder": local_retriever.embedder_config,
+            "chunk_count": len(local_retriever),
+        }
+    if judge_only_path is not None:
+        run_config["judge_only_source"] = {
+            "jsonl": str(judge_only_path),
+            "sha256": sha256_file(judge_only_path),
+            "run_config": str(source_config_path) if source_run_config else "",
+        }
+
+    kept_rows: list[dict[str, Any]] = []
+    pending_items = items
+    if resume_path is not None:
+        mismatches = run_config_mismatches(previous_run_config, run_config)
+        if mismatches:
+            raise SystemExit(
+                "Configuracao atual difere da rodada a retomar:\n- " + "\n- ".join(mismatches)
+            )
+        kept_rows, pending_items = select_resume_rows(
+            load_jsonl_rows(resume_path, allow_truncated_tail=True),
+            items,
+            retry_errors=args.retry_errors,
+        )
+        LOGGER.info(
+            "retomando %s: %s linhas reaproveitadas, %s perguntas pendentes",
+            resume_path.name,
+            len(kept_rows),
+            len(pending_items),
+        )
+        run_config = {
+            **previous_run_config,
+            "resumes": [
+                *previous_run_config.get("resumes", []),
+                {
+                    "resumed_at_utc": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+                    "retry_errors": args.retry_errors,
+                    "kept_rows": len(kept_rows),
+                    "pending_questions": len(pending_items),
+                    "pipeline": run_config["pipeline"],
+                    "cache": run_config["cache"],
+                },
+            ],
+        }
+        rewrite_jsonl(resume_path, kept_rows)
     write_run_config(config_path, run_config)
 
-    run_started_monotonic = time.monotonic()
-    rows: list[dict[str, Any]] = []
-    with jsonl_path.open("w", encoding="utf-8") as jsonl_file:
-        for index, item in enumerate(questions, start=1):
-            question_started_monotonic = time.monotonic()
-            LOGGER.info("[%s/%s] %s - %s", index, len(questions), item["id"], item["question"])
-            try:
-                generation_messages = build_generation_messages(
-                    question=item["question"],
-                    answer_prompt=answer_system_prompt,
-                    answer_prompt_role=args.answer_prompt_role,
-                )
-                response = ask_openwebui(
-                    base_url=base_url,
-                    token=token,
-                    model=args.model,
-                    knowledge_id=knowledge_id,
-                    messages=generation_messages,
-                    max_retries=args.max_retries,
-                    initial_backoff=args.initial_backoff,
-                    temperature=args.temperature,
-                    top_p=args.top_p,
-                    max_tokens=args.max_tokens,
-                    seed=args.seed,
-                )
-                answer = extract_answer(response)
-                retrieval_signals = extract_retrieval_signals(response, item["question"])
-                row = {
-                    "id": item["id"],
-                    "category": item["category"],
-                    "question": item["question"],
-                    "answer": answer,
-                    "status": "ok",
-                    "response": response,
-                }
-                row.update(retrieval_signals)
-                if not args.no_auto_score:
-                    LOGGER.info("avaliando %s com rubrica via modelo %s", item["id"], judge_model)
-                    judge = judge_answer(
-                        base_url=base_url,
-                        token=token,
-                        model=judge_model,
-                        rubric_text=rubric_text,
-                        judge_system_prompt=judge_system_prompt,
-                        judge_user_template=judge_user_template,
-                        question=item["question"],
-                        answer=answer,
-                        max_retries=args.max_retries,
-                        initial_backoff=args.initial_backoff,
+    generation_limiter = RateLimiter(args.sleep_between)
+    judge_limiter = RateLimiter(args.judge_sleep_between)
+
+    def generate(item: dict[str, Any]) -> dict[str, Any]:
+        if judge_only_path is not None or has_generated_answer(item):
+            return prepare_row_for_judge(item)
+        LOGGER.info("gerando %s - %s", item["id"], item["question"])
+        return generate_answer_row(
+            item,
+            base_url=base_url,
+            token=token,
+            model=args.model,
+            knowledge_id=knowledge_id,
+            answer_prompt=answer_system_prompt,
+            answer_prompt_role=args.answer_prompt_role,
+            max_retries=args.max_retries,
+            initial_backoff=args.initial_backoff,
+            temperature=args.temperature,
+            top_p=args.top_p,
+            max_tokens=args.max_tokens,
+            seed=args.seed,
+            rate_limiter=generation_limiter,
+            cache=response_cache,
+            stream=args.stream,
+            author_lexicon=author_lexicon,
+            retrieve_sources=(
+                (
+                    lambda question: local_retriever.retrieve_sources(
+                        question, args.local_top_k, args.local_mode, args.local_metadata_filter
                     )
-                    row.update(judge)
-            except Exception as exc:  # noqa: BLE001
-                LOGGER.error("erro em %s: %s", item["id"], exc)
-                row = {
-                    "id": item["id"],
-                    "category": item["category"],
-                    "question": item["question"],
-                    "answer": "",
-                    "status": f"error: {exc}",
-                    "response": None,
-                    "review_notes": "",
-                }
-                row.update(extract_retrieval_signals(None, item["question"]))
-            row["duration_seconds"] = round(time.monotonic() - question_started_monotonic, 3)
-            rows.append(row)
+                )
+                if local_retriever is not None
+                else None
+            ),
+        )
+
+    def judge(row: dict[str, Any]) -> dict[str, Any]:
+        return judge_row(
+            row,
+            base_url=base_url,
+            token=token,
+            model=judge_model,
+            rubric_text=rubric_text,
+            judge_system_prompt=judge_system_prompt,
+            judge_user_template=judge_user_template,
+            max_retries=args.max_retries,
+            initial_backoff=args.initial_backoff,
+            rate_limiter=judge_limiter,
+            cache=response_cache,
+        )
+
+    run_started_monotonic = time.monotonic()
+    completed = 0
+    file_write_seconds: dict[str, list[float]] = {"jsonl_row": [], "markdown": [], "csv": []}
+    with jsonl_path.open("a" if resume_path is not None else "w", encoding="utf-8") as jsonl_file:
+
+        def on_row_done(_index: int, row: dict[str, Any]) -> None:
+            nonlocal completed
+            completed += 1
+            row["duration_seconds"] = round(
+                float(row.get("generation_seconds") or 0.0) + float(row.get("judge_seconds") or 0.0),
+                3,
+            )
+            write_started = time.monotonic()
             jsonl_file.write(json_dumps_compact(row) + "\n")
             jsonl_file.flush()
+            file_write_seconds["jsonl_row"].append(time.monotonic() - write_started)
             LOGGER.info(
-                "pergunta %s finalizada com status=%s em %.3fs",
+                "[%s/%s] pergunta %s finalizada com status=%s em %.3fs",
+                completed,
+                len(pending_items),
                 row["id"],
                 row["status"],
                 row["duration_seconds"],
             )
-            if index < len(questions) and args.sleep_between > 0:
-                time.sleep(args.sleep_between)
 
+        new_rows = run_eval_pipeline(
+            pending_items,
+            generate=generate,
+            judge=None if args.no_auto_score else judge,
+            on_row_done=on_row_done,
+            generation_workers=args.generation_workers,
+            judge_workers=args.judge_workers,
+        )
+    if response_cache is not None:
+        response_cache.close()
+    if local_retriever is not None:
+        local_retriever.close()
+    rows = merge_resume_rows(items, kept_rows, new_rows) if resume_path is not None else new_rows
+
+    write_started = time.monotonic()
     write_markdown_summary(md_path, rows)
+    file_write_seconds["markdown"].append(time.monotonic() - write_started)
+    write_started = time.monotonic()
     write_csv_template(csv_path, rows)
+    file_write_seconds["csv"].append(time.monotonic() - write_started)
     finished_at_utc = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     run_summary = build_run_summary(
         executed_at_utc=ts,
@@ -980,6 +2046,7 @@ def main() -> int:
         csv_path=csv_path,
         config_path=config_path,
         summary_path=summary_path,
+        file_write_seconds=file_write_seconds,
     )
     write_run_summary(summary_path, run_summary)
     LOGGER.info(
@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""Avalia apenas a recuperacao da knowledge base, sem geracao nem juiz.
+
+Consulta `/api/v1/retrieval/query/collection` do Open WebUI (ou, com
+`--retriever local`, o indice de `local_retrieval.py`) para cada pergunta e compara os trechos recuperados com `relevant_sources_hint` e
+`expected_authors` do arquivo de perguntas. Gera recall@k, MRR e nDCG por
+pergunta e agregados, alem dos percentis de latencia da consulta. Com rerank
+no indice local, a mesma rodada mede a primeira etapa e o resultado
+reordenado, e o resumo poe o custo de latencia do rerank ao lado do ganho.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import requests
+
+try:
+    from scripts.local_retrieval import LocalRetriever, add_rerank_arguments, reranker_from_args
+    from scripts.run_rag_eval import (
+        api_headers,
+        configure_logging,
+        extract_author_mentions_from_text,
+        get_knowledge_id,
+        load_dotenv,
+        normalize_for_match,
+        require_env,
+        sha256_file,
+        summarize_latency,
+    )
+except ModuleNotFoundError:
+    from local_retrieval import LocalRetriever, add_rerank_arguments, reranker_from_args
+    from run_rag_eval import (
+        api_headers,
+        configure_logging,
+        extract_author_mentions_from_text,
+        get_knowledge_id,
+        load_dotenv,
+        normalize_for_match,
+        require_env,
+        sha256_file,
+        summarize_latency,
+    )
+
+
+LOGGER = logging.getLogger("run_retrieval_eval")
+CHUNK_HEADER_RE = re.compile(r"^## Chunk (\d+)-\d+", re.MULTILINE)
+DEFAULT_CUTOFFS = (1, 3, 5, 10)
+
+
+def parse_cutoffs(raw: str) -> list[int]:
+    cutoffs = sorted({int(item) for item in raw.split(",") if item.strip()})
+    if not cutoffs or cutoffs[0] < 1:
+        raise argparse.ArgumentTypeError("Use inteiros positivos separados por virgula, ex.: 1,3,5,10.")
+    return cutoffs
+
+
+def query_openwebui_collection(
+    *,
+    base_url: str,
+    token: str,
+    knowledge_id: str,
+    query: str,
+    k: int,
+    max_retries: int,
+    initial_backoff: float,
+) -> dict[str, Any]:
+    payload = {"collection_names": [knowledge_id], "query": query, "k": k}
+    attempt = 0
+    while True:
+        try:
+            response = requests.post(
+                f"{base_url}/api/v1/retrieval/query/collection",
+                headers=api_headers(token),
+                json=payload,
+                timeout=120,
+            )
+            if response.status_code in {429, 500, 502, 503, 504}:
+                raise requests.HTTPError(
+                    f"HTTP {response.status_code}: {response.text[:300]}",
+                    response=response,
+                )
+            response.raise_for_status()
+            data = response.json()
+            if not isinstance(data, dict):
+                raise ValueError(
+                    f"Payload inesperado retornado por /api/v1/retrieval/query/collection: {type(data).__name__}"
+                )
+            return data
+        except (requests.RequestException, ValueError) as exc:
+            if attempt >= max_retries:
+                raise
+            delay = initial_backoff * (2**attempt) + random.uniform(0, 1)
+            LOGGER.warning("Falha na consulta (%s). Nova tentativa em %.1fs.", exc, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+def first_result_list(payload: dict[str, Any], key: str) -> list[Any]:
+    """Le o primeiro grupo de resultados no formato do Chroma (listas de listas)."""
+    value = payload.get(key)
+    if not isinstance(value, list) or not value:
+        return []
+    if isinstance(value[0], list):
+        return value[0]
+    return value
+
+
+def normalize_query_hits(payload: dict[str, Any]) -> list[dict[str, Any]]:
+    documents = first_result_list(payload, "documents")
+    metadatas = first_result_list(payload, "metadatas")
+    distances = first_result_list(payload, "distances")
+    hits = []
+    for index, document in enumerate(documents):
+        metadata = metadatas[index] if index < len(metadatas) and isinstance(metadatas[index], dict) else {}
+        score = distances[index] if index < len(distances) else None
+        hits.append(
+            {
+                "rank": index + 1,
+                "document": document if isinstance(document, str) else "",
+                "metadata": metadata,
+                "score": float(score) if isinstance(score, (int, float)) else None,
+            }
+        )
+    return hits
+
+
+def extract_hit_source_ids(hit: dict[str, Any]) -> list[str]:
+    source_ids = set(CHUNK_HEADER_RE.findall(hit.get("document", "")))
+    metadata = hit.get("metadata") or {}
+    if metadata.get("source_id"):
+        source_ids.add(str(metadata["source_id"]))
+    return sorted(source_ids)
+
+
+def match_expected_authors(mentions: list[str], expected_authors: list[str]) -> list[str]:
+    normalized_mentions = [normalize_for_match(author) for author in mentions]
+    matched = []
+    for expected in expected_authors:
+        normalized_expected = normalize_for_match(expected)
+        if any(
+            normalized_expected in mention or mention in normalized_expected
+            for mention in normalized_mentions
+        ):
+            matched.append(expected)
+    return matched
+
+
+def ranking_metrics(
+    hit_matches: list[list[str]],
+    relevant: list[str],
+    cutoffs: list[int],
+) -> dict[str, float | None]:
+    """Calcula recall@k, MRR e nDCG@k com relevancia binaria.
+
+    ``hit_matches[i]`` lista os itens relevantes encontrados no trecho de
+    posicao ``i + 1``. Um item relevante so conta ganho na primeira posicao em
+    que aparece, para que varios trechos do mesmo discurso nao inflem o nDCG.
+    """
+    metrics: dict[str, float | None] = {}
+    relevant_set = set(relevant)
+    if not relevant_set:
+        metrics["mrr"] = None
+        for k in cutoffs:
+            metrics[f"recall@{k}"] = None
+            metrics[f"ndcg@{k}"] = None
+        return metrics
+
+    seen: set[str] = set()
+    gains: list[int] = []
+    first_relevant_rank = None
+    for rank, matches in enumerate(hit_matches, start=1):
+        new_matches = (set(matches) & relevant_set) - seen
+        gains.append(1 if new_matches else 0)
+        seen.update(new_matches)
+        if new_matches and first_relevant_rank is None:
+            first_relevant_rank = rank
+
+    metrics["mrr"] = round(1 / first_relevant_rank, 4) if first_relevant_rank else 0.0
+    for k in cutoffs:
+        found: set[str] = set()
+        for matches in hit_matches[:k]:
+            found.update(set(matches) & relevant_set)
+        metrics[f"recall@{k}"] = round(len(found) / len(relevant_set), 4)
+        dcg = sum(gain / math.log2(rank + 1) for rank, gain in enumerate(gains[:k], start=1))
+        ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(relevant_set), k) + 1))
+        metrics[f"ndcg@{k}"] = round(dcg / ideal, 4) if ideal else None
+    return metrics
+
+
+def evaluate_question(
+    item: dict[str, Any],
+    hits: list[dict[str, Any]],
+    cutoffs: list[int],
+) -> dict[str, Any]:
+    relevant_sources = [str(value) for value in item.get("relevant_sources_hint") or []]
+    expected_authors = [str(value) for value in item.get("expected_authors") or []]
+
+    source_matches = []
+    author_matches = []
+    ranked_hits = []
+    for hit in hits:
+        source_ids = extract_hit_source_ids(hit)
+        authors = extract_author_mentions_from_text(hit.get("document", ""))
+        matched_authors = match_expected_authors(authors, expected_authors)
+        source_matches.append(source_ids)
+        author_matches.append(matched_authors)
+        ranked_hits.append(
+            {
+                "rank": hit["rank"],
+                "score": hit.get("score"),
+                "source_ids": source_ids,
+                "authors": authors,
+                "relevant_source": bool(set(source_ids) & set(relevant_sources)),
+                "expected_author": bool(matched_authors),
+                "file": hit.get("metadata", {}).get("name") or hit.get("metadata", {}).get("source"),
+            }
+        )
+
+    return {
+        "hit_count": len(hits),
+        "hits_with_source_id": sum(1 for matches in source_matches if matches),
+        "source_metrics": ranking_metrics(source_matches, relevant_sources, cutoffs),
+        "author_metrics": ranking_metrics(author_matches, expected_authors, cutoffs),
+        "hits": ranked_hits,
+    }
+
+
+def average_metrics(rows: list[dict[str, Any]], key: str) -> dict[str, Any]:
+    names: list[str] = []
+    for row in rows:
+        for name in row.get(key) or {}:
+            if name not in names:
+                names.append(name)
+    averaged: dict[str, Any] = {}
+    for name in names:
+        values = [
+            row[key][name]
+            for row in rows
+            if isinstance((row.get(key) or {}).get(name), (int, float))
+        ]
+        averaged[name] = round(sum(values) / len(values), 4) if values else None
+    averaged["questions"] = sum(
+        1 for row in rows if (row.get(key) or {}).get("mrr") is not None
+    )
+    return averaged
+
+
+def summarize_rerank(rows: list[dict[str, Any]]) -> dict[str, Any] | None:
+    """Compara, nas mesmas perguntas, as metricas da primeira etapa com as do rerank."""
+    rerank_rows = [row for row in rows if "first_stage" in row]
+    if not rerank_rows:
+        return None
+    summary: dict[str, Any] = {
+        "questions": len(rerank_rows),
+        "latency_seconds": summarize_latency([row["rerank_seconds"] for row in rerank_rows]),
+        "first_stage_latency_seconds": summarize_latency(
+            [max(0.0, row["retrieval_seconds"] - row["rerank_seconds"]) for row in rerank_rows]
+        ),
+        "cache_hit_rate": round(
+            sum(row["rerank_cache_hits"] for row in rerank_rows)
+            / max(1, sum(row["rerank_candidates"] for row in rerank_rows)),
+            4,
+        ),
+    }
+    for key in ("source_metrics", "author_metrics"):
+        before = average_metrics([row["first_stage"] for row in rerank_rows], key)
+        after = average_metrics(rerank_rows, key)
+        summary[key] = {
+            name: {
+                "first_stage": before[name],
+                "rerank": after.get(name),
+                "gain": (
+                    round(after[name] - before[name], 4)
+                    if isinstance(before[name], (int, float)) and isinstance(after.get(name), (int, float))
+                    else None
+                ),
+            }
+            for name in before
+            if name != "questions"
+        }
+    return summary
+
+
+def build_retrieval_summary(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    ok_rows = [row for row in rows if row.get("status") == "ok"]
+    latencies = [row["retrieval_seconds"] for row in ok_rows]
+    categories: dict[str, list[dict[str, Any]]] = {}
+    for row in ok_rows:
+        categories.setdefault(row.get("category") or "sem_categoria", []).append(row)
+    summary = {
+        "question_count": len(rows),
+        "ok_count": len(ok_rows),
+        "error_count": len(rows) - len(ok_rows),
+        "latency_seconds": summarize_latency(latencies),
+        "source_metrics": average_metrics(ok_rows, "source_metrics"),
+        "author_metrics": average_metrics(ok_rows, "author_metrics"),
+        "by_category": {
+            category: {
+                "questions": len(category_rows),
+                "source_metrics": average_metrics(category_rows, "source_metrics"),
+                "author_metrics": average_metrics(category_rows, "author_metrics"),
+                "latency_seconds": summarize_latency(
+                    [row["retrieval_seconds"] for row in category_rows]
+                ),
+            }
+            for category, category_rows in sorted(categories.items())
+        },
+    }
+    rerank = summarize_rerank(ok_rows)
+    if rerank is not None:
+        summary["rerank"] = rerank
+    return summary
+
+
+def format_metric(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def format_milliseconds(seconds: Any) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f} ms"
+
+
+def write_markdown_summary(path: Path, summary: dict[str, Any], cutoffs: list[int]) -> None:
+    metric_names = ["mrr"] + [f"recall@{k}" for k in cutoffs] + [f"ndcg@{k}" for k in cutoffs]
+    latency = summary["latency_seconds"]
+    lines = [
+        "# Avaliacao de recuperacao",
+        "",
+        f"- Perguntas: {summary['question_count']} (ok: {summary['ok_count']}, erro: {summary['error_count']})",
+        f"- Latencia p50: {format_milliseconds(latency.get('p50'))}",
+        f"- Latencia p95: {format_milliseconds(latency.get('p95'))}",
+    ]
+    retriever = (summary.get("config") or {}).get("retriever") or {}
+    if retriever:
+        details = [retriever["mode"]] if retriever.get("mode") else []
+        if retriever.get("metadata_filter"):
+            details.append("filtro de metadados")
+        if retriever.get("rerank"):
+            details.append(f"rerank {retriever['rerank']['model']} sobre {retriever['rerank']['candidates']} candidatos")
+        label = retriever["backend"] + (f" ({', '.join(details)})" if details else "")
+        lines.append(f"- Recuperador: {label}")
+    lines += [
+        "",
+        "| Grupo | Relevancia | Perguntas | " + " | ".join(metric_names) + " |",
+        "|---|---|---:|" + "---:|" * len(metric_names),
+    ]
+    groups = [("geral", summary)] + list(summary["by_category"].items())
+    for group_name, group in groups:
+        for label, key in (("discurso", "source_metrics"), ("autor", "author_metrics")):
+            metrics = group[key]
+            values = " | ".join(format_metric(metrics.get(name)) for name in metric_names)
+            lines.append(f"| {group_name} | {label} | {metrics.get('questions', 0)} | {values} |")
+    rerank = summary.get("rerank")
+    if rerank:
+        lines += [
+            "",
+            "## Rerank: custo e ganho",
+            "",
+            f"- Perguntas: {rerank['questions']}",
+            f"- Latencia da primeira etapa p50/p95: {format_milliseconds(rerank['first_stage_latency_seconds'].get('p50'))}"
+            f" / {format_milliseconds(rerank['first_stage_latency_seconds'].get('p95'))}",
+            f"- Latencia do rerank p50/p95: {format_milliseconds(rerank['latency_seconds'].get('p50'))}"
+            f" / {format_milliseconds(rerank['latency_seconds'].get('p95'))}",
+            f"- Pares servidos pelo cache: {rerank['cache_hit_rate']:.1%}",
+            "",
+            "| Relevancia | Metrica | Primeira etapa | Com rerank | Ganho |",
+            "|---|---|---:|---:|---:|",
+        ]
+        for label, key in (("discurso", "source_metrics"), ("autor", "author_metrics")):
+            for name in metric_names:
+                values = rerank[key].get(name) or {}
+                gain = values.get("gain")
+                lines.append(
+                    f"| {label} | {name} | {format_metric(values.get('first_stage'))} | "
+                    f"{format_metric(values.get('rerank'))} | {'-' if gain is None else f'{gain:+.3f}'} |"
+                )
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Mede recall@k, MRR, nDCG e latencia da recuperacao no Open WebUI, sem geracao."
+    )
+    parser.add_argument(
+        "--questions-file",
+        default="eval/discursos_questions_v4_200.json",
+        help="Arquivo JSON com as perguntas (usa relevant_sources_hint e expected_authors).",
+    )
+    parser.add_argument(
+        "--knowledge-name",
+        default="Discursos do plenário do Senado 2019-2023",
+        help="Nome da Knowledge Base no Open WebUI.",
+    )
+    parser.add_argument(
+        "--k",
+        type=parse_cutoffs,
+        default=list(DEFAULT_CUTOFFS),
+        help="Cortes de ranking separados por virgula. A consulta pede o maior deles.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=0,
+        help="Quantidade maxima de perguntas a executar. 0 = todas.",
+    )
+    parser.add_argument(
+        "--sleep-between",
+        type=float,
+        default=0.0,
+        help="Pausa, em segundos, entre consultas.",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries para rate limit/erros transitorios.",
+    )
+    parser.add_argument(
+        "--initial-backoff",
+        type=float,
+        default=2.0,
+        help="Backoff inicial em segundos.",
+    )
+    parser.add_argument(
+        "--retriever",
+        choices=("openwebui", "local"),
+        default="openwebui",
+        help="Backend de recuperacao: Open WebUI ou o indice local de local_retrieval.py.",
+    )
+    parser.add_argument(
+        "--local-index-dir",
+        default="knowledge_openwebui/local_index",
+        help="Diretorio do indice local usado com --retriever local.",
+    )
+    parser.add_argument(
+        "--local-mode",
+        choices=("bm25", "vector", "hybrid"),
+        default="hybrid",
+        help="Modo de busca do indice local.",
+    )
+    parser.add_argument(
+        "--local-metadata-filter",
+        action="store_true",
+        help="Restringe a busca local aos autores e ao periodo citados na pergunta antes do ranking.",
+    )
+    add_rerank_arguments(parser, prefix="local-")
+    parser.add_argument("--verbose", action="store_true", help="Ativa logs detalhados.")
+    args = parser.parse_args()
+
+    configure_logging(args.verbose)
+    project_root = Path(__file__).resolve().parents[1]
+    load_dotenv(project_root / ".env")
+    local_retriever = None
+    if args.retriever == "local":
+        local_index_dir = (
+            (project_root / args.local_index_dir).resolve()
+            if not Path(args.local_index_dir).is_absolute()
+            else Path(args.local_index_dir)
+        )
+        local_retriever = LocalRetriever(
+            local_index_dir, reranker=reranker_from_args(args, project_root, prefix="local-")
+        )
+        base_url = ""
+        token = ""
+    else:
+        base_url = require_env("OPENWEBUI_URL").rstrip("/")
+        token = require_env("OPENWEBUI_API_KEY")
+
+    questions_path = (project_root / args.questions_file).resolve()
+    items = json.loads(questions_path.read_text(encoding="utf-8"))
+    if args.limit > 0:
+        items = items[: args.limit]
+    cutoffs = args.k
+    top_k = max(cutoffs)
+
+    knowledge_id = get_knowledge_id(base_url, token, args.knowledge_name) if local_retriever is None else ""
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_dir = project_root / "eval" / "results"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    jsonl_path = output_dir / f"retrieval_eval_{ts}.jsonl"
+    md_path = output_dir / f"retrieval_eval_{ts}.md"
+    summary_path = output_dir / f"retrieval_eval_{ts}.run_summary.json"
+
+    started_monotonic = time.monotonic()
+    rows = []
+    with jsonl_path.open("w", encoding="utf-8") as jsonl_file:
+        for index, item in enumerate(items, start=1):
+            row: dict[str, Any] = {
+                "id": item.get("id"),
+                "category": item.get("category"),
+                "question": item["question"],
+                "expected_authors": item.get("expected_authors") or [],
+                "relevant_sources_hint": item.get("relevant_sources_hint") or [],
+            }
+            query_started = time.monotonic()
+            try:
+                if local_retriever is not None:
+                    payload = local_retriever.query(
+                        item["question"], top_k, args.local_mode, args.local_metadata_filter
+                    )
+                    if "filters" in payload:
+                        row["local_filters"] = payload["filters"]
+                    if "rerank" in payload:
+                        row["rerank_seconds"] = payload["rerank"]["seconds"]
+                        row["rerank_candidates"] = payload["rerank"]["candidates"]
+                        row["rerank_cache_hits"] = payload["rerank"]["cache_hits"]
+                        first_stage = evaluate_question(item, normalize_query_hits(payload["first_stage"]), cutoffs)
+                        row["first_stage"] = {
+                            "source_metrics": first_stage["source_metrics"],
+                            "author_metrics": first_stage["author_metrics"],
+                        }
+                else:
+                    payload = query_openwebui_collection(
+                        base_url=base_url,
+                        token=token,
+                        knowledge_id=knowledge_id,
+                        query=item["question"],
+                        k=top_k,
+                        max_retries=args.max_retries,
+                        initial_backoff=args.initial_backoff,
+                    )
+                row["retrieval_seconds"] = round(time.monotonic() - query_started, 4)
+                row.update(evaluate_question(item, normalize_query_hits(payload), cutoffs))
+                row["status"] = "ok"
+            except Exception as exc:  # noqa: BLE001
+                row["retrieval_seconds"] = round(time.monotonic() - query_started, 4)
+                row["status"] = f"error: {exc}"
+            rows.append(row)
+            jsonl_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            jsonl_file.flush()
+            LOGGER.info(
+                "[%s/%s] %s %s recall@%s=%s (%.2fs)",
+                index,
+                len(items),
+                row["id"],
+                row["status"],
+                top_k,
+                (row.get("source_metrics") or {}).get(f"recall@{top_k}"),
+                row["retrieval_seconds"],
+            )
+            if args.sleep_between > 0 and index < len(items):
+                time.sleep(args.sleep_between)
+
+    summary = build_retrieval_summary(rows)
+    summary["config"] = {
+        "executed_at_utc": ts,
+        "duration_seconds": round(time.monotonic() - started_monotonic, 3),
+        "openwebui_url": base_url,
+        "knowledge_name": args.knowledge_name,
+        "knowledge_id": knowledge_id,
+        "questions_file": {
+            "path": str(questions_path),
+            "sha256": sha256_file(questions_path),
+            "count": len(items),
+        },
+        "cutoffs": cutoffs,
+        "top_k": top_k,
+        "retriever": {"backend": args.retriever},
+    }
+    if local_retriever is not None:
+        summary["config"]["retriever"].update(
+            {
+                "mode": args.local_mode,
+                "metadata_filter": args.local_metadata_filter,
+                "rerank": local_retriever.reranker.config if local_retriever.reranker is not None else None,
+                "index_dir": str(local_retriever.index_dir),
+                "index_built_at_utc": local_retriever.manifest.get("built_at_utc"),
+                "embedder": local_retriever.embedder_config,
+                "chunk_count": len(local_retriever),
+            }
+        )
+        local_retriever.close()
+    summary["artifacts"] = {
+        "jsonl": str(jsonl_path),
+        "markdown": str(md_path),
+        "run_summary": str(summary_path),
+    }
+    summary_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_markdown_summary(md_path, summary, cutoffs)
+
+    LOGGER.info("Resultados em %s", jsonl_path)
+    LOGGER.info("Resumo em %s", summary_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""Simula configuracoes de chunking com o chunker real e mede os chunks gerados.
+
+Para cada combinacao de `--max-words`, `--overlap-words` e `--boundary`, roda
+sobre o corpus o mesmo texto e o mesmo chunker de
+`build_openwebui_knowledge_from_hf.py` (`choose_text`, `normalize_text` e
+`CHUNKERS`). Os chunks sao contados no tokenizador do modelo de embedding, em
+vez da estimativa `caracteres / 4`. O relatorio traz, por configuracao, a
+quantidade exata de chunks, o histograma de tokens por chunk, a fracao acima
+do limite do modelo e as estimativas de custo, tempo e tamanho do indice de
+embeddings. Os lotes de documentos de todas as configuracoes sao distribuidos
+entre processos.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+try:
+    from scripts.build_openwebui_knowledge_from_hf import (
+        CHUNKERS,
+        TEXT_SOURCE_FIELDS,
+        choose_text,
+        normalize_text,
+        resolve_parquet_path,
+    )
+    from scripts.run_rag_eval import configure_logging
+except ModuleNotFoundError:
+    from build_openwebui_knowledge_from_hf import (
+        CHUNKERS,
+        TEXT_SOURCE_FIELDS,
+        choose_text,
+        normalize_text,
+        resolve_parquet_path,
+    )
+    from run_rag_eval import configure_logging
+
+
+LOGGER = logging.getLogger("simulate_chunking")
+DEFAULT_TOKENIZER = "Qwen/Qwen3-Embedding-0.6B"
+TOKEN_BINS = (0, 64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096)
+
+TokenCounter = Callable[[list[str]], np.ndarray]
+_WORKER_COUNTER: TokenCounter | None = None
+
+
+def parse_int_list(raw: str) -> list[int]:
+    values = sorted({int(part) for part in raw.split(",") if part.strip()})
+    if not values or values[0] < 0:
+        raise argparse.ArgumentTypeError("informe inteiros nao negativos separados por virgula")
+    return values
+
+
+def parse_boundaries(raw: str) -> list[str]:
+    values = [part.strip() for part in raw.split(",") if part.strip()]
+    unknown = sorted(set(values) - set(CHUNKERS))
+    if not values or unknown:
+        raise argparse.ArgumentTypeError(f"modos validos: {', '.join(sorted(CHUNKERS))}")
+    return list(dict.fromkeys(values))
+
+
+def load_token_counter(tokenizer: str) -> TokenCounter:
+    """Conta tokens com `tokenizers`; `tokenizer` e um tokenizer.json, um diretorio ou um repo do Hugging Face."""
+    try:
+        from tokenizers import Tokenizer
+    except ModuleNotFoundError as exc:
+        raise RuntimeError("Contagem de tokens requer tokenizers; rode pip install -r requirements.txt.") from exc
+    path = Path(tokenizer)
+    if path.is_dir():
+        path = path / "tokenizer.json"
+    elif not path.is_file():
+        from huggingface_hub import hf_hub_download
+
+        path = Path(hf_hub_download(tokenizer, "tokenizer.json"))
+    loaded = Tokenizer.from_file(str(path))
+    loaded.no_truncation()
+    loaded.no_padding()
+
+    def count(texts: list[str]) -> np.ndarray:
+        encodings = loaded.encode_batch(texts, add_special_tokens=False)
+        return np.fromiter((len(encoding.ids) for encoding in encodings), dtype=np.int64, count=len(texts))
+
+    return count
+
+
+def count_words(texts: list[str]) -> np.ndarray:
+    """Contador usado com `--tokenizer words`: uma palavra por token."""
+    return np.fromiter((len(text.split()) for text in texts), dtype=np.int64, count=len(texts))
+
+
+def token_counter_from_name(tokenizer: str) -> TokenCounter:
+    return count_words if tokenizer == "words" else load_token_counter(tokenizer)
+
+
+def load_documents(parquet_path: Path, limit_rows: int = 0) -> list[str]:
+    """Textos normalizados exatamente como no build da knowledge base, sem os vazios."""
+    available = set(pq.read_schema(parquet_path).names)
+    columns = [field for field, _ in TEXT_SOURCE_FIELDS if field in available]
+    df = pd.read_parquet(parquet_path, columns=columns)
+    if limit_rows > 0:
+        df = df.head(limit_rows)
+    texts = (normalize_text(choose_text(row)[0]) for _, row in df.iterrows())
+    return [text for text in texts if text]
+
+
+def simulate_batch(
+    texts: list[str], config: dict[str, Any], count_tokens: TokenCounter
+) -> dict[str, np.ndarray]:
+    chunker = CHUNKERS[config["boundary"]]
+    chunks_per_document = np.zeros(len(texts), dtype=np.int64)
+    chunks: list[str] = []
+    for position, text in enumerate(texts):
+        document_chunks = chunker(text, config["max_words"], config["overlap_words"])
+        chunks_per_document[position] = len(document_chunks)
+        chunks.extend(document_chunks)
+    return {
+        "chunks_per_document": chunks_per_document,
+        "chunk_words": count_words(chunks),
+        "chunk_tokens": count_tokens(chunks) if chunks else np.zeros(0, dtype=np.int64),
+    }
+
+
+def _init_worker(tokenizer: str) -> None:
+    global _WORKER_COUNTER
+    _WORKER_COUNTER = token_counter_from_name(tokenizer)
+
+
+def _simulate_task(task: tuple[int, list[str], dict[str, Any]]) -> tuple[int, dict[str, np.ndarray]]:
+    position, texts, config = task
+    assert _WORKER_COUNTER is not None
+    return position, simulate_batch(texts, config, _WORKER_COUNTER)
+
+
+def build_configs(max_words: list[int], overlap_words: list[int], boundaries: list[str]) -> list[dict[str, Any]]:
+    sizes = []
+    for size, overlap in itertools.product(max_words, overlap_words):
+        if overlap >= size:
+            LOGGER.warning("Ignorando max_words=%s com overlap_words=%s: a sobreposicao deve ser menor.", size, overlap)
+            continue
+        sizes.append((size, overlap))
+    return [
+        {"boundary": boundary, "max_words": size, "overlap_words": overlap}
+        for boundary in boundaries
+        for size, overlap in sizes
+    ]
+
+
+def token_histogram(tokens: np.ndarray) -> list[dict[str, Any]]:
+    edges = np.array([*TOKEN_BINS, max(int(tokens.max(initial=0)) + 1, TOKEN_BINS[-1] + 1)])
+    counts, _ = np.histogram(tokens, bins=edges)
+    return [
+        {"from": int(edges[index]), "to": int(edges[index + 1]) - 1, "chunks": int(count)}
+        for index, count in enumerate(counts)
+    ]
+
+
+def summarize_config(
+    config: dict[str, Any],
+    arrays: dict[str, np.ndarray],
+    embedding_max_tokens: int,
+    embedding_dim: int,
+    tokens_per_second: float,
+    price_per_million_tokens: float,
+) -> dict[str, Any]:
+    per_document = arrays["chunks_per_document"]
+    tokens = arrays["chunk_tokens"]
+    words = arrays["chunk_words"]
+    chunks = int(len(tokens))
+    total_tokens = int(tokens.sum())
+
+    def quantile(values: np.ndarray, q: float) -> float | None:
+        return round(float(np.quantile(values, q)), 1) if len(values) else None
+
+    return {
+        **config,
+        "documents": int(len(per_document)),
+        "chunks": chunks,
+        "chunks_per_document": round(float(per_document.mean()), 3) if len(per_document) else None,
+        "chunks_per_document_p50": quantile(per_document, 0.5),
+        "chunks_per_document_p95": quantile(per_document, 0.95),
+        "chunks_per_document_max": int(per_document.max(initial=0)),
+        "single_chunk_documents_pct": round(100 * float(np.mean(per_document == 1)), 2) if len(per_document) else None,
+        "words_per_chunk_p50": quantile(words, 0.5),
+        "tokens_total": total_tokens,
+        "tokens_per_chunk_mean": round(total_tokens / chunks, 1) if chunks else None,
+        "tokens_per_chunk_p50": quantile(tokens, 0.5),
+        "tokens_per_chunk_p95": quantile(tokens, 0.95),
+        "tokens_per_chunk_max": int(tokens.max(initial=0)),
+        "tokens_per_word": round(total_tokens / int(words.sum()), 3) if words.sum() else None,
+        "chunks_over_embedding_limit_pct": round(100 * float(np.mean(tokens > embedding_max_tokens)), 2) if chunks else None,
+        "token_histogram": token_histogram(tokens),
+        "embedding_cost_usd": round(total_tokens / 1_000_000 * price_per_million_tokens, 4),
+        "embedding_seconds": round(total_tokens / tokens_per_second, 1) if tokens_per_second > 0 else None,
+        "index_megabytes": round(chunks * embedding_dim * 4 / 1_000_000, 1),
+    }
+
+
+def simulate_chunking(
+    texts: list[str],
+    configs: list[dict[str, Any]],
+    *,
+    tokenizer: str = "words",
+    count_tokens: TokenCounter | None = None,
+    workers: int = 1,
+    batch_size: int = 500,
+) -> list[dict[str, np.ndarray]]:
+    """Arrays por configuracao: chunks por documento e palavras/tokens por chunk.
+
+    Com `count_tokens` (ou `workers=1`) a simulacao roda no processo atual;
+    caso contrario cada processo carrega `tokenizer` uma vez e recebe lotes de
+    `batch_size` documentos de qualquer configuracao.
+    """
+    tasks = [
+        (position, texts[start : start + batch_size], config)
+        for position, config in enumerate(configs)
+        for start in range(0, len(texts), batch_size)
+    ]
+    parts: list[list[dict[str, np.ndarray]]] = [[] for _ in configs]
+    if count_tokens is not None or workers <= 1 or len(tasks) <= 1:
+        counter = count_tokens or token_counter_from_name(tokenizer)
+        for position, batch, config in tasks:
+            parts[position].append(simulate_batch(batch, config, counter))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)), initializer=_init_worker, initargs=(tokenizer,)
+        ) as executor:
+            for position, arrays in executor.map(_simulate_task, tasks):
+                parts[position].append(arrays)
+    keys = ("chunks_per_document", "chunk_words", "chunk_tokens")
+    return [
+        {key: np.concatenate([part[key] for part in config_parts]) if config_parts else np.zeros(0, dtype=np.int64) for key in keys}
+        for config_parts in parts
+    ]
+
+
+def measure_ollama_throughput(texts: list[str], count_tokens: TokenCounter) -> float:
+    """Tokens por segundo do modelo de embedding do Ollama configurado no .env, em uma amostra de chunks."""
+    try:
+        from scripts.local_retrieval import ollama_embedder_from_env
+    except ModuleNotFoundError:
+        from local_retrieval import ollama_embedder_from_env
+
+    embedder = ollama_embedder_from_env()
+    started = time.perf_counter()
+    embedder.embed(texts)
+    elapsed = time.perf_counter() - started
+    return float(count_tokens(texts).sum()) / elapsed if elapsed > 0 else 0.0
+
+
+def format_value(value: Any, digits: int = 2) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:,.{digits}f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    if isinstance(value, int):
+        return f"{value:,}".replace(",", ".")
+    return str(value)
+
+
+def write_markdown_summary(path: Path, report: dict[str, Any]) -> None:
+    columns = [
+        ("boundary", "Fronteira"),
+        ("max_words", "Palavras"),
+        ("overlap_words", "Sobreposicao"),
+        ("chunks", "Chunks"),
+        ("chunks_per_document", "Chunks/doc"),
+        ("single_chunk_documents_pct", "Docs em 1 chunk (%)"),
+        ("tokens_per_chunk_p50", "Tokens p50"),
+        ("tokens_per_chunk_p95", "Tokens p95"),
+        ("chunks_over_embedding_limit_pct", f"> {report['embedding']['max_tokens']} tokens (%)"),
+        ("tokens_total", "Tokens totais"),
+        ("embedding_cost_usd", "Custo (US$)"),
+        ("embedding_seconds", "Tempo (s)"),
+        ("index_megabytes", "Indice (MB)"),
+    ]
+    lines = [
+        "# Simulacao de chunking",
+        "",
+        f"- Documentos: {format_value(report['documents'])}",
+        f"- Tokenizador: `{report['tokenizer']}`",
+        f"- Embedding: dimensao {report['embedding']['dim']}, "
+        f"US$ {report['embedding']['price_per_million_tokens']} por milhao de tokens, "
+        f"{format_value(report['embedding']['tokens_per_second'])} tokens/s",
+        "",
+        "| " + " | ".join(label for _, label in columns) + " |",
+        "|" + "---|" * len(columns),
+    ]
+    for row in report["configs"]:
+        lines.append(
+            "| "
+            + " | ".join(format_value(row[key], 4 if key == "embedding_cost_usd" else 2) for key, _ in columns)
+            + " |"
+        )
+    lines.extend(["", "## Histograma de tokens por chunk", ""])
+    bins = report["configs"][0]["token_histogram"] if report["configs"] else []
+    header = [f"{item['from']}-{item['to']}" for item in bins[:-1]] + [f"{bins[-1]['from']}+"] if bins else []
+    lines.append("| Configuracao | " + " | ".join(header) + " |")
+    lines.append("|" + "---|" * (len(header) + 1))
+    for row in report["configs"]:
+        label = f"{row['boundary']} {row['max_words']}/{row['overlap_words']}"
+        lines.append("| " + label + " | " + " | ".join(str(item["chunks"]) for item in row["token_histogram"]) + " |")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Mede chunks e tokens de varias configuracoes de chunking com o chunker da knowledge base."
+    )
+    parser.add_argument(
+        "--parquet-file",
+        default="",
+        help="Parquet local do corpus. Se vazio, baixa --parquet-path de --repo-id.",
+    )
+    parser.add_argument(
+        "--repo-id",
+        default="fabriciosantana/discursos-senado-legislatura-56",
+        help="Dataset do Hugging Face.",
+    )
+    parser.add_argument(
+        "--parquet-path",
+        default="data/full/discursos_2019-02-01_2023-01-31.parquet",
+        help="Caminho do parquet dentro do dataset.",
+    )
+    parser.add_argument("--limit-rows", type=int, default=0, help="Limite de linhas para testes. 0 = todas.")
+    parser.add_argument(
+        "--max-words",
+        type=parse_int_list,
+        default=[200, 400, 600, 850],
+        help="Tamanhos de chunk, em palavras, separados por virgula.",
+    )
+    parser.add_argument(
+        "--overlap-words",
+        type=parse_int_list,
+        default=[50, 150],
+        help="Sobreposicoes, em palavras, separadas por virgula.",
+    )
+    parser.add_argument(
+        "--boundary",
+        type=parse_boundaries,
+        default=sorted(CHUNKERS),
+        help=f"Modos de fronteira separados por virgula: {', '.join(sorted(CHUNKERS))}.",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        default=DEFAULT_TOKENIZER,
+        help="tokenizer.json, diretorio ou repo do Hugging Face do modelo de embedding; 'words' conta palavras.",
+    )
+    parser.add_argument(
+        "--embedding-max-tokens",
+        type=int,
+        default=512,
+        help="Limite de entrada do modelo de embedding; chunks acima dele seriam truncados.",
+    )
+    parser.add_argument("--embedding-dim", type=int, default=1024, help="Dimensao dos vetores, para o tamanho do indice.")
+    parser.add_argument(
+        "--price-per-million-tokens",
+        type=float,
+        default=0.02,
+        help="Preco do embedding por milhao de tokens, em US$.",
+    )
+    parser.add_argument(
+        "--tokens-per-second",
+        type=float,
+        default=0.0,
+        help="Vazao do embedding, em tokens/s. 0 = sem estimativa de tempo, salvo com --measure-ollama.",
+    )
+    parser.add_argument(
+        "--measure-ollama",
+        type=int,
+        default=0,
+        help="Mede a vazao do Ollama do .env embutindo esta quantidade de chunks da primeira configuracao.",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processos paralelos.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documentos por tarefa.")
+    parser.add_argument("--verbose", action="store_true", help="Ativa logs detalhados.")
+    args = parser.parse_args()
+
+    configure_logging(args.verbose)
+    project_root = Path(__file__).resolve().parents[1]
+    try:
+        from scripts.run_rag_eval import load_dotenv
+    except ModuleNotFoundError:
+        from run_rag_eval import load_dotenv
+    load_dotenv(project_root / ".env")
+
+    configs = build_configs(args.max_words, args.overlap_words, args.boundary)
+    if not configs:
+        raise SystemExit("Nenhuma configuracao valida: overlap_words deve ser menor que max_words.")
+    parquet_path = (
+        Path(args.parquet_file)
+        if args.parquet_file
+        else resolve_parquet_path(repo_id=args.repo_id, parquet_rel_path=args.parquet_path or None)
+    )
+    texts = load_documents(parquet_path, args.limit_rows)
+    LOGGER.info("Documentos com texto: %s; configuracoes: %s", len(texts), len(configs))
+
+    started = time.perf_counter()
+    results = simulate_chunking(
+        texts, configs, tokenizer=args.tokenizer, workers=args.workers, batch_size=args.batch_size
+    )
+    simulation_seconds = time.perf_counter() - started
+
+    tokens_per_second = args.tokens_per_second
+    if args.measure_ollama > 0:
+        count_tokens = token_counter_from_name(args.tokenizer)
+        sample = []
+        for text in texts:
+            sample.extend(CHUNKERS[configs[0]["boundary"]](text, configs[0]["max_words"], configs[0]["overlap_words"]))
+            if len(sample) >= args.measure_ollama:
+                break
+        tokens_per_second = measure_ollama_throughput(sample[: args.measure_ollama], count_tokens)
+        LOGGER.info("Vazao medida no Ollama: %.0f tokens/s", tokens_per_second)
+
+    report = {
+        "parquet": str(parquet_path),
+        "documents": len(texts),
+        "tokenizer": args.tokenizer,
+        "embedding": {
+            "max_tokens": args.embedding_max_tokens,
+            "dim": args.embedding_dim,
+            "price_per_million_tokens": args.price_per_million_tokens,
+            "tokens_per_second": round(tokens_per_second, 1) if tokens_per_second > 0 else None,
+            "tokens_per_second_measured": args.measure_ollama > 0,
+        },
+        "simulation_seconds": round(simulation_seconds, 3),
+        "configs": [
+            summarize_config(
+                config,
+                arrays,
+                args.embedding_max_tokens,
+                args.embedding_dim,
+                tokens_per_second,
+                args.price_per_million_tokens,
+            )
+            for config, arrays in zip(configs, results)
+        ],
+    }
+
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_dir = project_root / "eval" / "results"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    json_path = output_dir / f"chunking_simulation_{ts}.json"
+    md_path = output_dir / f"chunking_simulation_{ts}.md"
+    json_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_markdown_summary(md_path, report)
+    LOGGER.info("Simulacao em %.1fs: %s", simulation_seconds, md_path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
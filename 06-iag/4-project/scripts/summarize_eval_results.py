@@ -6,11 +6,15 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+import warnings
 from datetime import datetime, timezone
 from pathlib import Path
 from statistics import mean
 from typing import Any
 
+import numpy as np
+import pandas as pd
+
 
 def load_csv_rows(path: Path) -> list[dict[str, str]]:
     with path.open(encoding="utf-8", newline="") as csv_file:
@@ -27,7 +31,11 @@ def run_stem_from_csv(path: Path) -> str:
     return path.stem
 
 
-def summarize_run(csv_path: Path, config_path: Path | None) -> dict[str, Any]:
+def summarize_run(
+    csv_path: Path,
+    config_path: Path | None,
+    run_summary_path: Path | None = None,
+) -> dict[str, Any]:
     rows = load_csv_rows(csv_path)
     totals = [int(row["total_score"]) for row in rows if row.get("total_score", "").strip()]
     statuses = sorted({row["execution_status"] for row in rows})
@@ -42,34 +50,278 @@ def summarize_run(csv_path: Path, config_path: Path | None) -> dict[str, Any]:
         "max_total": max(totals) if totals else None,
         "rows": rows,
         "config": load_json(config_path) if config_path and config_path.exists() else {},
+        "run_summary": load_json(run_summary_path) if run_summary_path and run_summary_path.exists() else {},
     }
     return summary
 
 
+def build_score_matrix(run_summaries: list[dict[str, Any]], field: str = "total_score") -> pd.DataFrame:
+    """Matriz pergunta x rodada alinhada por `id`; perguntas ausentes em uma rodada ficam NaN."""
+    frames = []
+    for summary in run_summaries:
+        frame = pd.DataFrame(summary["rows"])
+        if frame.empty or field not in frame.columns:
+            continue
+        frame = frame.drop_duplicates(subset="id", keep="last")
+        frames.append(
+            pd.DataFrame(
+                {
+                    "id": frame["id"],
+                    "category": frame.get("category", ""),
+                    "run": summary["stem"],
+                    "score": pd.to_numeric(frame[field], errors="coerce"),
+                }
+            )
+        )
+    stems = [summary["stem"] for summary in run_summaries]
+    if not frames:
+        return pd.DataFrame(columns=stems, dtype=float)
+    long = pd.concat(frames, ignore_index=True)
+    matrix = long.pivot(index="id", columns="run", values="score").reindex(columns=stems)
+    matrix.attrs["category"] = long.drop_duplicates("id").set_index("id")["category"].to_dict()
+    return matrix
+
+
 def build_variation_table(run_summaries: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    rows_by_run = [summary["rows"] for summary in run_summaries]
+    matrix = build_score_matrix(run_summaries)
+    if matrix.empty:
+        return []
+    categories = matrix.attrs.get("category", {})
+    stats = pd.DataFrame(
+        {
+            "min": matrix.min(axis=1),
+            "max": matrix.max(axis=1),
+            "std": matrix.std(axis=1, ddof=1),
+            "runs": matrix.notna().sum(axis=1),
+        }
+    )
+    stats["spread"] = stats["max"] - stats["min"]
+    varying = stats[stats["spread"] > 0]
+    varying = varying.loc[sorted(varying.index, key=lambda qid: (-varying.at[qid, "spread"], qid))]
+
     variation_rows: list[dict[str, Any]] = []
-    for row_group in zip(*rows_by_run):
-        qid = row_group[0]["id"]
-        category = row_group[0]["category"]
-        scores = [int(row["total_score"]) for row in row_group]
-        if len(set(scores)) == 1:
-            continue
+    for qid, row in varying.iterrows():
+        scores = [None if pd.isna(value) else int(value) for value in matrix.loc[qid].tolist()]
         variation_rows.append(
             {
                 "id": qid,
-                "category": category,
+                "category": categories.get(qid, ""),
                 "scores": scores,
-                "min": min(scores),
-                "max": max(scores),
-                "spread": max(scores) - min(scores),
+                "min": int(row["min"]),
+                "max": int(row["max"]),
+                "spread": int(row["spread"]),
+                "std": round(float(row["std"]), 3) if not pd.isna(row["std"]) else None,
+                "runs": int(row["runs"]),
             }
         )
-    variation_rows.sort(key=lambda item: (-item["spread"], item["id"]))
     return variation_rows
 
 
-def build_markdown(run_summaries: list[dict[str, Any]], variation_rows: list[dict[str, Any]]) -> str:
+def krippendorff_alpha_interval(matrix: np.ndarray) -> float | None:
+    """Alfa de Krippendorff (metrica intervalar) com perguntas nas linhas e rodadas nas colunas.
+
+    Valores ausentes (NaN) sao permitidos; perguntas com menos de dois valores
+    nao entram no calculo.
+    """
+    values = np.asarray(matrix, dtype=float)
+    counts = np.sum(~np.isnan(values), axis=1)
+    pairable = values[counts >= 2]
+    if pairable.size == 0:
+        return None
+    m = np.sum(~np.isnan(pairable), axis=1)
+    sums = np.nansum(pairable, axis=1)
+    squares = np.nansum(pairable**2, axis=1)
+    n = m.sum()
+    observed = np.sum(2 * (m * squares - sums**2) / (m - 1)) / n
+    all_values = pairable[~np.isnan(pairable)]
+    expected = 2 * (n * np.sum(all_values**2) - np.sum(all_values) ** 2) / (n * (n - 1))
+    if expected == 0:
+        return None
+    return float(1 - observed / expected)
+
+
+def icc_two_way_absolute(matrix: np.ndarray) -> float | None:
+    """ICC(2,1) de Shrout e Fleiss: efeitos aleatorios, concordancia absoluta, uma rodada.
+
+    Usa apenas as perguntas presentes em todas as rodadas.
+    """
+    values = np.asarray(matrix, dtype=float)
+    values = values[~np.isnan(values).any(axis=1)]
+    n, k = values.shape if values.ndim == 2 else (0, 0)
+    if n < 2 or k < 2:
+        return None
+    grand_mean = values.mean()
+    ss_rows = k * np.sum((values.mean(axis=1) - grand_mean) ** 2)
+    ss_cols = n * np.sum((values.mean(axis=0) - grand_mean) ** 2)
+    ss_error = np.sum((values - grand_mean) ** 2) - ss_rows - ss_cols
+    ms_rows = ss_rows / (n - 1)
+    ms_cols = ss_cols / (k - 1)
+    ms_error = ss_error / ((n - 1) * (k - 1))
+    denominator = ms_rows + (k - 1) * ms_error + k * (ms_cols - ms_error) / n
+    if denominator == 0:
+        return None
+    return float((ms_rows - ms_error) / denominator)
+
+
+def bootstrap_run_means(
+    matrix: np.ndarray,
+    *,
+    resamples: int = 2000,
+    confidence: float = 0.95,
+    seed: int = 0,
+) -> list[dict[str, float | None]]:
+    """IC bootstrap da media de cada rodada, reamostrando perguntas de forma pareada entre rodadas."""
+    values = np.asarray(matrix, dtype=float)
+    if values.ndim != 2 or values.shape[0] == 0:
+        return []
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, values.shape[0], size=(max(1, resamples), values.shape[0]))
+    with warnings.catch_warnings():
+        # Rodadas sem nenhuma pergunta em uma reamostragem geram "Mean of empty slice".
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sampled_means = np.nanmean(values[indices], axis=1)
+        observed_means = np.nanmean(values, axis=0)
+        alpha = (1 - confidence) / 2
+        lower = np.nanquantile(sampled_means, alpha, axis=0)
+        upper = np.nanquantile(sampled_means, 1 - alpha, axis=0)
+    results = []
+    for column in range(values.shape[1]):
+        mean_value = observed_means[column]
+        results.append(
+            {
+                "mean": None if np.isnan(mean_value) else round(float(mean_value), 3),
+                "ci_low": None if np.isnan(lower[column]) else round(float(lower[column]), 3),
+                "ci_high": None if np.isnan(upper[column]) else round(float(upper[column]), 3),
+                "questions": int(np.sum(~np.isnan(values[:, column]))),
+            }
+        )
+    return results
+
+
+def build_agreement_summary(
+    run_summaries: list[dict[str, Any]],
+    *,
+    resamples: int = 2000,
+    seed: int = 0,
+) -> dict[str, Any]:
+    matrix = build_score_matrix(run_summaries)
+    values = matrix.to_numpy(dtype=float) if not matrix.empty else np.empty((0, len(run_summaries)))
+    alpha = krippendorff_alpha_interval(values) if values.size else None
+    icc = icc_two_way_absolute(values) if values.size else None
+    complete = int((~np.isnan(values)).all(axis=1).sum()) if values.size else 0
+    return {
+        "questions": int(values.shape[0]),
+        "complete_questions": complete,
+        "krippendorff_alpha": None if alpha is None else round(alpha, 3),
+        "icc_2_1": None if icc is None else round(icc, 3),
+        "run_means": dict(
+            zip(
+                [summary["stem"] for summary in run_summaries],
+                bootstrap_run_means(values, resamples=resamples, seed=seed)
+                if values.size
+                else [{} for _ in run_summaries],
+            )
+        ),
+        "resamples": resamples,
+    }
+
+
+def format_percentiles(stats: dict[str, Any] | None, keys: tuple[str, ...]) -> str:
+    if not stats or all(stats.get(key) is None for key in keys):
+        return "-"
+    return " / ".join("-" if stats.get(key) is None else f"{stats[key]:.2f}" for key in keys)
+
+
+def build_phase_timing_lines(run_summaries: list[dict[str, Any]]) -> list[str]:
+    timings = [summary["run_summary"].get("timing", {}) for summary in run_summaries]
+    phases: list[str] = []
+    for timing in timings:
+        for phase in timing.get("phases", {}):
+            if phase not in phases:
+                phases.append(phase)
+    if not phases:
+        return []
+
+    header = "| Fase | " + " | ".join(f"`{summary['stem']}`" for summary in run_summaries) + " |"
+    separator = "|---|" + "---|" * len(run_summaries)
+    lines = [
+        "## Tempo por fase",
+        "",
+        "Cada celula mostra p50 / p90 / p95 / p99 em segundos. Esperas e extracao de sinais estao contidas nas fases de geracao e juiz.",
+        "",
+        header,
+        separator,
+    ]
+    percentile_keys = ("p50", "p90", "p95", "p99")
+    for phase in phases:
+        cells = [format_percentiles(timing.get("phases", {}).get(phase), percentile_keys) for timing in timings]
+        lines.append(f"| `{phase}` | " + " | ".join(cells) + " |")
+
+    lines.extend(["", "Tempo total por fase, em segundos:", "", header, separator])
+    for phase in phases:
+        cells = []
+        for timing in timings:
+            total = timing.get("phase_totals_seconds", {}).get(phase)
+            cells.append("-" if total is None else f"{total:.1f}")
+        lines.append(f"| `{phase}` | " + " | ".join(cells) + " |")
+
+    categories: list[str] = []
+    for timing in timings:
+        for category in timing.get("by_category", {}):
+            if category not in categories:
+                categories.append(category)
+    if categories:
+        lines.extend(
+            [
+                "",
+                "## Tempo por categoria",
+                "",
+                "Cada celula mostra p50 / p95 de geracao e, depois do `|`, p50 / p95 do juiz.",
+                "",
+                "| Categoria | " + " | ".join(f"`{summary['stem']}`" for summary in run_summaries) + " |",
+                separator,
+            ]
+        )
+        for category in categories:
+            cells = []
+            for timing in timings:
+                phases_by_category = timing.get("by_category", {}).get(category, {})
+                generation = format_percentiles(phases_by_category.get("generation"), ("p50", "p95"))
+                judge = format_percentiles(phases_by_category.get("judge"), ("p50", "p95"))
+                cells.append(f"{generation} \\| {judge}")
+            lines.append(f"| `{category}` | " + " | ".join(cells) + " |")
+    lines.append("")
+    return lines
+
+
+def build_agreement_lines(agreement: dict[str, Any]) -> list[str]:
+    lines = [
+        "## Concordancia entre rodadas",
+        "",
+        f"- Perguntas alinhadas por `id`: `{agreement['questions']}` (presentes em todas as rodadas: `{agreement['complete_questions']}`)",
+        f"- Alfa de Krippendorff (intervalar): `{agreement['krippendorff_alpha']}`",
+        f"- ICC(2,1), concordancia absoluta: `{agreement['icc_2_1']}`",
+        "",
+        f"Media do `total_score` por rodada, com IC de 95% por bootstrap pareado ({agreement['resamples']} reamostragens):",
+        "",
+        "| Rodada | Perguntas | Media | IC 95% |",
+        "|---|---|---|---|",
+    ]
+    for stem, stats in agreement["run_means"].items():
+        if not stats:
+            continue
+        lines.append(
+            f"| `{stem}` | `{stats['questions']}` | `{stats['mean']}` | `{stats['ci_low']} - {stats['ci_high']}` |"
+        )
+    lines.append("")
+    return lines
+
+
+def build_markdown(
+    run_summaries: list[dict[str, Any]],
+    variation_rows: list[dict[str, Any]],
+    agreement: dict[str, Any] | None = None,
+) -> str:
     generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ")
     lines = [
         "# Stability Summary",
@@ -109,10 +361,12 @@ def build_markdown(run_summaries: list[dict[str, Any]], variation_rows: list[dic
             f"- Pior media observada: `{min(summary['avg_total'] for summary in run_summaries if summary['avg_total'] is not None)}`",
             f"- Perguntas com variacao entre rodadas: `{len(variation_rows)}`",
             "",
-            "## Variacao por pergunta",
-            "",
         ]
     )
+    if agreement is not None:
+        lines.extend(build_agreement_lines(agreement))
+    lines.extend(build_phase_timing_lines(run_summaries))
+    lines.extend(["## Variacao por pergunta", ""])
 
     if not variation_rows:
         lines.append("- Nenhuma variacao de score entre as rodadas comparadas.")
@@ -121,13 +375,15 @@ def build_markdown(run_summaries: list[dict[str, Any]], variation_rows: list[dic
 
     lines.extend(
         [
-            "| Pergunta | Categoria | Scores | Amplitude |",
-            "|---|---|---|---|",
+            "| Pergunta | Categoria | Scores | Amplitude | Desvio padrao |",
+            "|---|---|---|---|---|",
         ]
     )
     for row in variation_rows:
-        score_text = ", ".join(str(score) for score in row["scores"])
-        lines.append(f"| `{row['id']}` | `{row['category']}` | `{score_text}` | `{row['spread']}` |")
+        score_text = ", ".join("-" if score is None else str(score) for score in row["scores"])
+        lines.append(
+            f"| `{row['id']}` | `{row['category']}` | `{score_text}` | `{row['spread']}` | `{row['std']}` |"
+        )
 
     top_unstable = [row["id"] for row in variation_rows if row["spread"] == max(item["spread"] for item in variation_rows)]
     lines.extend(
@@ -157,6 +413,18 @@ def main() -> int:
         default="",
         help="Arquivo Markdown de saida. Se vazio, usa eval/results/stability_summary_<timestamp>.md",
     )
+    parser.add_argument(
+        "--bootstrap-resamples",
+        type=int,
+        default=2000,
+        help="Reamostragens do bootstrap para o IC da media de cada rodada.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Semente do bootstrap.",
+    )
     args = parser.parse_args()
 
     project_root = Path(__file__).resolve().parents[1]
@@ -166,10 +434,12 @@ def main() -> int:
     for csv_path in csv_paths:
         stem = run_stem_from_csv(csv_path)
         config_path = csv_path.with_suffix(".run_config.json")
-        run_summaries.append(summarize_run(csv_path, config_path))
+        run_summary_path = csv_path.with_suffix(".run_summary.json")
+        run_summaries.append(summarize_run(csv_path, config_path, run_summary_path))
 
     variation_rows = build_variation_table(run_summaries)
-    markdown = build_markdown(run_summaries, variation_rows)
+    agreement = build_agreement_summary(run_summaries, resamples=args.bootstrap_resamples, seed=args.seed)
+    markdown = build_markdown(run_summaries, variation_rows, agreement)
 
     if args.output:
         output_path = (project_root / args.output).resolve() if not Path(args.output).is_absolute() else Path(args.output)
@@ -4,6 +4,7 @@ import pandas as pd
 import pytest
 
 from scripts.build_openwebui_knowledge_from_hf import (
+    chunk_sentences,
     chunk_words,
     choose_text,
     normalize_text,
@@ -45,6 +46,30 @@ def test_chunk_words_rejects_overlap_greater_than_or_equal_to_max_words():
         chunk_words("um dois tres quatro cinco", max_words=3, overlap_words=3)
 
 
+def test_chunk_sentences_packs_whole_sentences_with_sentence_overlap():
+    text = "Um dois tres. Quatro cinco. Seis sete oito! Nove dez?"
+
+    assert chunk_sentences(text, max_words=6, overlap_words=2) == [
+        "Um dois tres. Quatro cinco.",
+        "Quatro cinco. Seis sete oito!",
+        "Nove dez?",
+    ]
+
+
+def test_chunk_sentences_cuts_sentences_longer_than_max_words():
+    text = " ".join(f"w{i}" for i in range(1, 8)) + "."
+
+    assert chunk_sentences(text, max_words=3, overlap_words=1) == [
+        "w1 w2 w3",
+        "w4 w5 w6",
+        "w7.",
+    ]
+
+
+def test_chunk_sentences_returns_empty_for_empty_text():
+    assert chunk_sentences("", max_words=10, overlap_words=2) == []
+
+
 def test_choose_text_prefers_integral_text_and_reports_source():
     row = pd.Series(
         {
@@ -0,0 +1,68 @@
+import argparse
+
+import numpy as np
+import pytest
+
+from scripts.compare_eval_runs import (
+    adjust_p_values,
+    compare_groups,
+    paired_bootstrap,
+    paired_permutation_test,
+    parse_group,
+)
+
+
+def csv_run(stem, scores):
+    return {
+        "stem": stem,
+        "rows": [
+            {"id": qid, "category": "controle", "total_score": str(score), "factual_score": str(min(score, 2))}
+            for qid, score in scores.items()
+        ],
+    }
+
+
+def test_parse_group_reads_name_and_files():
+    assert parse_group("base=a.csv, b.csv") == ("base", ["a.csv", "b.csv"])
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_group("a.csv")
+
+
+def test_adjust_p_values_holm_and_benjamini_hochberg():
+    p_values = [0.01, 0.04, 0.03, 0.20]
+
+    assert adjust_p_values(p_values, "holm") == pytest.approx([0.04, 0.09, 0.09, 0.20])
+    assert adjust_p_values(p_values, "bh") == pytest.approx([0.04, 0.0533333, 0.0533333, 0.20])
+    assert adjust_p_values(p_values, "none") == p_values
+    assert adjust_p_values([], "holm") == []
+
+
+def test_paired_tests_separate_noise_from_consistent_shifts():
+    rng = np.random.default_rng(0)
+    no_change = np.zeros(30)
+    shift = np.full(30, 1.0)
+
+    assert paired_permutation_test(no_change, permutations=1000, rng=rng) == 1.0
+    assert paired_permutation_test(shift, permutations=1000, rng=rng) < 0.01
+    bootstrap = paired_bootstrap(shift + rng.normal(0, 0.1, 30), resamples=1000, rng=rng)
+    assert bootstrap["ci_low"] > 0
+    assert bootstrap["p_value"] < 0.01
+
+
+def test_compare_groups_pairs_questions_by_id_across_group_runs():
+    groups = {
+        "base": [csv_run("r1", {"q1": 8, "q2": 9, "q3": 7}), csv_run("r2", {"q3": 9, "q1": 8, "q2": 9})],
+        "novo": [csv_run("r3", {"q2": 10, "q1": 9, "q4": 10})],
+    }
+
+    results = compare_groups(groups, metrics=("total_score", "factual_score"), resamples=500, seed=1)
+
+    total = results[0]
+    assert (total["group_a"], total["group_b"], total["metric"]) == ("base", "novo", "total_score")
+    assert total["questions"] == 2
+    assert total["mean_a"] == pytest.approx(8.5)
+    assert total["mean_b"] == pytest.approx(9.5)
+    assert total["mean_diff"] == pytest.approx(1.0)
+    assert total["adjusted_p"] >= total["permutation_p"]
+    assert results[1]["mean_diff"] == pytest.approx(0.0)
+
@@ -0,0 +1,115 @@
+import pytest
+
+import scripts.benchmark_openwebui_clients as benchmark_module
+import scripts.import_batches_to_openwebui as import_module
+from scripts.benchmark_openwebui_clients import benchmark_import, write_synthetic_batches
+from scripts.fake_openwebui_server import FakeOpenWebUIState, parse_latency, start_server
+from scripts.import_batches_to_openwebui import (
+    ProcessingFailedError,
+    add_file_to_knowledge_with_retry,
+    upload_file,
+    wait_for_processing,
+)
+from scripts.run_rag_eval import ask_openwebui, extract_answer, extract_retrieval_signals, get_knowledge_id
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    # retry_sleep_seconds soma ate 1s de jitter; nos testes o backoff e zerado.
+    monkeypatch.setattr(import_module, "retry_sleep_seconds", lambda *args: 0.0)
+    monkeypatch.setattr(benchmark_module, "retry_sleep_seconds", lambda *args: 0.0)
+    servers = []
+
+    def start(**options):
+        state = FakeOpenWebUIState(seed=0, **options)
+        server, base_url = start_server(state)
+        servers.append(server)
+        return state, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parse_latency_accepts_known_distributions():
+    assert parse_latency("fixed:0.1") == ("fixed", (0.1,))
+    assert parse_latency("lognormal:-3,0.5") == ("lognormal", (-3.0, 0.5))
+    with pytest.raises(Exception):
+        parse_latency("uniform:0.1")
+
+
+def test_import_flow_polls_until_completed_and_adds_once(fake_server, tmp_path):
+    state, base_url = fake_server(processing_seconds=0.05)
+    file_path = write_synthetic_batches(tmp_path, 1, 100)[0]
+
+    knowledge_id = get_knowledge_id(base_url, "t", state.knowledge_name)
+    file_id = upload_file(base_url, "t", file_path)["id"]
+    assert wait_for_processing(base_url, "t", file_id, timeout_seconds=5, poll_interval=0.01)["status"] == "completed"
+    add_file_to_knowledge_with_retry(base_url, "t", knowledge_id, file_id, 0, 0.0, 0.0)
+
+    snapshot = state.snapshot()
+    assert state.files[file_id]["filename"] == "batch_00001.md"
+    assert snapshot["counters"]["status_pending"] >= 1
+    assert snapshot["knowledge_files"] == 1
+
+
+def test_injected_failures_reach_the_client_retry_paths(fake_server, tmp_path):
+    state, base_url = fake_server(processing_failure_rate=1.0)
+    file_id = upload_file(base_url, "t", write_synthetic_batches(tmp_path, 1, 100)[0])["id"]
+    with pytest.raises(ProcessingFailedError):
+        wait_for_processing(base_url, "t", file_id, timeout_seconds=5, poll_interval=0.01)
+
+    state.rate_limit_rate = 1.0
+    with pytest.raises(RuntimeError, match="api.openai.com/v1/embeddings"):
+        add_file_to_knowledge_with_retry(base_url, "t", state.knowledge_id, file_id, 2, 0.0, 0.0)
+    assert state.snapshot()["counters"]["add_429"] == 3
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_chat_completions_match_client_parsers(fake_server, stream):
+    state, base_url = fake_server()
+    stats = {}
+
+    response = ask_openwebui(
+        base_url=base_url,
+        token="t",
+        model="fake",
+        knowledge_id=state.knowledge_id,
+        messages=[{"role": "user", "content": "O que se diz sobre educacao?"}],
+        max_retries=0,
+        initial_backoff=0.0,
+        stats=stats,
+        stream=stream,
+    )
+
+    assert "[451101-001]" in extract_answer(response)
+    assert extract_retrieval_signals(response, "O que se diz sobre educacao?")["retrieval_chunk_count"] == 3
+    if stream:
+        assert stats["output_tokens_source"] == "usage"
+        assert stats["ttft_seconds"] is not None
+
+
+def test_benchmark_import_is_consistent_under_rate_limits(fake_server, tmp_path):
+    state, base_url = fake_server(rate_limit_rate=0.2)
+    file_paths = write_synthetic_batches(tmp_path, 12, 200)
+
+    result = benchmark_import(
+        base_url,
+        "t",
+        state.knowledge_id,
+        file_paths,
+        workers=4,
+        poll_interval=0.01,
+        timeout_seconds=5,
+        process_failed_retries=1,
+        max_add_retries=8,
+        initial_backoff=0.0,
+        max_backoff=0.0,
+    )
+
+    snapshot = state.snapshot()
+    assert result["files"] == 12
+    assert result["added"] + result["failed"] == 12
+    assert snapshot["knowledge_files"] == result["added"]
+    assert snapshot["knowledge_duplicate_adds"] == 0
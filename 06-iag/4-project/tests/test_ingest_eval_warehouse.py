@@ -0,0 +1,65 @@
+import json
+
+from scripts.ingest_eval_warehouse import config_fingerprint, ingest_run, load_warehouse
+
+
+def write_run(results_dir, stem, rows, run_config=None):
+    jsonl_path = results_dir / f"{stem}.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(row) for row in rows) + "\n", encoding="utf-8")
+    if run_config is not None:
+        (results_dir / f"{stem}.run_config.json").write_text(json.dumps(run_config), encoding="utf-8")
+    return jsonl_path
+
+
+def test_config_fingerprint_ignores_machine_specific_paths():
+    base = {"knowledge_id": "kid", "generator": {"model": "m", "prompt_file": "/a/p.md"}}
+    moved = {"knowledge_id": "kid", "generator": {"model": "m", "prompt_file": "/b/p.md"}}
+    other_model = {"knowledge_id": "kid", "generator": {"model": "n", "prompt_file": "/a/p.md"}}
+
+    assert config_fingerprint(base) == config_fingerprint(moved)
+    assert config_fingerprint(base) != config_fingerprint(other_model)
+    assert config_fingerprint({}) == ""
+
+
+def test_ingest_run_writes_one_row_per_question_with_shared_schema(tmp_path):
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    warehouse_dir = tmp_path / "warehouse"
+    new_run = write_run(
+        results_dir,
+        "rag_eval_b",
+        [
+            {
+                "id": "q1",
+                "category": "controle",
+                "status": "ok",
+                "answer": "abc",
+                "total_score": 9,
+                "generation_seconds": 1.5,
+                "generation_cache_hit": False,
+                "retrieval_unique_files": ["batch_00001.md"],
+                "response": {"sources": []},
+            },
+            {"id": "q2", "category": "controle", "status": "error: x", "answer": "", "total_score": ""},
+        ],
+        {"executed_at_utc": "20260101T000000Z", "generator": {"model": "m", "temperature": 0.2}},
+    )
+    old_run = write_run(results_dir, "rag_eval_a", [{"id": "q1", "category": "controle", "status": "ok", "answer": "x"}])
+
+    ingest_run(new_run, warehouse_dir)
+    ingest_run(old_run, warehouse_dir)
+    ingest_run(new_run, warehouse_dir)
+    frame = load_warehouse(warehouse_dir)
+
+    assert sorted(path.name for path in warehouse_dir.iterdir()) == ["rag_eval_a.parquet", "rag_eval_b.parquet"]
+    assert list(frame["run"]) == ["rag_eval_a", "rag_eval_b", "rag_eval_b"]
+    row = frame.iloc[1]
+    assert row["generator_model"] == "m"
+    assert row["generator_temperature"] == 0.2
+    assert row["answer_chars"] == 3
+    assert row["total_score"] == 9
+    assert list(row["retrieval_unique_files"]) == ["batch_00001.md"]
+    assert frame["total_score"].isna().tolist() == [True, False, True]
+    assert "response" not in frame.columns
+    assert list(load_warehouse(warehouse_dir, runs=["rag_eval_a"])["id"]) == ["q1"]
+    assert load_warehouse(tmp_path / "vazio").empty
@@ -0,0 +1,194 @@
+import json
+
+import numpy as np
+import pytest
+
+import scripts.local_retrieval as local_retrieval
+from scripts.local_retrieval import (
+    LocalRetriever,
+    OllamaEmbedder,
+    RerankScoreCache,
+    Reranker,
+    build_index,
+    parse_date_hint,
+    tokenize,
+)
+from scripts.run_rag_eval import extract_retrieval_signals
+from scripts.run_retrieval_eval import evaluate_question, normalize_query_hits
+
+
+def chunk(source_id, index, author, text, data="2020-03-10"):
+    return {
+        "chunk_id": f"{source_id}-{index:03d}",
+        "source_id": source_id,
+        "chunk_index": index,
+        "chunk_count": 1,
+        "text_source": "texto_integral",
+        "metadata": {"data": data, "nome_autor": author, "partido": "PT", "uf": "RS", "casa": "SF"},
+        "text": text,
+    }
+
+
+@pytest.fixture
+def chunks_path(tmp_path):
+    records = [
+        chunk("100", 1, "Paulo Paim", "A reforma da previdencia e a capitalizacao prejudicam o trabalhador aposentado."),
+        chunk("200", 1, "Confúcio Moura", "Educacao basica de qualidade exige investimento em professores e escolas."),
+        chunk("300", 1, "Ciro Nogueira", "A concentracao bancaria eleva juros, tarifas e o spread no Brasil."),
+        chunk("300", 2, "Ciro Nogueira", "Os bancos publicos podem reduzir juros com mais concorrencia."),
+    ]
+    path = tmp_path / "discursos_chunks.jsonl"
+    path.write_text("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records), encoding="utf-8")
+    return path
+
+
+def test_tokenize_folds_accents_and_drops_stopwords():
+    assert tokenize("A Educação é o caminho do Brasil") == ["educacao", "caminho", "brasil"]
+
+
+@pytest.mark.parametrize("mode", ["bm25", "vector", "hybrid"])
+def test_query_ranks_matching_chunk_first_in_every_mode(chunks_path, tmp_path, mode):
+    build_index(chunks_path, tmp_path / "index", dim=64)
+    retriever = LocalRetriever(tmp_path / "index")
+
+    payload = retriever.query("capitalizacao da previdencia", 2, mode)
+
+    assert payload["metadatas"][0][0]["chunk_id"] == "100-001"
+    assert isinstance(retriever.posting_docs, np.memmap)
+    retriever.close()
+
+
+def test_local_payload_is_read_by_retrieval_eval_without_adaptation(chunks_path, tmp_path):
+    build_index(chunks_path, tmp_path / "index", embedder="none")
+    retriever = LocalRetriever(tmp_path / "index")
+    item = {"expected_authors": ["Ciro Nogueira"], "relevant_sources_hint": ["300"]}
+
+    result = evaluate_question(item, normalize_query_hits(retriever.query("juros bancos spread", 3, "bm25")), [1, 3])
+
+    assert result["hit_count"] == 2
+    assert result["hits"][0]["source_ids"] == ["300"]
+    assert result["hits"][0]["authors"] == ["Ciro Nogueira"]
+    assert result["source_metrics"]["recall@1"] == 1.0
+    with pytest.raises(ValueError, match="sem embeddings"):
+        retriever.query("juros", 3, "vector")
+    retriever.close()
+
+
+def test_local_sources_count_each_speech_as_a_file(chunks_path, tmp_path):
+    build_index(chunks_path, tmp_path / "index", embedder="none")
+    retriever = LocalRetriever(tmp_path / "index")
+
+    sources = retriever.retrieve_sources("juros bancos previdencia educacao", 4, "bm25")
+    signals = extract_retrieval_signals({"sources": sources}, "O que dizem sobre juros?")
+
+    assert signals["retrieval_unique_file_count"] == 3
+    assert signals["retrieval_unique_files"] == ["100", "200", "300"]
+    assert {item["source"] for item in sources[0]["metadata"]} == {"discursos_chunks.jsonl"}
+
+
+def test_retriever_refuses_index_built_from_another_chunks_file(chunks_path, tmp_path):
+    build_index(chunks_path, tmp_path / "index", embedder="none")
+    with chunks_path.open("a", encoding="utf-8") as jsonl_file:
+        jsonl_file.write(json.dumps(chunk("400", 1, "Outro", "novo texto")) + "\n")
+
+    with pytest.raises(ValueError, match="reconstrua"):
+        LocalRetriever(tmp_path / "index")
+
+
+def test_ollama_embedder_batches_requests_and_normalizes(monkeypatch):
+    calls = []
+
+    class FakeResponse:
+        status_code = 200
+        text = ""
+
+        def __init__(self, size):
+            self.size = size
+
+        def json(self):
+            return {"embeddings": [[3.0, 4.0]] * self.size}
+
+    def fake_post(url, headers, json, timeout):
+        calls.append((url, json["input"]))
+        return FakeResponse(len(json["input"]))
+
+    monkeypatch.setattr(local_retrieval.requests, "post", fake_post)
+    vectors = OllamaEmbedder("http://ollama/", "qwen3-embedding:0.6b", batch_size=2).embed(["a", "b", "c"])
+
+    assert [inputs for _, inputs in calls] == [["a", "b"], ["c"]]
+    assert calls[0][0] == "http://ollama/api/embed"
+    assert vectors == pytest.approx(np.array([[0.6, 0.8]] * 3))
+
+
+def test_parse_date_hint_narrows_months_only_within_a_single_year():
+    assert parse_date_hint("Paulo Paim sobre Previdencia em fevereiro e março de 2019") == (20190201, 20190331)
+    assert parse_date_hint("ao longo de 2019") == (20190101, 20191231)
+    assert parse_date_hint("entre 2019 e 2023, em março") == (20190101, 20231231)
+    assert parse_date_hint("sem periodo") is None
+
+
+def test_metadata_filter_restricts_candidates_to_author_and_period(chunks_path, tmp_path):
+    build_index(chunks_path, tmp_path / "index", dim=64)
+    retriever = LocalRetriever(tmp_path / "index")
+
+    payload = retriever.query("Como Paulo Paim fala sobre juros e bancos?", 3, "hybrid", metadata_filter=True)
+
+    assert payload["filters"]["authors"] == ["Paulo Paim"]
+    assert payload["filters"]["candidates"] == 1
+    assert [meta["nome_autor"] for meta in payload["metadatas"][0]] == ["Paulo Paim"]
+
+    payload = retriever.query("Paulo Paim falou de juros em 2015?", 3, "bm25", metadata_filter=True)
+
+    assert payload["filters"]["fallback"] is True
+    assert payload["metadatas"][0][0]["source_id"] == "300"
+    retriever.close()
+
+
+def test_bm25_scores_skip_postings_outside_the_mask(chunks_path, tmp_path):
+    build_index(chunks_path, tmp_path / "index", dim=64)
+    retriever = LocalRetriever(tmp_path / "index")
+    mask = np.array([False, False, True, False])
+
+    full = retriever.bm25_scores("juros bancos")
+    masked = retriever.bm25_scores("juros bancos", mask)
+
+    assert full[3] > 0
+    assert masked[2] == full[2] > 0
+    assert not masked[~mask].any()
+    retriever.close()
+
+
+def test_reranker_batches_pending_pairs_and_reuses_cached_scores(tmp_path):
+    batches = []
+
+    def scorer(pairs):
+        batches.append([text for _, text in pairs])
+        return np.array([float(len(text)) for _, text in pairs])
+
+    reranker = Reranker(scorer, "fake", batch_size=2, cache=RerankScoreCache(tmp_path / "scores.sqlite3"))
+
+    scores, cache_hits = reranker.score("q", ["ccc", "a", "bb"])
+    assert scores.tolist() == [3.0, 1.0, 2.0]
+    assert cache_hits == 0
+    assert batches == [["a", "bb"], ["ccc"]]
+
+    scores, cache_hits = reranker.score("q", ["bb", "dddd"])
+    assert scores.tolist() == [2.0, 4.0]
+    assert cache_hits == 1
+    assert batches[-1] == ["dddd"]
+    reranker.close()
+
+
+def test_rerank_reorders_candidates_and_keeps_first_stage_order(chunks_path, tmp_path):
+    build_index(chunks_path, tmp_path / "index", embedder="none")
+    # Score artificial que favorece o chunk sobre bancos publicos.
+    reranker = Reranker(lambda pairs: np.array([float("publicos" in text) for _, text in pairs]), "fake", candidates=10)
+    retriever = LocalRetriever(tmp_path / "index", reranker=reranker)
+
+    payload = retriever.query("spread juros tarifas", 1, "bm25")
+
+    assert payload["first_stage"]["metadatas"][0][0]["chunk_id"] == "300-001"
+    assert payload["metadatas"][0][0]["chunk_id"] == "300-002"
+    assert payload["rerank"]["candidates"] == 2
+    assert retriever.retrieve_sources("spread juros tarifas", 1, "bm25")[0]["source"]["rerank"]["candidates"] == 2
+    retriever.close()
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from scripts.replay_eval_signals import replay_file, replay_files
+
+
+def write_run(path, rows):
+    path.write_text("\n".join(json.dumps(row, ensure_ascii=False) for row in rows) + "\n", encoding="utf-8")
+
+
+def sample_row(row_id, **extra):
+    row = {
+        "id": row_id,
+        "category": "controle",
+        "question": "O que Paulo Paim afirma sobre previdencia?",
+        "status": "ok",
+        "answer": "Resposta com [451102-001].",
+        "total_score": 8,
+        "source_focus_score": 2,
+        "factual_score": 2,
+        "hallucination_score": 2,
+        "adherence_score": 2,
+        "response": {
+            "sources": [
+                {
+                    "document": ["- Autor: Paulo Paim\nTexto"],
+                    "metadata": [{"name": "batch_00001.md", "file_id": "f1", "score": 0.4}],
+                }
+            ]
+        },
+    }
+    row.update(extra)
+    return row
+
+
+def test_replay_file_recomputes_signals_and_flags_stale_fields(tmp_path):
+    run_path = tmp_path / "rag_eval_20260101T000000Z.jsonl"
+    write_run(run_path, [sample_row("q1", retrieval_has_expected_author="no"), sample_row("q2", total_score="")])
+    with run_path.open("a", encoding="utf-8") as jsonl_file:
+        jsonl_file.write('{"id": "q3", "trunc')
+
+    records = replay_file(run_path)
+
+    assert [record["id"] for record in records] == ["q1", "q2"]
+    first = records[0]
+    assert first["run"] == "rag_eval_20260101T000000Z"
+    assert first["line"] == 1
+    assert first["retrieval_has_expected_author"] == "yes"
+    assert first["signals_changed"] == ["retrieval_has_expected_author"]
+    assert first["reference_use"] == "correta"
+    assert first["retrieved_chunks"] == 1
+    assert records[1]["total_score"] is None
+
+
+def test_replay_files_consolidates_runs_with_process_pool(tmp_path):
+    write_run(tmp_path / "rag_eval_a.jsonl", [sample_row("q1")])
+    write_run(tmp_path / "rag_eval_b.jsonl", [sample_row("q1"), sample_row("q2", status="error: x", response=None)])
+
+    frame = replay_files(sorted(tmp_path.glob("*.jsonl")), workers=2)
+
+    assert list(frame["run"]) == ["rag_eval_a", "rag_eval_b", "rag_eval_b"]
+    assert list(frame["retrieval_chunk_count"]) == [1, 1, 0]
+    assert list(frame["retrieval_quality"])[-1] == "baixa"
+    frame.to_parquet(tmp_path / "replay.parquet", index=False)
+
+
+def test_replay_file_drops_only_a_truncated_last_line(tmp_path, caplog):
+    path = tmp_path / "rag_eval_cortado.jsonl"
+    write_run(path, [sample_row("q1"), sample_row("q2")])
+    path.write_text(path.read_text(encoding="utf-8") + '{"id": "q3", "ques', encoding="utf-8")
+
+    records = replay_file(path)
+
+    assert [record["id"] for record in records] == ["q1", "q2"]
+    assert "linha 3" in caplog.text
+
+    corrupted = tmp_path / "rag_eval_corrompido.jsonl"
+    lines = path.read_text(encoding="utf-8").splitlines()
+    corrupted.write_text("\n".join([lines[0], lines[2], lines[1]]) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="linha 2"):
+        replay_file(corrupted)
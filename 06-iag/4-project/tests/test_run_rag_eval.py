@@ -3,15 +3,34 @@ import json
 import pytest
 
 from scripts.run_rag_eval import (
+    AuthorLexicon,
+    ResponseCache,
+    ask_openwebui,
     build_generation_messages,
+    build_phase_timing,
     build_prompt_from_template,
     build_run_summary,
     coerce_score,
+    contains_url,
     extract_author_mentions_from_text,
     extract_answer,
     extract_retrieval_signals,
+    judge_row,
+    load_jsonl_rows,
+    merge_resume_rows,
+    normalize_for_match,
     parse_json_object,
+    percentile,
+    prepare_row_for_judge,
+    rebuild_streamed_completion,
+    request_fingerprint,
+    rewrite_jsonl,
+    run_config_mismatches,
+    run_eval_pipeline,
+    select_resume_rows,
+    summarize_latency,
 )
+from scripts import run_rag_eval
 
 
 def test_extract_answer_from_openai_style_payload():
@@ -196,3 +215,496 @@ def test_build_run_summary_aggregates_status_scores_and_timings(tmp_path):
         "duration_seconds": 2.0,
     }
     assert summary["artifacts"]["run_summary"].endswith("run.run_summary.json")
+
+
+def test_run_eval_pipeline_judges_generated_rows_and_preserves_question_order():
+    items = [
+        {"id": "q1", "category": "c", "question": "p1"},
+        {"id": "q2", "category": "c", "question": "p2"},
+        {"id": "q3", "category": "c", "question": "p3"},
+    ]
+    done = []
+
+    def generate(item):
+        if item["id"] == "q2":
+            return {**item, "answer": "", "status": "error: timeout", "response": None}
+        return {**item, "answer": f"r-{item['id']}", "status": "ok", "response": {"choices": []}}
+
+    def judge(row):
+        return {**row, "total_score": 10}
+
+    rows = run_eval_pipeline(
+        items,
+        generate=generate,
+        judge=judge,
+        on_row_done=lambda index, row: done.append((index, row["id"])),
+        generation_workers=2,
+        judge_workers=2,
+    )
+
+    assert [row["id"] for row in rows] == ["q1", "q2", "q3"]
+    assert rows[0]["total_score"] == 10
+    assert "total_score" not in rows[1]
+    assert sorted(done) == [(0, "q1"), (1, "q2"), (2, "q3")]
+
+
+def test_run_eval_pipeline_turns_stage_exceptions_into_error_rows():
+    items = [{"id": "q1", "category": "c", "question": "Pergunta"}]
+
+    def generate(_item):
+        raise RuntimeError("falhou")
+
+    rows = run_eval_pipeline(items, generate=generate, judge=None, on_row_done=lambda *_: None)
+
+    assert rows[0]["status"] == "error: falhou"
+    assert rows[0]["error_stage"] == "generation"
+    assert rows[0]["retrieval_has_expected_author"] == "unknown"
+
+
+def test_run_eval_pipeline_keeps_generated_answer_when_judge_raises():
+    items = [{"id": "q1", "category": "c", "question": "Pergunta"}]
+
+    def generate(item):
+        return {**item, "answer": "resposta", "status": "ok", "response": {"choices": []}, "generation_seconds": 1.5}
+
+    def judge(_row):
+        raise RuntimeError("juiz caiu")
+
+    rows = run_eval_pipeline(items, generate=generate, judge=judge, on_row_done=lambda *_: None)
+
+    assert rows[0]["status"] == "error: juiz caiu"
+    assert rows[0]["error_stage"] == "judge"
+    assert rows[0]["answer"] == "resposta"
+    assert rows[0]["generation_seconds"] == 1.5
+
+
+def test_prepare_row_for_judge_drops_previous_scores_and_reopens_judge_errors():
+    row = {
+        "id": "q1",
+        "answer": "resposta",
+        "status": "error: judge timeout",
+        "error_stage": "judge",
+        "response": {"choices": []},
+        "total_score": 7,
+        "review_notes": "antiga",
+        "retrieval_chunk_count": 3,
+    }
+
+    prepared = prepare_row_for_judge(row)
+
+    assert prepared["status"] == "ok"
+    assert "error_stage" not in prepared
+    assert "total_score" not in prepared
+    assert "review_notes" not in prepared
+    assert prepared["retrieval_chunk_count"] == 3
+
+
+def test_judge_only_rows_report_no_generation_phase_time():
+    row = {
+        "id": "q1",
+        "category": "c",
+        "answer": "resposta",
+        "status": "ok",
+        "response": {"choices": []},
+        "generation_seconds": 12.5,
+        "generation_ttft_seconds": 1.2,
+        "generation_tokens_per_second": 40.0,
+        "generation_cache_hit": False,
+        "duration_seconds": 15.0,
+    }
+
+    prepared = prepare_row_for_judge(row)
+    prepared["judge_seconds"] = 2.0
+    timing = build_phase_timing([prepared])
+
+    assert prepared["source_generation_seconds"] == 12.5
+    assert "generation_seconds" not in prepared
+    assert timing["phase_totals_seconds"]["generation"] == 0
+    assert timing["phases"]["generation"] == build_phase_timing([])["phases"]["generation"]
+    assert timing["phase_totals_seconds"]["judge"] == 2.0
+
+
+def test_judge_row_keeps_generated_answer_when_judge_fails(monkeypatch):
+    def fake_judge_answer(**_kwargs):
+        raise ValueError("JSON invalido")
+
+    monkeypatch.setattr(run_rag_eval, "judge_answer", fake_judge_answer)
+    row = {"id": "q1", "question": "p", "answer": "resposta", "status": "ok", "response": {}}
+
+    judged = judge_row(
+        row,
+        base_url="http://webui",
+        token="token",
+        model="juiz",
+        rubric_text="",
+        judge_system_prompt="",
+        judge_user_template="",
+        max_retries=0,
+        initial_backoff=0,
+    )
+
+    assert judged["status"] == "error: JSON invalido"
+    assert judged["error_stage"] == "judge"
+    assert judged["answer"] == "resposta"
+    assert row["status"] == "ok"
+
+
+def test_request_fingerprint_ignores_stream_flag_and_tracks_request_fields():
+    payload = {"model": "m", "messages": [{"role": "user", "content": "p"}], "seed": 1}
+
+    base = request_fingerprint("http://webui", {**payload, "stream": False})
+
+    assert base == request_fingerprint("http://webui", {**payload, "stream": True})
+    assert base != request_fingerprint("http://webui", {**payload, "seed": 2})
+    assert base != request_fingerprint("http://outro", payload)
+
+
+def test_response_cache_expires_entries_and_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(run_rag_eval.time, "time", lambda: clock["now"])
+    cache = ResponseCache(tmp_path / "cache.sqlite3", ttl_seconds=60, max_entries=2)
+
+    cache.put("a", {"v": "a"})
+    clock["now"] += 1
+    cache.put("b", {"v": "b"})
+    clock["now"] += 1
+    assert cache.get("a") == {"v": "a"}
+    clock["now"] += 1
+    cache.put("c", {"v": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": "a"}
+    assert len(cache) == 2
+
+    clock["now"] += 120
+    assert cache.get("c") is None
+    cache.close()
+
+
+def test_ask_openwebui_returns_cached_response_without_posting(tmp_path, monkeypatch):
+    class FakeResponse:
+        status_code = 200
+        text = ""
+
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"choices": [{"message": {"content": "resposta"}}]}
+
+    posts = []
+
+    def fake_post(*_args, **kwargs):
+        posts.append(kwargs["json"])
+        return FakeResponse()
+
+    monkeypatch.setattr(run_rag_eval.requests, "post", fake_post)
+    cache = ResponseCache(tmp_path / "cache.sqlite3")
+    kwargs = {
+        "base_url": "http://webui",
+        "token": "token",
+        "model": "m",
+        "knowledge_id": "kid",
+        "messages": [{"role": "user", "content": "p"}],
+        "max_retries": 0,
+        "initial_backoff": 0,
+        "cache": cache,
+    }
+
+    first_stats = {}
+    second_stats = {}
+    first = ask_openwebui(**kwargs, stats=first_stats)
+    second = ask_openwebui(**kwargs, stats=second_stats)
+
+    assert first == second
+    assert len(posts) == 1
+    assert first_stats == {"cache_hit": False, "attempts": 1, "retry_wait_seconds": 0.0}
+    assert second_stats == {"cache_hit": True, "attempts": 0, "retry_wait_seconds": 0.0}
+    cache.close()
+
+
+def test_rebuild_streamed_completion_matches_non_streaming_payload():
+    lines = [
+        b'data: {"sources": [{"source": {"name": "discursos"}, "document": ["trecho"], "metadata": [{}]}]}',
+        b"",
+        b'data: {"id": "c1", "model": "m", "choices": [{"delta": {"role": "assistant"}}]}',
+        b'data: {"choices": [{"delta": {"content": "Ola"}}]}',
+        b": keep-alive",
+        b'data: {"choices": [{"delta": {"content": " mundo"}, "finish_reason": "stop"}]}',
+        b'data: {"choices": [], "usage": {"completion_tokens": 4}}',
+        b"data: [DONE]",
+    ]
+    stats = {}
+
+    payload = rebuild_streamed_completion(lines, 0.0, stats)
+
+    assert extract_answer(payload) == "Ola mundo"
+    assert payload["sources"][0]["document"] == ["trecho"]
+    assert payload["choices"][0]["finish_reason"] == "stop"
+    assert payload["id"] == "c1"
+    assert stats["output_tokens"] == 4
+    assert stats["output_tokens_source"] == "usage"
+    assert stats["ttft_seconds"] is not None
+    assert stats["stream_seconds"] >= stats["ttft_seconds"]
+
+
+def test_rebuild_streamed_completion_counts_chunks_without_usage_and_raises_on_error():
+    stats = {}
+    payload = rebuild_streamed_completion(
+        ['data: {"choices": [{"delta": {"content": "a"}}]}', 'data: {"choices": [{"delta": {"content": "b"}}]}'],
+        0.0,
+        stats,
+    )
+    assert extract_answer(payload) == "ab"
+    assert stats["output_tokens"] == 2
+    assert stats["output_tokens_source"] == "stream_chunks"
+    assert stats["tokens_per_second"] is None
+
+    empty_stats = {}
+    rebuild_streamed_completion(["data: [DONE]"], 0.0, empty_stats)
+    assert empty_stats["ttft_seconds"] is None
+    assert empty_stats["tokens_per_second"] is None
+
+    with pytest.raises(RuntimeError):
+        rebuild_streamed_completion(['data: {"error": {"message": "falhou"}}'], 0.0, {})
+
+
+def test_percentile_interpolates_and_summarize_latency_keeps_base_keys():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    assert percentile([], 50) is None
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 90) == pytest.approx(4.6)
+    assert summarize_latency(values) == {
+        "min": 1.0,
+        "avg": 3.0,
+        "max": 5.0,
+        "p50": 3.0,
+        "p90": 4.6,
+        "p95": 4.8,
+        "p99": 4.96,
+    }
+
+
+def test_ask_openwebui_records_attempts_and_retry_wait(monkeypatch):
+    class FakeResponse:
+        def __init__(self, status_code):
+            self.status_code = status_code
+            self.text = ""
+
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+    responses = [FakeResponse(429), FakeResponse(200)]
+    sleeps = []
+    monkeypatch.setattr(run_rag_eval.requests, "post", lambda *_args, **_kwargs: responses.pop(0))
+    monkeypatch.setattr(run_rag_eval.time, "sleep", sleeps.append)
+    monkeypatch.setattr(run_rag_eval.random, "uniform", lambda _a, _b: 0.5)
+    stats = {}
+
+    ask_openwebui(
+        base_url="http://webui",
+        token="token",
+        model="m",
+        knowledge_id="",
+        messages=[{"role": "user", "content": "p"}],
+        max_retries=2,
+        initial_backoff=2.0,
+        stats=stats,
+    )
+
+    assert sleeps == [2.5]
+    assert stats["attempts"] == 2
+    assert stats["retry_wait_seconds"] == 2.5
+
+
+def test_build_run_summary_reports_phase_percentiles_by_category(tmp_path):
+    rows = [
+        {"id": "q1", "category": "a", "status": "ok", "generation_seconds": 1.0, "judge_seconds": 0.5,
+         "generation_retry_wait_seconds": 0.0, "signal_extraction_seconds": 0.01},
+        {"id": "q2", "category": "a", "status": "ok", "generation_seconds": 3.0, "judge_seconds": 1.5,
+         "generation_retry_wait_seconds": 2.0, "signal_extraction_seconds": 0.03},
+        {"id": "q3", "category": "b", "status": "error: x", "generation_seconds": 5.0,
+         "generation_retry_wait_seconds": 4.0},
+    ]
+
+    summary = build_run_summary(
+        executed_at_utc="20260504T000000Z",
+        finished_at_utc="20260504T000010Z",
+        duration_seconds=10.0,
+        rows=rows,
+        jsonl_path=tmp_path / "run.jsonl",
+        md_path=tmp_path / "run.md",
+        csv_path=tmp_path / "run.csv",
+        config_path=tmp_path / "run.run_config.json",
+        summary_path=tmp_path / "run.run_summary.json",
+        file_write_seconds={"jsonl_row": [0.001, 0.003]},
+    )
+    timing = summary["timing"]
+
+    assert timing["phases"]["generation"]["p50"] == 3.0
+    assert timing["phases"]["judge"]["p90"] == 1.4
+    assert timing["phases"]["judge_retry_wait"]["p50"] is None
+    assert timing["phase_totals_seconds"]["generation_retry_wait"] == 6.0
+    assert timing["by_category"]["a"]["generation"]["p50"] == 2.0
+    assert timing["by_category"]["b"]["judge"]["max"] is None
+    assert timing["file_writes"]["jsonl_row"]["total"] == 0.004
+
+
+def test_run_config_mismatches_reports_changed_fingerprints_only():
+    previous = {
+        "knowledge_id": "kid",
+        "questions_file": {"path": "/a/q.json", "sha256": "q1"},
+        "generator": {"model": "m", "prompt_sha256": "p1", "stream": False},
+        "rubric": {"sha256": "r1"},
+        "pipeline": {"generation_workers": 1},
+    }
+    current = {
+        "knowledge_id": "kid",
+        "questions_file": {"path": "/b/q.json", "sha256": "q1"},
+        "generator": {"model": "m", "prompt_sha256": "p2", "stream": True},
+        "rubric": {"sha256": "r1"},
+        "pipeline": {"generation_workers": 4},
+    }
+
+    assert run_config_mismatches(previous, current) == ["generator.prompt_sha256: 'p1' != 'p2'"]
+    assert run_config_mismatches(previous, previous) == []
+
+
+def test_select_resume_rows_skips_finished_ids_and_optionally_retries_errors():
+    items = [{"id": f"q{i}", "category": "c", "question": f"p{i}"} for i in range(1, 6)]
+    previous_rows = [
+        {"id": "q1", "status": "error: timeout", "error_stage": "generation", "response": None},
+        {"id": "q1", "status": "ok", "response": {}},
+        {"id": "q2", "status": "error: 500", "error_stage": "generation", "response": None},
+        {"id": "q3", "status": "error: json", "error_stage": "judge", "response": {"choices": []}, "answer": "a"},
+    ]
+
+    kept, pending = select_resume_rows(previous_rows, items, retry_errors=False)
+    assert [row["id"] for row in kept] == ["q1", "q2", "q3"]
+    assert pending == items[3:]
+
+    kept, pending = select_resume_rows(previous_rows, items, retry_errors=True)
+    assert [row["id"] for row in kept] == ["q1"]
+    assert [row["id"] for row in pending] == ["q2", "q3", "q4", "q5"]
+    assert pending[0] is items[1]
+    assert pending[1]["answer"] == "a"
+
+
+def test_merge_resume_rows_follows_question_order_and_keeps_extra_rows():
+    items = [{"id": "q1"}, {"id": "q2"}, {"id": "q3"}]
+    kept = [{"id": "q9", "status": "ok"}, {"id": "q1", "status": "ok"}, {"id": "q3", "status": "error: x"}]
+    new = [{"id": "q3", "status": "ok"}, {"id": "q2", "status": "ok"}]
+
+    merged = merge_resume_rows(items, kept, new)
+
+    assert [(row["id"], row["status"]) for row in merged] == [
+        ("q1", "ok"),
+        ("q2", "ok"),
+        ("q3", "ok"),
+        ("q9", "ok"),
+    ]
+
+
+def test_rewrite_jsonl_replaces_file_contents(tmp_path):
+    path = tmp_path / "run.jsonl"
+    path.write_text('{"id": "old"}\n{"id": "partial"', encoding="utf-8")
+
+    rewrite_jsonl(path, [{"id": "q1"}, {"id": "q2"}])
+
+    assert [json.loads(line)["id"] for line in path.read_text(encoding="utf-8").splitlines()] == ["q1", "q2"]
+    assert not (tmp_path / "run.jsonl.tmp").exists()
+
+
+def test_load_jsonl_rows_can_drop_a_truncated_last_line(tmp_path):
+    path = tmp_path / "run.jsonl"
+    path.write_text('{"id": "q1"}\n\n{"id": "q2"}\n{"id": "q3", "ans', encoding="utf-8")
+
+    assert [row["id"] for row in load_jsonl_rows(path, allow_truncated_tail=True)] == ["q1", "q2"]
+    with pytest.raises(json.JSONDecodeError):
+        load_jsonl_rows(path)
+
+
+def test_normalize_for_match_strips_accents_case_and_spacing():
+    assert normalize_for_match("  Esperidião   AMIN ") == "esperidiao amin"
+    assert normalize_for_match("Confúcio Moura") == "confucio moura"
+
+
+def test_author_lexicon_reads_names_and_canonicalizes_mentions(tmp_path):
+    chunks_path = tmp_path / "discursos_chunks.jsonl"
+    chunks_path.write_text(
+        "\n".join(
+            [
+                json.dumps({"chunk_id": "1-001", "metadata": {"nome_autor": "Confúcio Moura"}, "text": "x"}, ensure_ascii=False),
+                json.dumps({"chunk_id": "2-001", "metadata": {"nome_autor": "Esperidião Amin"}, "text": "\"nome\""}),
+                json.dumps({"chunk_id": "1-002", "metadata": {"nome_autor": "Confúcio Moura"}, "text": "y"}),
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    lexicon = AuthorLexicon.from_chunks_jsonl(chunks_path)
+    text = "O SR. CONFUCIO MOURA (MDB-RO. Para discursar.) - texto\n- Autor: Paulo Paim"
+
+    assert len(lexicon) == 2
+    assert extract_author_mentions_from_text(text, lexicon) == ["Confúcio Moura", "Paulo Paim"]
+    signals = extract_retrieval_signals(
+        {"sources": [{"document": [text], "metadata": [{"name": "b.md"}]}]},
+        "O que Confucio Moura defende?",
+        lexicon,
+    )
+    assert signals["retrieval_expected_authors"] == ["Confúcio Moura"]
+    assert signals["retrieval_has_expected_author"] == "yes"
+    # Com lexico, "Confucio Moura Neto" nao conta como o autor pedido so por conter o nome.
+    homonym = extract_retrieval_signals(
+        {"sources": [{"document": ["- Autor: Confúcio Moura Neto"], "metadata": [{"name": "b.md"}]}]},
+        "O que Confucio Moura defende?",
+        lexicon,
+    )
+    assert homonym["retrieval_has_expected_author"] == "no"
+
+
+def test_contains_url_walks_nested_metadata():
+    assert contains_url({"source": {"links": ["https://example.test"]}}) is True
+    assert contains_url({"name": "batch.md", "score": 0.5, "tags": ["a"]}) is False
+
+
+def test_generate_answer_row_injects_local_sources_without_knowledge(monkeypatch):
+    sent = []
+
+    def fake_ask_openwebui(**kwargs):
+        sent.append(kwargs)
+        return {"choices": [{"message": {"content": "Paim critica a capitalizacao [100-001]."}}]}
+
+    sources = [
+        {
+            "source": {"type": "local", "name": "discursos_chunks.jsonl"},
+            "document": ["## Chunk 100-001\n- Autor: Paulo Paim\n\nTexto"],
+            "metadata": [{"name": "100", "source": "discursos_chunks.jsonl", "source_id": "100", "score": 0.5}],
+        }
+    ]
+    monkeypatch.setattr(run_rag_eval, "ask_openwebui", fake_ask_openwebui)
+
+    row = run_rag_eval.generate_answer_row(
+        {"id": "q1", "category": "factual", "question": "O que Paulo Paim diz?"},
+        base_url="http://webui",
+        token="t",
+        model="m",
+        knowledge_id="kid",
+        answer_prompt="prompt",
+        answer_prompt_role="system",
+        max_retries=0,
+        initial_backoff=0,
+        retrieve_sources=lambda question: sources,
+    )
+
+    assert sent[0]["knowledge_id"] == ""
+    assert sent[0]["messages"][-1]["content"].startswith('<context>\n<source id="1">\n## Chunk 100-001')
+    assert sent[0]["messages"][-1]["content"].endswith("O que Paulo Paim diz?")
+    assert row["response"]["sources"] == sources
+    assert row["retrieval_chunk_count"] == 1
+    assert row["retrieval_has_expected_author"] == "yes"
+    assert row["local_retrieval_seconds"] is not None
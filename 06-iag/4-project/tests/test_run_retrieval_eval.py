@@ -0,0 +1,128 @@
+import argparse
+
+import pytest
+
+from scripts.run_retrieval_eval import (
+    build_retrieval_summary,
+    evaluate_question,
+    normalize_query_hits,
+    parse_cutoffs,
+    ranking_metrics,
+)
+
+
+def test_parse_cutoffs_sorts_and_rejects_invalid_values():
+    assert parse_cutoffs("10,1,5,5") == [1, 5, 10]
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_cutoffs("0,3")
+
+
+def test_normalize_query_hits_reads_chroma_style_nested_lists():
+    payload = {
+        "documents": [["doc a", "doc b"]],
+        "metadatas": [[{"name": "batch_00001.md"}, None]],
+        "distances": [[0.9, 0.4]],
+    }
+
+    hits = normalize_query_hits(payload)
+
+    assert hits == [
+        {"rank": 1, "document": "doc a", "metadata": {"name": "batch_00001.md"}, "score": 0.9},
+        {"rank": 2, "document": "doc b", "metadata": {}, "score": 0.4},
+    ]
+    assert normalize_query_hits({}) == []
+
+
+def test_ranking_metrics_counts_each_relevant_item_once():
+    metrics = ranking_metrics([[], ["A"], ["A"], ["B"]], ["A", "B"], [1, 3, 4])
+
+    assert metrics["mrr"] == 0.5
+    assert metrics["recall@1"] == 0.0
+    assert metrics["recall@3"] == 0.5
+    assert metrics["recall@4"] == 1.0
+    expected_ndcg = (1 / 1.584962500721156 + 1 / 2.321928094887362) / (1 + 1 / 1.584962500721156)
+    assert metrics["ndcg@4"] == pytest.approx(expected_ndcg, abs=1e-4)
+
+
+def test_ranking_metrics_returns_none_without_relevance_labels():
+    metrics = ranking_metrics([["A"]], [], [1])
+
+    assert metrics == {"mrr": None, "recall@1": None, "ndcg@1": None}
+
+
+def test_evaluate_question_matches_chunk_headers_and_authors():
+    item = {
+        "id": "q001",
+        "expected_authors": ["Ciro Nogueira"],
+        "relevant_sources_hint": ["451286"],
+        "question": "Quais dados Ciro Nogueira apresenta?",
+    }
+    hits = [
+        {"rank": 1, "document": "## Chunk 999-001\n- Autor: Paulo Paim\ntexto", "metadata": {}, "score": 0.8},
+        {"rank": 2, "document": "## Chunk 451286-002\n- Autor: Ciro Nogueira\ntexto", "metadata": {}, "score": 0.7},
+    ]
+
+    result = evaluate_question(item, hits, [1, 2])
+
+    assert result["hits_with_source_id"] == 2
+    assert result["source_metrics"]["mrr"] == 0.5
+    assert result["source_metrics"]["recall@2"] == 1.0
+    assert result["author_metrics"]["recall@1"] == 0.0
+    assert [hit["relevant_source"] for hit in result["hits"]] == [False, True]
+    assert result["hits"][1]["authors"] == ["Ciro Nogueira"]
+
+
+def test_build_retrieval_summary_aggregates_metrics_latency_and_categories():
+    rows = [
+        {
+            "status": "ok",
+            "category": "factual_simple",
+            "retrieval_seconds": 0.2,
+            "source_metrics": {"mrr": 1.0, "recall@5": 1.0},
+            "author_metrics": {"mrr": 1.0, "recall@5": 1.0},
+        },
+        {
+            "status": "ok",
+            "category": "unanswerable",
+            "retrieval_seconds": 0.4,
+            "source_metrics": {"mrr": None, "recall@5": None},
+            "author_metrics": {"mrr": 0.5, "recall@5": 0.0},
+        },
+        {"status": "error: timeout", "category": "factual_simple", "retrieval_seconds": 120.0},
+    ]
+
+    summary = build_retrieval_summary(rows)
+
+    assert summary["ok_count"] == 2
+    assert summary["error_count"] == 1
+    assert summary["latency_seconds"]["p50"] == 0.3
+    assert summary["source_metrics"] == {"mrr": 1.0, "recall@5": 1.0, "questions": 1}
+    assert summary["author_metrics"] == {"mrr": 0.75, "recall@5": 0.5, "questions": 2}
+    assert summary["by_category"]["unanswerable"]["source_metrics"]["questions"] == 0
+    assert "rerank" not in summary
+
+
+def test_build_retrieval_summary_reports_rerank_cost_next_to_gain():
+    rows = [
+        {
+            "status": "ok",
+            "retrieval_seconds": 0.05,
+            "rerank_seconds": 0.04,
+            "rerank_candidates": 10,
+            "rerank_cache_hits": 5,
+            "source_metrics": {"mrr": 1.0, "recall@1": 1.0},
+            "author_metrics": {"mrr": 1.0, "recall@1": 1.0},
+            "first_stage": {
+                "source_metrics": {"mrr": 0.5, "recall@1": 0.0},
+                "author_metrics": {"mrr": 1.0, "recall@1": 1.0},
+            },
+        }
+    ]
+
+    rerank = build_retrieval_summary(rows)["rerank"]
+
+    assert rerank["latency_seconds"]["p50"] == 0.04
+    assert rerank["first_stage_latency_seconds"]["p50"] == pytest.approx(0.01)
+    assert rerank["cache_hit_rate"] == 0.5
+    assert rerank["source_metrics"]["recall@1"] == {"first_stage": 0.0, "rerank": 1.0, "gain": 1.0}
+    assert rerank["author_metrics"]["mrr"]["gain"] == 0.0
@@ -0,0 +1,65 @@
+import numpy as np
+
+from scripts.simulate_chunking import (
+    build_configs,
+    count_words,
+    simulate_chunking,
+    summarize_config,
+    token_histogram,
+)
+
+
+def test_build_configs_skips_overlap_not_smaller_than_size():
+    configs = build_configs([100, 200], [50, 100], ["words"])
+
+    assert configs == [
+        {"boundary": "words", "max_words": 100, "overlap_words": 50},
+        {"boundary": "words", "max_words": 200, "overlap_words": 50},
+        {"boundary": "words", "max_words": 200, "overlap_words": 100},
+    ]
+
+
+def test_simulate_chunking_counts_chunks_with_the_real_chunker():
+    texts = [" ".join(f"w{i}" for i in range(10)), "curto", "tres palavras aqui"]
+    configs = build_configs([4], [1], ["words"])
+
+    [result] = simulate_chunking(texts, configs, count_tokens=count_words, batch_size=2)
+
+    assert result["chunks_per_document"].tolist() == [3, 1, 1]
+    assert result["chunk_words"].tolist() == [4, 4, 4, 1, 3]
+    assert result["chunk_tokens"].tolist() == [4, 4, 4, 1, 3]
+
+
+def test_summarize_config_reports_costs_and_limit_overflow():
+    config = {"boundary": "words", "max_words": 4, "overlap_words": 1}
+    arrays = {
+        "chunks_per_document": np.array([3, 1]),
+        "chunk_words": np.array([4, 4, 4, 2]),
+        "chunk_tokens": np.array([6, 6, 5, 3]),
+    }
+
+    summary = summarize_config(
+        config,
+        arrays,
+        embedding_max_tokens=5,
+        embedding_dim=10,
+        tokens_per_second=10.0,
+        price_per_million_tokens=1_000_000.0,
+    )
+
+    assert summary["chunks"] == 4
+    assert summary["tokens_total"] == 20
+    assert summary["single_chunk_documents_pct"] == 50.0
+    assert summary["chunks_over_embedding_limit_pct"] == 50.0
+    assert summary["tokens_per_word"] == 1.429
+    assert summary["embedding_cost_usd"] == 20.0
+    assert summary["embedding_seconds"] == 2.0
+    assert summary["index_megabytes"] == 0.0
+
+
+def test_token_histogram_keeps_long_chunks_in_last_bin():
+    histogram = token_histogram(np.array([10, 70, 5000]))
+
+    assert histogram[0] == {"from": 0, "to": 63, "chunks": 1}
+    assert histogram[1]["chunks"] == 1
+    assert histogram[-1] == {"from": 4096, "to": 5000, "chunks": 1}
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from scripts.summarize_eval_results import (
+    bootstrap_run_means,
+    build_phase_timing_lines,
+    build_score_matrix,
+    build_variation_table,
+    icc_two_way_absolute,
+    krippendorff_alpha_interval,
+)
+
+
+def run_summary(stem, generation_p50, judge_total):
+    return {
+        "stem": stem,
+        "run_summary": {
+            "timing": {
+                "phases": {
+                    "generation": {"p50": generation_p50, "p90": 2.0, "p95": 2.5, "p99": 3.0},
+                    "judge": {"p50": None, "p90": None, "p95": None, "p99": None},
+                },
+                "phase_totals_seconds": {"generation": 12.34, "judge": judge_total},
+                "by_category": {
+                    "controle": {
+                        "generation": {"p50": generation_p50, "p95": 2.5},
+                        "judge": {"p50": 0.5, "p95": 0.9},
+                    }
+                },
+            }
+        },
+    }
+
+
+def test_build_phase_timing_lines_puts_runs_side_by_side():
+    lines = build_phase_timing_lines([run_summary("r1", 1.0, 4.0), run_summary("r2", 1.5, 0.0)])
+    text = "\n".join(lines)
+
+    assert "| Fase | `r1` | `r2` |" in text
+    assert "| `generation` | 1.00 / 2.00 / 2.50 / 3.00 | 1.50 / 2.00 / 2.50 / 3.00 |" in text
+    assert "| `judge` | - | - |" in text
+    assert "| `judge` | 4.0 | 0.0 |" in text
+    assert "| `controle` | 1.00 / 2.50 \\| 0.50 / 0.90 | 1.50 / 2.50 \\| 0.50 / 0.90 |" in text
+
+
+def test_build_phase_timing_lines_is_empty_for_runs_without_summary():
+    assert build_phase_timing_lines([{"stem": "antiga", "run_summary": {}}]) == []
+
+
+def csv_run(stem, scores):
+    return {
+        "stem": stem,
+        "rows": [
+            {"id": qid, "category": "controle", "total_score": "" if score is None else str(score)}
+            for qid, score in scores.items()
+        ],
+    }
+
+
+def test_build_variation_table_aligns_runs_on_question_id():
+    runs = [
+        csv_run("r1", {"q1": 10, "q2": 8, "q3": 6}),
+        csv_run("r2", {"q3": 6, "q2": 10, "q1": 10}),
+        csv_run("r3", {"q2": 9, "q1": 7}),
+    ]
+
+    rows = build_variation_table(runs)
+
+    assert [row["id"] for row in rows] == ["q1", "q2"]
+    assert rows[0]["scores"] == [10, 10, 7]
+    assert rows[0]["spread"] == 3
+    assert rows[0]["std"] == pytest.approx(1.732, abs=1e-3)
+    assert rows[1]["scores"] == [8, 10, 9]
+    assert build_score_matrix(runs).loc["q3"].tolist()[:2] == [6.0, 6.0]
+
+
+def test_krippendorff_alpha_and_icc_match_reference_values():
+    perfect = np.array([[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+    assert krippendorff_alpha_interval(perfect) == pytest.approx(1.0)
+    assert icc_two_way_absolute(perfect) == pytest.approx(1.0)
+
+    # Exemplo de Shrout e Fleiss (1979), tabela 2: ICC(2,1) = 0.29.
+    shrout_fleiss = np.array(
+        [[9, 2, 5, 8], [6, 1, 3, 2], [8, 4, 6, 8], [7, 1, 2, 6], [10, 5, 6, 9], [6, 2, 4, 7]],
+        dtype=float,
+    )
+    assert icc_two_way_absolute(shrout_fleiss) == pytest.approx(0.29, abs=0.005)
+
+    # Exemplo de Krippendorff (2011), 4 codificadores e 12 unidades: alfa intervalar = 0.849.
+    nan = np.nan
+    krippendorff_example = np.array(
+        [
+            [1, 2, 3, 3, 2, 1, 4, 1, 2, nan, nan, nan],
+            [1, 2, 3, 3, 2, 2, 4, 1, 2, 5, nan, 3],
+            [nan, 3, 3, 3, 2, 3, 4, 2, 2, 5, 1, nan],
+            [1, 2, 3, 3, 2, 4, 4, 1, 2, 5, 1, nan],
+        ]
+    ).T
+    assert krippendorff_alpha_interval(krippendorff_example) == pytest.approx(0.849, abs=0.001)
+
+    with_missing = np.array([[1.0, 1.0, np.nan], [2.0, 3.0, 2.0], [np.nan, 4.0, np.nan]])
+    alpha = krippendorff_alpha_interval(with_missing)
+    assert alpha is not None and alpha < 1
+    assert krippendorff_alpha_interval(np.array([[5.0, 5.0], [5.0, 5.0]])) is None
+
+
+def test_bootstrap_run_means_is_reproducible_and_brackets_the_mean():
+    matrix = np.array([[10, 8], [9, 7], [8, np.nan], [10, 9]], dtype=float)
+
+    first = bootstrap_run_means(matrix, resamples=500, seed=1)
+    second = bootstrap_run_means(matrix, resamples=500, seed=1)
+
+    assert first == second
+    assert first[0]["mean"] == 9.25
+    assert first[1]["questions"] == 3
+    for stats in first:
+        assert stats["ci_low"] <= stats["mean"] <= stats["ci_high"]
@@ -0,0 +1,203 @@
+"""Bootstrap, testes de permutação e placebos para a base analítica do PMM.
+
+Cada estimador do notebook é uma regressão de mínimos quadrados (ponderados)
+do desfecho em ``tratado``, com ou sem covariáveis:
+
+- diferença bruta: ``y ~ tratado``;
+- diferença em mudanças: ``mudanca_taxa_icsap ~ tratado``;
+- ATT ponderado: ``y ~ tratado`` com peso 1 nos tratados e ``e/(1-e)`` nos
+  controles;
+- ajuste por regressão: ``y ~ tratado + covariáveis``.
+
+Em vez de reajustar o modelo réplica a réplica, cada lote de réplicas é
+descrito por uma matriz de pesos (contagens do bootstrap) e uma matriz de
+tratamentos (permutações de ``tratado``). As matrizes ``X'WX`` e ``X'Wy`` de
+todo o lote saem de poucos produtos de matrizes, e os sistemas são resolvidos
+juntos. Os lotes são distribuídos entre processos.
+
+O escore de propensão entra como dado: ele não é reestimado nas réplicas.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+_CONTEXTO: dict | None = None
+
+
+@dataclass(frozen=True)
+class Especificacao:
+    """Um estimador: desfecho, covariáveis e se usa os pesos ATT do escore.
+
+    Com ``placebo=True``, o desfecho é anterior ao tratamento (por exemplo,
+    ``taxa_clinicas_pre``) e um efeito diferente de zero sinaliza
+    desequilíbrio não corrigido, e não efeito do programa.
+    """
+
+    desfecho: str
+    covariaveis: tuple[str, ...] = ()
+    categoricas: tuple[str, ...] = ()
+    ponderado: bool = False
+    placebo: bool = False
+
+
+def _covariaveis(dados: pd.DataFrame, especificacao: Especificacao) -> np.ndarray:
+    partes = [dados[list(especificacao.covariaveis)].astype(float)]
+    if especificacao.categoricas:
+        partes.append(
+            pd.get_dummies(dados[list(especificacao.categoricas)].astype(str), drop_first=True, dtype=float)
+        )
+    Z = pd.concat(partes, axis=1).to_numpy(dtype=float)
+    # Centrar não altera o coeficiente de ``tratado`` e melhora o condicionamento.
+    return Z - Z.mean(axis=0)
+
+
+def _coeficientes(grupo: dict, D: np.ndarray, W: np.ndarray) -> np.ndarray:
+    """Coeficiente de ``tratado`` em cada réplica (linhas) e desfecho (colunas).
+
+    ``D`` e ``W`` têm uma linha por réplica: o tratamento e o peso de cada
+    município. ``X = [1, Z]`` é fixo; só o bloco de ``tratado`` depende da
+    réplica.
+    """
+    G, Y = grupo["G"], grupo["Y"]
+    if grupo["escore"] is not None:
+        chance = grupo["escore"] / (1 - grupo["escore"])
+        W = W * np.where(D == 1, 1.0, chance)
+    WD = W * D
+    n_rep, q, k = len(W), G.shape[1], Y.shape[1]
+
+    A = np.empty((n_rep, q + 1, q + 1))
+    A[:, 1:, 1:] = (W @ grupo["GG"]).reshape(n_rep, q, q)
+    A[:, 0, 1:] = A[:, 1:, 0] = WD @ G
+    A[:, 0, 0] = WD.sum(axis=1)
+    b = np.empty((n_rep, q + 1, k))
+    b[:, 0, :] = WD @ Y
+    b[:, 1:, :] = (W @ grupo["GY"]).reshape(n_rep, q, k)
+
+    # Categoria ausente na reamostra: a dummy vira coluna nula e sai do modelo.
+    diagonal = np.einsum("rii->ri", A)
+    vazias = diagonal == 0
+    diagonal[vazias] = 1.0
+    try:
+        beta = np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        beta = np.linalg.pinv(A) @ b
+    return beta[:, 0, :]
+
+
+def _preparar_contexto(contexto: dict) -> None:
+    global _CONTEXTO
+    _CONTEXTO = contexto
+
+
+def _rodar_lote(tarefa: tuple[str, np.random.SeedSequence, int]) -> list[np.ndarray]:
+    tipo, semente, tamanho = tarefa
+    ctx = _CONTEXTO
+    gerador = np.random.default_rng(semente)
+    d = ctx["d"]
+    if tipo == "bootstrap":
+        # Reamostragem estratificada: cada réplica mantém o número de tratados.
+        W = np.zeros((tamanho, len(d)))
+        for posicoes in (np.flatnonzero(d == 1), np.flatnonzero(d == 0)):
+            W[:, posicoes] = gerador.multinomial(len(posicoes), np.full(len(posicoes), 1 / len(posicoes)), size=tamanho)
+        D = np.broadcast_to(d, W.shape)
+    else:
+        D = gerador.permuted(np.broadcast_to(d, (tamanho, len(d))), axis=1)
+        W = np.ones(D.shape)
+    return [_coeficientes(grupo, D, W) for grupo in ctx["grupos"]]
+
+
+def _rodar_ponto(contexto: dict) -> list[np.ndarray]:
+    d = contexto["d"][None, :]
+    return [_coeficientes(grupo, d, np.ones_like(d))[0] for grupo in contexto["grupos"]]
+
+
+def inferir(
+    dados: pd.DataFrame,
+    especificacoes: dict[str, Especificacao],
+    tratamento: str = "tratado",
+    escore=None,
+    n_bootstrap: int = 5_000,
+    n_permutacoes: int = 5_000,
+    semente: int = 20260723,
+    tamanho_lote: int = 500,
+    trabalhadores: int | None = None,
+) -> pd.DataFrame:
+    """Estimativa, IC bootstrap de 95% e p-valor de permutação de cada especificação.
+
+    O bootstrap reamostra municípios dentro de tratados e de controles, como
+    no notebook. O teste de permutação embaralha ``tratamento`` e, nas
+    especificações ponderadas, recalcula os pesos ATT com o escore de cada
+    município; o p-valor é bilateral, ``(1 + #{|b*| >= |b|}) / (1 + B)``.
+    Especificações com as mesmas covariáveis e pesos são resolvidas juntas.
+    As sementes são derivadas por lote de ``semente``, então o resultado não
+    depende de ``trabalhadores``.
+    """
+    d = dados[tratamento].to_numpy(dtype=float)
+    if escore is not None:
+        escore = np.asarray(escore, dtype=float)
+        if ((escore <= 0) | (escore >= 1)).any():
+            raise ValueError("O escore deve ficar estritamente entre 0 e 1.")
+    if any(e.ponderado for e in especificacoes.values()) and escore is None:
+        raise ValueError("Especificações ponderadas exigem o escore de propensão.")
+
+    grupos, posicao = [], {}
+    for rotulo, especificacao in especificacoes.items():
+        chave = (especificacao.covariaveis, especificacao.categoricas, especificacao.ponderado)
+        if chave not in posicao:
+            posicao[chave] = len(grupos)
+            Z = _covariaveis(dados, especificacao)
+            grupos.append({"G": np.column_stack([np.ones(len(dados)), Z]), "rotulos": [], "desfechos": []})
+            grupos[-1]["escore"] = escore if especificacao.ponderado else None
+        grupos[posicao[chave]]["rotulos"].append(rotulo)
+        grupos[posicao[chave]]["desfechos"].append(especificacao.desfecho)
+    for grupo in grupos:
+        G = grupo["G"]
+        grupo["Y"] = dados[grupo["desfechos"]].to_numpy(dtype=float)
+        grupo["GG"] = (G[:, :, None] * G[:, None, :]).reshape(len(G), -1)
+        grupo["GY"] = (G[:, :, None] * grupo["Y"][:, None, :]).reshape(len(G), -1)
+
+    contexto = {"d": d, "grupos": grupos}
+    _preparar_contexto(contexto)
+    pontos = _rodar_ponto(contexto)
+
+    tarefas = []
+    for tipo, total in (("bootstrap", n_bootstrap), ("permutacao", n_permutacoes)):
+        tamanhos = [min(tamanho_lote, total - inicio) for inicio in range(0, total, tamanho_lote)]
+        sementes = np.random.SeedSequence([semente, int(tipo == "permutacao")]).spawn(len(tamanhos))
+        tarefas.extend((tipo, s, t) for s, t in zip(sementes, tamanhos))
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    if trabalhadores <= 1 or len(tarefas) <= 1:
+        partes = [_rodar_lote(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(trabalhadores, len(tarefas)), initializer=_preparar_contexto, initargs=(contexto,)
+        ) as executor:
+            partes = list(executor.map(_rodar_lote, tarefas))
+
+    linhas = []
+    for indice, grupo in enumerate(grupos):
+        boots = [p[indice] for p, t in zip(partes, tarefas) if t[0] == "bootstrap"]
+        perms = [p[indice] for p, t in zip(partes, tarefas) if t[0] == "permutacao"]
+        boots = np.concatenate(boots) if boots else np.empty((0, len(grupo["rotulos"])))
+        perms = np.concatenate(perms) if perms else np.empty((0, len(grupo["rotulos"])))
+        for coluna, rotulo in enumerate(grupo["rotulos"]):
+            ponto = pontos[indice][coluna]
+            b, p = boots[:, coluna], perms[:, coluna]
+            linhas.append({
+                "Especificação": rotulo,
+                "Desfecho": especificacoes[rotulo].desfecho,
+                "Placebo": especificacoes[rotulo].placebo,
+                "Estimativa": ponto,
+                "EP bootstrap": b.std(ddof=1) if len(b) > 1 else np.nan,
+                "IC 2,5%": np.quantile(b, .025) if len(b) else np.nan,
+                "IC 97,5%": np.quantile(b, .975) if len(b) else np.nan,
+                "p permutação": (1 + np.sum(np.abs(p) >= np.abs(ponto))) / (1 + len(p)) if len(p) else np.nan,
+            })
+    return pd.DataFrame(linhas).set_index("Especificação").loc[list(especificacoes)]
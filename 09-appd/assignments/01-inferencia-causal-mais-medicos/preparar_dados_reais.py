@@ -6,12 +6,17 @@ Entradas brutas:
   - estimativas populacionais municipais (SIDRA/IBGE).
 
 A saída é pequena e fica versionada para que o notebook execute sem rede.
+Agregados intermediários ficam em ``data/cache/``, identificados pelo hash
+dos arquivos brutos de origem.
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
 import zipfile
+from dataclasses import dataclass
 from pathlib import Path
 
 import numpy as np
@@ -21,11 +26,27 @@ import pandas as pd
 BASE = Path(__file__).resolve().parent
 RAW = BASE / "data" / "raw"
 OUT = BASE / "data" / "processed"
+CACHE = BASE / "data" / "cache"
 OUT.mkdir(parents=True, exist_ok=True)
 
+# Prefixo IBGE dos códigos municipais de cada UF.
+CODIGOS_UF = {
+    "RO": 11, "AC": 12, "AM": 13, "RR": 14, "PA": 15, "AP": 16, "TO": 17,
+    "MA": 21, "PI": 22, "CE": 23, "RN": 24, "PB": 25, "PE": 26, "AL": 27,
+    "SE": 28, "BA": 29, "MG": 31, "ES": 32, "RJ": 33, "SP": 35, "PR": 41,
+    "SC": 42, "RS": 43, "MS": 50, "MT": 51, "GO": 52, "DF": 53,
+}
 
-def ler_pmm() -> pd.DataFrame:
-    arquivo = RAW / "ppf_mais_medicos_serie_historica.csv.zip"
+
+def sha256_arquivo(arquivo: Path) -> str:
+    digest = hashlib.sha256()
+    with arquivo.open("rb") as origem:
+        for bloco in iter(lambda: origem.read(1 << 20), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def _ler_pmm_bruto(arquivo: Path) -> pd.DataFrame:
     with zipfile.ZipFile(arquivo) as zf:
         nome = zf.namelist()[0]
         pmm = pd.read_csv(
@@ -37,34 +58,110 @@ def ler_pmm() -> pd.DataFrame:
         )
     pmm["data"] = pd.to_datetime(pmm["dt_referencia"], dayfirst=True)
     pmm["cod_mun"] = pmm["ibge"].str.zfill(6)
-    inicial = pmm.loc[
-        pmm["uf"].eq("GO")
-        & pmm["cod_mun"].str.match(r"^52\d{4}$", na=False)
-        & pmm["data"].eq(pd.Timestamp("2013-11-29"))
-    ].copy()
-    if inicial["cod_mun"].duplicated().any():
-        raise ValueError("Há municípios duplicados na fotografia inicial do PMM.")
-    return inicial[["cod_mun", "total_prof_ativos"]].rename(
-        columns={"total_prof_ativos": "medicos_pmm_inicial"}
+    # Colunas de texto ou com tipos misturados viram string para o parquet.
+    texto = pmm.columns[pmm.dtypes.eq(object)]
+    pmm[texto] = pmm[texto].astype("string")
+    return pmm
+
+
+def _ler_populacao_bruta(arquivo: Path) -> pd.DataFrame:
+    with arquivo.open(encoding="utf-8") as f:
+        registros = json.load(f)[1:]
+    pop = pd.DataFrame(registros)
+    return pd.DataFrame(
+        {
+            "cod_mun": pop["D1C"].str[:6].astype("string"),
+            "ano": pd.to_numeric(pop["D3C"]),
+            "populacao": pd.to_numeric(pop["V"], errors="coerce"),
+            "municipio_ibge": pop["D1N"].astype("string"),
+        }
     )
 
 
-def agregar_internacoes() -> pd.DataFrame:
-    arquivo = RAW / "internacoes_icsap_go.csv"
-    usar = [
-        "mun_res_cod_ibge",
-        "municipio_residencia",
-        "regiao_saude_residencia",
-        "ano_mes_internacao",
-        "tipo",
-        "Quantidade_internacao",
-    ]
+def _parquet_bruto(arquivo: Path, prefixo: str, ler, ordem: list[str]) -> Path:
+    """Converte uma entrada bruta em parquet uma única vez.
+
+    O nome do parquet leva o SHA-256 do arquivo de origem. As linhas são
+    ordenadas pelas colunas de filtro, para que as estatísticas de cada grupo
+    de linhas permitam ao leitor pular o que não atende ao filtro.
+    """
+    destino = CACHE / f"{prefixo}_{sha256_arquivo(arquivo)[:16]}.parquet"
+    if not destino.exists():
+        CACHE.mkdir(parents=True, exist_ok=True)
+        tabela = ler(arquivo).sort_values(ordem, kind="stable")
+        tabela.to_parquet(destino, index=False, row_group_size=50_000)
+    return destino
+
+
+def ler_fotografias_pmm(
+    ufs: tuple[str, ...] = ("GO",),
+    datas: tuple[str, ...] = ("2013-11-29",),
+    usar_cache: bool = True,
+) -> pd.DataFrame:
+    """Profissionais ativos do PMM por UF, data de referência e município.
+
+    Com cache, a série histórica é lida do zip uma única vez e convertida em
+    parquet ordenado por UF e data; as chamadas seguintes leem só as linhas
+    das UFs e datas pedidas, numa única leitura.
+    """
+    arquivo = RAW / "ppf_mais_medicos_serie_historica.csv.zip"
+    referencias = [pd.Timestamp(data) for data in datas]
+    colunas = ["uf", "data", "cod_mun", "total_prof_ativos"]
+    if usar_cache:
+        pmm = pd.read_parquet(
+            _parquet_bruto(arquivo, "pmm", _ler_pmm_bruto, ["uf", "data", "cod_mun"]),
+            columns=colunas,
+            filters=[("uf", "in", list(ufs)), ("data", "in", referencias)],
+        )
+    else:
+        pmm = _ler_pmm_bruto(arquivo)[colunas]
+        pmm = pmm.loc[pmm["uf"].isin(ufs) & pmm["data"].isin(referencias)]
+    prefixo = pmm["uf"].map({uf: str(codigo) for uf, codigo in CODIGOS_UF.items()})
+    fotografias = pmm.loc[
+        pmm["cod_mun"].str.fullmatch(r"\d{6}", na=False)
+        & pmm["cod_mun"].str[:2].eq(prefixo).fillna(False)
+    ].reset_index(drop=True)
+    if fotografias.duplicated(["data", "cod_mun"]).any():
+        raise ValueError("Há municípios duplicados na fotografia inicial do PMM.")
+    return fotografias.rename(columns={"total_prof_ativos": "medicos_pmm_inicial"})
+
+
+def ler_pmm(
+    uf: str = "GO",
+    data: str = "2013-11-29",
+    usar_cache: bool = True,
+) -> pd.DataFrame:
+    """Profissionais ativos do PMM por município de ``uf`` na data ``data``."""
+    fotografia = ler_fotografias_pmm((uf,), (data,), usar_cache=usar_cache)
+    return fotografia[["cod_mun", "medicos_pmm_inicial"]]
+
+
+COLUNAS_INTERNACOES = [
+    "mun_res_cod_ibge",
+    "municipio_residencia",
+    "regiao_saude_residencia",
+    "ano_mes_internacao",
+    "tipo",
+    "Quantidade_internacao",
+]
+CHAVES_MENSAIS = [
+    "mun_res_cod_ibge",
+    "municipio_residencia",
+    "regiao_saude_residencia",
+    "ano",
+    "mes",
+    "tipo",
+]
+ANOS_ANALISE = (2013, 2014, 2015)
+
+
+def _contagens_pandas(arquivo: Path, anos: tuple[int, ...]) -> pd.DataFrame:
     partes: list[pd.DataFrame] = []
     for bloco in pd.read_csv(
         arquivo,
         sep=";",
         encoding="utf-8",
-        usecols=usar,
+        usecols=COLUNAS_INTERNACOES,
         dtype="string",
         chunksize=250_000,
     ):
@@ -74,46 +171,121 @@ def agregar_internacoes() -> pd.DataFrame:
         bloco["mes"] = pd.to_numeric(
             bloco["ano_mes_internacao"].str[4:6], errors="coerce"
         )
-        bloco = bloco.loc[bloco["ano"].isin([2013, 2014, 2015])]
+        bloco = bloco.loc[bloco["ano"].isin(anos)]
         bloco["internacoes"] = pd.to_numeric(
             bloco["Quantidade_internacao"], errors="coerce"
         ).fillna(0)
         partes.append(
-            bloco.groupby(
-                [
-                    "mun_res_cod_ibge",
-                    "municipio_residencia",
-                    "regiao_saude_residencia",
-                    "ano",
-                    "mes",
-                    "tipo",
-                ],
-                as_index=False,
-                dropna=False,
-            )["internacoes"].sum()
+            bloco.groupby(CHAVES_MENSAIS, as_index=False, dropna=False)[
+                "internacoes"
+            ].sum()
+        )
+    return pd.concat(partes, ignore_index=True)
+
+
+def _contagens_pyarrow(arquivo: Path, anos: tuple[int, ...]) -> pd.DataFrame:
+    """Mesmas contagens de ``_contagens_pandas`` em uma passada colunar.
+
+    O leitor de CSV do pyarrow usa várias threads, lê municípios, regiões e
+    tipo como dicionários e aplica o filtro de anos bloco a bloco, antes de
+    materializar a tabela; a soma por chave é feita pelo próprio pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        from pyarrow import csv
+    except ModuleNotFoundError as exc:
+        raise RuntimeError(
+            "O motor pyarrow requer o pacote pyarrow; instale-o ou use --motor pandas."
+        ) from exc
+
+    dicionario = pa.dictionary(pa.int32(), pa.string())
+    formato = ds.CsvFileFormat(
+        parse_options=csv.ParseOptions(delimiter=";"),
+        convert_options=csv.ConvertOptions(
+            column_types={
+                "mun_res_cod_ibge": pa.string(),
+                "municipio_residencia": dicionario,
+                "regiao_saude_residencia": dicionario,
+                "ano_mes_internacao": pa.string(),
+                "tipo": dicionario,
+                "Quantidade_internacao": pa.string(),
+            },
+            strings_can_be_null=True,
+        ),
+    )
+
+    def numero(texto, tipo):
+        # Equivale a pd.to_numeric(errors="coerce"): o que não é número vira nulo.
+        padrao = r"^\s*[+-]?\d+\s*$" if tipo == pa.int64() else r"^\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*$"
+        limpo = pc.if_else(
+            pc.match_substring_regex(texto, padrao),
+            pc.utf8_trim_whitespace(texto),
+            pa.scalar(None, pa.string()),
+        )
+        return limpo.cast(tipo)
+
+    ano_mes = ds.field("ano_mes_internacao")
+    ano = numero(pc.utf8_slice_codeunits(ano_mes, 0, 4), pa.int64())
+    tabela = ds.dataset(arquivo, format=formato).to_table(
+        columns={
+            **{coluna: ds.field(coluna) for coluna in CHAVES_MENSAIS if coluna not in ("ano", "mes")},
+            "ano": ano,
+            "mes": numero(pc.utf8_slice_codeunits(ano_mes, 4, 6), pa.int64()),
+            "internacoes": pc.coalesce(numero(ds.field("Quantidade_internacao"), pa.float64()), 0.0),
+        },
+        filter=pc.is_in(ano, value_set=pa.array(anos, pa.int64())),
+    )
+    # Cada bloco lido traz seu próprio dicionário; o agrupamento exige um só.
+    contagens = tabela.unify_dictionaries().group_by(CHAVES_MENSAIS, use_threads=True).aggregate(
+        [("internacoes", "sum")]
+    )
+    contagens = contagens.rename_columns(
+        [nome.removesuffix("_sum") for nome in contagens.column_names]
+    )
+    # Mesmos tipos anuláveis do motor pandas, com texto simples no lugar dos dicionários.
+    tipos = {pa.string(): pd.StringDtype(), pa.int64(): pd.Int64Dtype(), pa.float64(): pd.Float64Dtype()}
+    contagens = contagens.cast(
+        pa.schema(
+            pa.field(campo.name, pa.string() if pa.types.is_dictionary(campo.type) else campo.type)
+            for campo in contagens.schema
         )
-    mensal = pd.concat(partes, ignore_index=True)
+    )
+    return contagens.to_pandas(types_mapper=tipos.get)
+
+
+def agregar_internacoes(
+    anos: tuple[int, ...] = ANOS_ANALISE,
+    motor: str = "pyarrow",
+    usar_cache: bool = True,
+) -> pd.DataFrame:
+    """Internações ICSAP e demais internações clínicas por município e mês.
+
+    O resultado fica em ``data/cache/`` num parquet cujo nome combina o
+    SHA-256 do CSV bruto e os anos pedidos; enquanto o arquivo bruto não
+    mudar, as execuções seguintes só leem esse parquet.
+    """
+    arquivo = RAW / "internacoes_icsap_go.csv"
+    destino = None
+    if usar_cache:
+        anos_chave = "-".join(str(ano) for ano in sorted(anos))
+        destino = CACHE / f"internacoes_mensal_{sha256_arquivo(arquivo)[:16]}_{anos_chave}.parquet"
+        if destino.exists():
+            return pd.read_parquet(destino)
+
+    if motor == "pyarrow":
+        contagens = _contagens_pyarrow(arquivo, tuple(anos))
+    elif motor == "pandas":
+        contagens = _contagens_pandas(arquivo, tuple(anos))
+    else:
+        raise ValueError(f"Motor desconhecido: {motor}")
+
     mensal = (
-        mensal.groupby(
-            [
-                "mun_res_cod_ibge",
-                "municipio_residencia",
-                "regiao_saude_residencia",
-                "ano",
-                "mes",
-                "tipo",
-            ],
-            as_index=False,
-        )["internacoes"]
+        contagens.groupby(CHAVES_MENSAIS, as_index=False)["internacoes"]
         .sum()
         .pivot_table(
-            index=[
-                "mun_res_cod_ibge",
-                "municipio_residencia",
-                "regiao_saude_residencia",
-                "ano",
-                "mes",
-            ],
+            index=CHAVES_MENSAIS[:-1],
             columns="tipo",
             values="internacoes",
             fill_value=0,
@@ -126,87 +298,241 @@ def agregar_internacoes() -> pd.DataFrame:
         if coluna not in mensal:
             mensal[coluna] = 0
     mensal["cod_mun"] = mensal["mun_res_cod_ibge"].str[:6]
+
+    if destino is not None:
+        CACHE.mkdir(parents=True, exist_ok=True)
+        mensal.to_parquet(destino, index=False)
     return mensal
 
 
-def ler_populacao() -> pd.DataFrame:
-    with (RAW / "populacao_go_2013_2015.json").open(encoding="utf-8") as f:
-        registros = json.load(f)[1:]
-    pop = pd.DataFrame(registros)
-    return pd.DataFrame(
-        {
-            "cod_mun": pop["D1C"].str[:6],
-            "ano": pd.to_numeric(pop["D3C"]),
-            "populacao": pd.to_numeric(pop["V"], errors="coerce"),
-            "municipio_ibge": pop["D1N"],
-        }
+def ler_populacao(
+    anos: tuple[int, ...] = ANOS_ANALISE,
+    usar_cache: bool = True,
+) -> pd.DataFrame:
+    """Estimativas populacionais municipais dos anos pedidos."""
+    arquivo = RAW / "populacao_go_2013_2015.json"
+    if usar_cache:
+        return pd.read_parquet(
+            _parquet_bruto(arquivo, "populacao", _ler_populacao_bruta, ["ano", "cod_mun"]),
+            filters=[("ano", "in", list(anos))],
+        )
+    pop = _ler_populacao_bruta(arquivo)
+    return pop.loc[pop["ano"].isin(anos)].reset_index(drop=True)
+
+
+@dataclass(frozen=True)
+class Periodo:
+    """Janela de análise: fotografia do PMM, linha de base e anos posteriores.
+
+    A linha de base soma os meses ``meses_base`` de ``ano_base`` e é
+    anualizada por ``12 / len(meses_base)``; o período posterior é a média
+    das taxas anuais de ``anos_pos``.
+    """
+
+    nome: str
+    data_pmm: str
+    ano_base: int
+    meses_base: tuple[int, ...]
+    anos_pos: tuple[int, ...]
+
+
+# Fotografia inicial de 29/11/2013, com linha de base em jan-out/2013.
+PERIODO_PMM_2013 = Periodo("2013", "2013-11-29", 2013, tuple(range(1, 11)), (2014, 2015))
+
+
+def construir_painel(
+    ufs: tuple[str, ...] = ("GO",),
+    periodos: tuple[Periodo, ...] = (PERIODO_PMM_2013,),
+    motor: str = "pyarrow",
+    usar_cache: bool = True,
+) -> pd.DataFrame:
+    """Base analítica de cada combinação de UF e período, empilhada.
+
+    Cada fonte bruta é lida uma única vez para todas as UFs e períodos; a
+    UF de cada município vem do prefixo do código IBGE. Os meses são
+    ligados aos períodos por um calendário, e as somas de linha de base e
+    de período posterior saem de um único agrupamento que tem o período
+    como chave. Os arquivos brutos precisam cobrir as UFs pedidas: uma UF
+    ou período sem internações, população ou fotografia do PMM gera
+    ``ValueError``.
+    """
+    desconhecidas = set(ufs) - set(CODIGOS_UF)
+    if desconhecidas:
+        raise ValueError(f"UFs desconhecidas: {sorted(desconhecidas)}")
+    nomes = [periodo.nome for periodo in periodos]
+    if len(set(nomes)) != len(nomes):
+        raise ValueError("Os nomes dos períodos devem ser distintos.")
+
+    calendario = pd.DataFrame(
+        [
+            (periodo.nome, periodo.ano_base, mes, "pre")
+            for periodo in periodos
+            for mes in periodo.meses_base
+        ]
+        + [
+            (periodo.nome, ano, mes, "pos")
+            for periodo in periodos
+            for ano in periodo.anos_pos
+            for mes in range(1, 13)
+        ],
+        columns=["periodo", "ano", "mes", "fase"],
+    ).astype({"ano": "Int64", "mes": "Int64"})
+    anos = tuple(sorted({int(ano) for ano in calendario["ano"]}))
+    fatores = pd.Series(
+        {periodo.nome: 12 / len(periodo.meses_base) for periodo in periodos}
     )
+    anos_base = pd.Series({periodo.nome: periodo.ano_base for periodo in periodos})
 
+    uf_do_codigo = {str(codigo): uf for uf, codigo in CODIGOS_UF.items()}
+    mensal = agregar_internacoes(anos=anos, motor=motor, usar_cache=usar_cache)
+    mensal["uf"] = mensal["cod_mun"].str[:2].map(uf_do_codigo)
+    mensal = mensal.loc[mensal["uf"].isin(ufs)].merge(calendario, on=["ano", "mes"])
+    pop = ler_populacao(anos=anos, usar_cache=usar_cache)[["cod_mun", "ano", "populacao"]]
+    pmm = ler_fotografias_pmm(
+        ufs, tuple(periodo.data_pmm for periodo in periodos), usar_cache=usar_cache
+    )
+    pmm = pmm.merge(
+        pd.DataFrame(
+            {"periodo": nomes, "data": [pd.Timestamp(p.data_pmm) for p in periodos]}
+        )
+    )
 
-def construir_base() -> pd.DataFrame:
-    pmm = ler_pmm()
-    mensal = agregar_internacoes()
-    pop = ler_populacao()
+    # Uma UF ou período sem linhas sumiria do painel sem aviso nos merges.
+    com_internacoes = set(zip(mensal["uf"], mensal["periodo"], mensal["fase"]))
+    com_populacao = set(zip(pop["cod_mun"].str[:2].map(uf_do_codigo), pop["ano"]))
+    com_pmm = set(zip(pmm["uf"], pmm["periodo"]))
+    faltas = []
+    for periodo in periodos:
+        for uf in ufs:
+            faltas += [
+                f"{uf}/{periodo.nome}: internações ({fase})"
+                for fase in ("pre", "pos")
+                if (uf, periodo.nome, fase) not in com_internacoes
+            ]
+            faltas += [
+                f"{uf}/{periodo.nome}: população de {ano}"
+                for ano in (periodo.ano_base, *periodo.anos_pos)
+                if (uf, ano) not in com_populacao
+            ]
+            if (uf, periodo.nome) not in com_pmm:
+                faltas.append(f"{uf}/{periodo.nome}: fotografia do PMM")
+    if faltas:
+        raise ValueError("Sem dados para: " + "; ".join(faltas))
+    pmm = pmm[["periodo", "cod_mun", "medicos_pmm_inicial"]]
 
-    # Linha de base: jan-out/2013, antes da fotografia inicial de 29/11/2013.
-    pre = mensal.loc[(mensal["ano"] == 2013) & mensal["mes"].between(1, 10)]
-    pre = pre.groupby(
-        ["cod_mun", "municipio_residencia", "regiao_saude_residencia"],
+    pre = mensal.loc[mensal["fase"].eq("pre")].groupby(
+        ["periodo", "uf", "cod_mun", "municipio_residencia", "regiao_saude_residencia"],
         as_index=False,
     )[["icsap", "outras_clinicas"]].sum()
-    pre = pre.merge(pop.loc[pop["ano"].eq(2013), ["cod_mun", "populacao"]])
-    # Anualização por 12/10 torna a escala comparável à média anual pós.
-    pre["taxa_icsap_pre"] = pre["icsap"] * (12 / 10) / pre["populacao"] * 10_000
+    pre["ano"] = pre["periodo"].map(anos_base).astype("Int64")
+    pre = pre.merge(pop, on=["cod_mun", "ano"]).drop(columns="ano")
+    fator = pre["periodo"].map(fatores)
+    pre["taxa_icsap_pre"] = pre["icsap"] * fator / pre["populacao"] * 10_000
     pre["taxa_clinicas_pre"] = (
         (pre["icsap"] + pre["outras_clinicas"])
-        * (12 / 10)
+        * fator
         / pre["populacao"]
         * 10_000
     )
 
-    pos = mensal.loc[mensal["ano"].isin([2014, 2015])]
-    pos = pos.groupby(["cod_mun", "ano"], as_index=False)[
-        ["icsap", "outras_clinicas"]
-    ].sum()
-    pos = pos.merge(pop[["cod_mun", "ano", "populacao"]])
+    pos = mensal.loc[mensal["fase"].eq("pos")].groupby(
+        ["periodo", "cod_mun", "ano"], as_index=False
+    )[["icsap", "outras_clinicas"]].sum()
+    pos = pos.merge(pop, on=["cod_mun", "ano"])
     pos["taxa_icsap"] = pos["icsap"] / pos["populacao"] * 10_000
-    pos = pos.groupby("cod_mun", as_index=False).agg(
+    pos = pos.groupby(["periodo", "cod_mun"], as_index=False).agg(
         taxa_icsap_pos=("taxa_icsap", "mean"),
-        populacao_2014=("populacao", "first"),
+        populacao_pos=("populacao", "first"),
     )
 
-    base = pre.merge(pos, on="cod_mun", how="inner").merge(
-        pmm, on="cod_mun", how="left"
+    painel = pre.merge(pos, on=["periodo", "cod_mun"], how="inner").merge(
+        pmm, on=["periodo", "cod_mun"], how="left"
     )
-    base["medicos_pmm_inicial"] = base["medicos_pmm_inicial"].fillna(0)
-    base["tratado"] = (base["medicos_pmm_inicial"] > 0).astype(int)
-    base["log_populacao"] = np.log(base["populacao_2014"])
-    base["mudanca_taxa_icsap"] = (
-        base["taxa_icsap_pos"] - base["taxa_icsap_pre"]
+    painel["medicos_pmm_inicial"] = painel["medicos_pmm_inicial"].fillna(0)
+    painel["tratado"] = (painel["medicos_pmm_inicial"] > 0).astype(int)
+    painel["log_populacao"] = np.log(painel["populacao_pos"])
+    painel["mudanca_taxa_icsap"] = (
+        painel["taxa_icsap_pos"] - painel["taxa_icsap_pre"]
     )
 
     colunas = [
+        "periodo",
+        "uf",
         "cod_mun",
         "municipio_residencia",
         "regiao_saude_residencia",
         "tratado",
         "medicos_pmm_inicial",
-        "populacao_2014",
+        "populacao_pos",
         "log_populacao",
         "taxa_icsap_pre",
         "taxa_clinicas_pre",
         "taxa_icsap_pos",
         "mudanca_taxa_icsap",
     ]
-    base = base[colunas].sort_values("cod_mun").reset_index(drop=True)
+    return (
+        painel[colunas]
+        .sort_values(["periodo", "uf", "cod_mun"])
+        .reset_index(drop=True)
+    )
+
+
+def salvar_painel(painel: pd.DataFrame, destino: Path = OUT / "painel") -> Path:
+    """Grava o painel em parquet particionado por período e UF.
+
+    Só as partições presentes em ``painel`` são substituídas; as demais UFs
+    e períodos já gravados em ``destino`` continuam lá.
+    """
+    painel.to_parquet(
+        destino,
+        index=False,
+        partition_cols=["periodo", "uf"],
+        existing_data_behavior="delete_matching",
+    )
+    return destino
+
+
+def construir_base(motor: str = "pyarrow", usar_cache: bool = True) -> pd.DataFrame:
+    base = construir_painel(("GO",), (PERIODO_PMM_2013,), motor=motor, usar_cache=usar_cache)
+    base = base.drop(columns=["periodo", "uf"]).rename(
+        columns={"populacao_pos": "populacao_2014"}
+    )
     if len(base) != 246:
         raise ValueError(f"Esperados 246 municípios de Goiás; obtidos {len(base)}.")
     return base
 
 
 if __name__ == "__main__":
-    analitica = construir_base()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--motor",
+        choices=("pyarrow", "pandas"),
+        default="pyarrow",
+        help="leitura do CSV de internações (padrão: pyarrow)",
+    )
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help="reprocessa os arquivos brutos mesmo que haja cache em data/cache/",
+    )
+    parser.add_argument(
+        "--painel",
+        nargs="+",
+        metavar="UF",
+        help="também grava o painel dessas UFs em data/processed/painel/",
+    )
+    args = parser.parse_args()
+    analitica = construir_base(motor=args.motor, usar_cache=not args.sem_cache)
     destino = OUT / "mais_medicos_icsap_go.csv"
     analitica.to_csv(destino, index=False)
     print(f"{len(analitica)} municípios salvos em {destino}")
     print(analitica["tratado"].value_counts().sort_index())
+    if args.painel:
+        painel = construir_painel(
+            tuple(uf.upper() for uf in args.painel),
+            motor=args.motor,
+            usar_cache=not args.sem_cache,
+        )
+        destino = salvar_painel(painel)
+        print(f"{len(painel)} linhas do painel salvas em {destino}")
+        print(painel.groupby(["periodo", "uf"])["tratado"].agg(["size", "sum"]))
@@ -0,0 +1,335 @@
+"""Pareamento por vizinho mais próximo, balanceamento e bootstrap do ATT.
+
+Reúne em funções os passos que o notebook ``Pareamento.ipynb`` monta célula a
+célula:
+
+- ``parear``: pareamento 1:k, com ou sem reposição e com *caliper* opcional,
+  sobre uma KD-tree (``scipy.spatial.cKDTree``). Serve tanto para covariáveis
+  padronizadas quanto para o escore de propensão (uma coluna);
+- ``att_pareamento`` e ``pesos_pareamento``: o ATT e os pesos implícitos do
+  pareamento, para diagnósticos como ``tabela_smd`` e ESS;
+- ``tabela_smd``: diferenças padronizadas de médias de todas as covariáveis de
+  uma vez, com ou sem pesos;
+- ``bootstrap_att``: reamostragens do ATT em lotes, distribuídos entre
+  processos.
+
+Todas as posições devolvidas são relativas às matrizes de tratados e de
+controles recebidas, e não ao índice do ``DataFrame`` de origem.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+# Candidatos consultados por tratado no bootstrap com reposição. Cada controle
+# fica fora de uma reamostra com probabilidade ~0,37, então a chance de os 16
+# candidatos estarem todos ausentes é ~1e-7; esses casos são refeitos na árvore
+# da própria reamostra.
+CANDIDATOS_BOOTSTRAP = 16
+
+_CONTEXTO: dict | None = None
+
+
+@dataclass(frozen=True)
+class Pareamento:
+    """Resultado de ``parear``.
+
+    ``controles[i]`` traz as posições dos até ``k`` controles pareados ao
+    tratado ``i``, do mais próximo ao mais distante; posições ausentes (fora do
+    *caliper* ou sem controle disponível) valem ``-1`` e têm distância
+    ``inf``.
+    """
+
+    controles: np.ndarray
+    distancias: np.ndarray
+    n_controles: int
+
+    @property
+    def pareados(self) -> np.ndarray:
+        """Máscara dos tratados com ao menos um controle."""
+        return (self.controles >= 0).any(axis=1)
+
+
+def _matriz(valores) -> np.ndarray:
+    matriz = np.asarray(valores, dtype=float)
+    return matriz.reshape(-1, 1) if matriz.ndim == 1 else matriz
+
+
+def _limite(caliper: float | None) -> float:
+    # cKDTree só devolve vizinhos a distância estritamente menor que o limite.
+    return np.inf if caliper is None else np.nextafter(caliper, np.inf)
+
+
+def parear(
+    X_trat,
+    X_ctrl,
+    k: int = 1,
+    caliper: float | None = None,
+    reposicao: bool = True,
+) -> Pareamento:
+    """Pareia cada tratado aos ``k`` controles mais próximos (distância euclidiana).
+
+    Com ``caliper``, controles a distância maior que ele são descartados, e um
+    tratado pode ficar com menos de ``k`` ou nenhum controle. Sem reposição,
+    o pareamento é guloso pela distância: os pares mais próximos entre todos
+    os tratados são fixados primeiro, e cada controle é usado uma única vez.
+    """
+    if k < 1:
+        raise ValueError("k deve ser ao menos 1.")
+    X_trat, X_ctrl = _matriz(X_trat), _matriz(X_ctrl)
+    n_trat, n_ctrl = len(X_trat), len(X_ctrl)
+    controles = np.full((n_trat, k), -1, dtype=np.int64)
+    distancias = np.full((n_trat, k), np.inf)
+    if n_trat == 0 or n_ctrl == 0:
+        return Pareamento(controles, distancias, n_ctrl)
+
+    arvore = cKDTree(X_ctrl)
+    if reposicao:
+        dist, viz = arvore.query(X_trat, k=min(k, n_ctrl), distance_upper_bound=_limite(caliper), workers=-1)
+        dist, viz = dist.reshape(n_trat, -1), viz.reshape(n_trat, -1)
+        validos = viz < n_ctrl
+        colunas = viz.shape[1]
+        controles[:, :colunas] = np.where(validos, viz, -1)
+        distancias[:, :colunas] = np.where(validos, dist, np.inf)
+        return Pareamento(controles, distancias, n_ctrl)
+
+    faltam = np.full(n_trat, k)
+    usado = np.zeros(n_ctrl, dtype=bool)
+    candidatos = min(n_ctrl, 2 * k + 2)
+    while True:
+        abertos = np.flatnonzero(faltam > 0)
+        livres = np.flatnonzero(~usado)
+        if len(abertos) == 0 or len(livres) == 0:
+            break
+        if len(livres) < n_ctrl:
+            arvore_livres, mapa = cKDTree(X_ctrl[livres]), livres
+        else:
+            arvore_livres, mapa = arvore, np.arange(n_ctrl)
+        consulta = min(candidatos, len(livres))
+        dist, viz = arvore_livres.query(
+            X_trat[abertos], k=consulta, distance_upper_bound=_limite(caliper), workers=-1
+        )
+        dist, viz = dist.reshape(len(abertos), -1), viz.reshape(len(abertos), -1)
+        # Um tratado cujos candidatos acabarem ainda pode ter, fora da consulta,
+        # controles livres a partir da distância do último candidato: pares
+        # mais distantes que essa fronteira ficam para a próxima rodada.
+        fronteira = np.where(viz[:, -1] < len(mapa), dist[:, -1], np.inf)
+        restantes = np.full(n_trat, 0)
+        restantes[abertos] = (viz < len(mapa)).sum(axis=1)
+        fronteira_por_tratado = np.full(n_trat, np.inf)
+        fronteira_por_tratado[abertos] = fronteira
+        linhas = np.repeat(abertos, consulta)
+        dist, viz = dist.ravel(), viz.ravel()
+        validos = viz < len(mapa)
+        linhas, dist, ctrl = linhas[validos], dist[validos], mapa[viz[validos]]
+        if len(linhas) == 0:
+            break
+        limite_rodada = np.inf
+        for posicao in np.argsort(dist, kind="stable"):
+            if dist[posicao] > limite_rodada:
+                break
+            tratado, controle = linhas[posicao], ctrl[posicao]
+            restantes[tratado] -= 1
+            if faltam[tratado] > 0 and not usado[controle]:
+                coluna = k - faltam[tratado]
+                controles[tratado, coluna] = controle
+                distancias[tratado, coluna] = dist[posicao]
+                faltam[tratado] -= 1
+                usado[controle] = True
+            if restantes[tratado] == 0 and faltam[tratado] > 0:
+                limite_rodada = min(limite_rodada, fronteira_por_tratado[tratado])
+        if np.isinf(limite_rodada):
+            # Nenhum tratado aberto tem controles livres além dos consultados
+            # (dentro do caliper): não há mais pares possíveis.
+            break
+        candidatos = min(2 * candidatos, n_ctrl)
+    return Pareamento(controles, distancias, n_ctrl)
+
+
+def att_pareamento(y_trat, y_ctrl, pareamento: Pareamento) -> float:
+    """ATT: média, entre os tratados pareados, de ``y`` menos a média dos seus controles."""
+    y_trat, y_ctrl = np.asarray(y_trat, dtype=float), np.asarray(y_ctrl, dtype=float)
+    validos = pareamento.controles >= 0
+    pareados = validos.any(axis=1)
+    if not pareados.any():
+        return np.nan
+    soma = np.where(validos, y_ctrl[np.where(validos, pareamento.controles, 0)], 0.0).sum(axis=1)
+    contrafactual = soma[pareados] / validos[pareados].sum(axis=1)
+    return float(np.mean(y_trat[pareados] - contrafactual))
+
+
+def pesos_pareamento(pareamento: Pareamento) -> tuple[np.ndarray, np.ndarray]:
+    """Pesos implícitos de tratados e controles.
+
+    Tratados pareados pesam 1; cada controle soma ``1 / m`` por tratado que o
+    usa, sendo ``m`` o número de controles daquele tratado.
+    """
+    validos = pareamento.controles >= 0
+    por_tratado = validos.sum(axis=1)
+    pesos_trat = (por_tratado > 0).astype(float)
+    frac = np.where(validos, 1.0 / np.maximum(por_tratado, 1)[:, None], 0.0)
+    pesos_ctrl = np.bincount(
+        pareamento.controles[validos], weights=frac[validos], minlength=pareamento.n_controles
+    )
+    return pesos_trat, pesos_ctrl
+
+
+def tabela_smd(dados: pd.DataFrame, covariaveis, tratamento: str = "D", pesos=None) -> pd.DataFrame:
+    """Diferença padronizada de médias (SMD) de cada covariável.
+
+    As médias usam ``pesos`` (pareamento, IPW) quando informados; o desvio
+    combinado vem sempre da amostra sem pesos, para que as SMDs antes e depois
+    do ajuste tenham o mesmo denominador.
+    """
+    covariaveis = list(covariaveis)
+    X = dados[covariaveis].to_numpy(dtype=float)
+    d = dados[tratamento].to_numpy() == 1
+    w = np.ones(len(dados)) if pesos is None else np.asarray(pesos, dtype=float)
+    media1 = w[d] @ X[d] / w[d].sum()
+    media0 = w[~d] @ X[~d] / w[~d].sum()
+    sd = np.sqrt((X[d].var(axis=0, ddof=1) + X[~d].var(axis=0, ddof=1)) / 2)
+    smd = np.divide(media1 - media0, sd, out=np.zeros(len(covariaveis)), where=sd > 0)
+    return pd.DataFrame({"covariável": covariaveis, "SMD": smd})
+
+
+def _att_reamostra_com_reposicao(gerador: np.random.Generator) -> float:
+    ctx = _CONTEXTO
+    n_trat, n_ctrl, k = len(ctx["y_trat"]), len(ctx["y_ctrl"]), ctx["k"]
+    peso_trat = np.bincount(gerador.integers(0, n_trat, n_trat), minlength=n_trat)
+    copias = np.bincount(gerador.integers(0, n_ctrl, n_ctrl), minlength=n_ctrl)
+    sorteados = np.flatnonzero(peso_trat)
+
+    # Sentinela n_ctrl (fora do caliper) tem zero cópias. Os candidatos são
+    # percorridos coluna a coluna, só para os tratados ainda sem k controles.
+    copias_ext = np.append(copias, 0)
+    y_ext = np.append(ctx["y_ctrl"], 0.0)
+    candidatos = ctx["candidatos"][sorteados]
+    faltam = np.full(len(sorteados), k)
+    soma = np.zeros(len(sorteados))
+    abertos = np.arange(len(sorteados))
+    for coluna in range(candidatos.shape[1]):
+        controle = candidatos[abertos, coluna]
+        uso = np.minimum(copias_ext[controle], faltam[abertos])
+        soma[abertos] += uso * y_ext[controle]
+        faltam[abertos] -= uso
+        abertos = abertos[(faltam[abertos] > 0) & (controle < n_ctrl)]
+        if len(abertos) == 0:
+            break
+
+    refazer = abertos[~ctx["esgotados"][sorteados[abertos]]]
+    if len(refazer):
+        presentes = np.flatnonzero(copias)
+        _, viz = cKDTree(ctx["X_ctrl"][presentes]).query(
+            ctx["X_trat"][sorteados[refazer]], k=min(k, len(presentes)), distance_upper_bound=ctx["limite"]
+        )
+        viz = viz.reshape(len(refazer), -1)
+        viz = np.where(viz < len(presentes), presentes[np.minimum(viz, len(presentes) - 1)], n_ctrl)
+        faltam[refazer], soma[refazer] = k, 0.0
+        for coluna in range(viz.shape[1]):
+            uso = np.minimum(copias_ext[viz[:, coluna]], faltam[refazer])
+            soma[refazer] += uso * y_ext[viz[:, coluna]]
+            faltam[refazer] -= uso
+
+    usados = k - faltam
+    pareados = usados > 0
+    if not pareados.any():
+        return np.nan
+    efeitos = ctx["y_trat"][sorteados[pareados]] - soma[pareados] / usados[pareados]
+    return float(np.average(efeitos, weights=peso_trat[sorteados[pareados]]))
+
+
+def _att_reamostra_sem_reposicao(gerador: np.random.Generator) -> float:
+    ctx = _CONTEXTO
+    trat = gerador.integers(0, len(ctx["y_trat"]), len(ctx["y_trat"]))
+    ctrl = gerador.integers(0, len(ctx["y_ctrl"]), len(ctx["y_ctrl"]))
+    pareamento = parear(ctx["X_trat"][trat], ctx["X_ctrl"][ctrl], ctx["k"], ctx["caliper"], reposicao=False)
+    return att_pareamento(ctx["y_trat"][trat], ctx["y_ctrl"][ctrl], pareamento)
+
+
+def _preparar_contexto(contexto: dict) -> None:
+    global _CONTEXTO
+    _CONTEXTO = contexto
+
+
+def _rodar_lote(sementes: list[np.random.SeedSequence]) -> np.ndarray:
+    reamostra = _att_reamostra_com_reposicao if _CONTEXTO["reposicao"] else _att_reamostra_sem_reposicao
+    return np.array([reamostra(np.random.default_rng(semente)) for semente in sementes])
+
+
+def bootstrap_att(
+    X_trat,
+    X_ctrl,
+    y_trat,
+    y_ctrl,
+    k: int = 1,
+    caliper: float | None = None,
+    reposicao: bool = True,
+    n_reamostras: int = 1000,
+    semente: int = 42,
+    tamanho_lote: int = 50,
+    trabalhadores: int | None = None,
+) -> dict:
+    """Bootstrap do ATT por pareamento, reamostrando tratados e controles separadamente.
+
+    Cada reamostra refaz o pareamento com os mesmos parâmetros de ``parear``.
+    Com reposição, os ``CANDIDATOS_BOOTSTRAP`` vizinhos de cada tratado na
+    amostra original são consultados uma única vez, e cada reamostra só
+    escolhe, entre eles, os primeiros ``k`` sorteados. O resultado é o mesmo
+    de refazer a árvore, a menos da escolha entre controles empatados.
+
+    Os lotes de ``tamanho_lote`` reamostras rodam em ``trabalhadores``
+    processos, e cada reamostra tem sua própria semente derivada de
+    ``semente``, então o resultado não depende do número de processos.
+
+    O escore de propensão, quando é ele a coluna pareada, não é reestimado, e
+    Abadie e Imbens (2008) mostram que o bootstrap ingênuo do pareamento com
+    reposição não é consistente: trate o erro-padrão como aproximação.
+    """
+    X_trat, X_ctrl = _matriz(X_trat), _matriz(X_ctrl)
+    y_trat, y_ctrl = np.asarray(y_trat, dtype=float), np.asarray(y_ctrl, dtype=float)
+    contexto = {
+        "X_trat": X_trat,
+        "X_ctrl": X_ctrl,
+        "y_trat": y_trat,
+        "y_ctrl": y_ctrl,
+        "k": k,
+        "caliper": caliper,
+        "limite": _limite(caliper),
+        "reposicao": reposicao,
+    }
+    if reposicao:
+        consulta = min(len(X_ctrl), max(CANDIDATOS_BOOTSTRAP, 2 * k))
+        dist, viz = cKDTree(X_ctrl).query(X_trat, k=consulta, distance_upper_bound=contexto["limite"], workers=-1)
+        viz = viz.reshape(len(X_trat), -1)
+        contexto["candidatos"] = viz
+        # Se o último candidato já está fora do caliper, não há outro controle elegível.
+        contexto["esgotados"] = (viz[:, -1] == len(X_ctrl)) | (consulta == len(X_ctrl))
+
+    sementes = np.random.SeedSequence(semente).spawn(n_reamostras)
+    lotes = [sementes[inicio : inicio + tamanho_lote] for inicio in range(0, n_reamostras, tamanho_lote)]
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    if trabalhadores <= 1 or len(lotes) <= 1:
+        _preparar_contexto(contexto)
+        partes = [_rodar_lote(lote) for lote in lotes]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(trabalhadores, len(lotes)), initializer=_preparar_contexto, initargs=(contexto,)
+        ) as executor:
+            partes = list(executor.map(_rodar_lote, lotes))
+    reamostras = np.concatenate(partes) if partes else np.array([])
+
+    att = att_pareamento(y_trat, y_ctrl, parear(X_trat, X_ctrl, k, caliper, reposicao))
+    validas = reamostras[~np.isnan(reamostras)]
+    return {
+        "att": att,
+        "erro_padrao": float(np.std(validas, ddof=1)) if len(validas) > 1 else np.nan,
+        "ic95": tuple(np.percentile(validas, [2.5, 97.5])) if len(validas) else (np.nan, np.nan),
+        "reamostras": reamostras,
+    }
@@ -0,0 +1,284 @@
+"""Análise Envoltória de Dados (DEA) em lote, com ``scipy.optimize.linprog``.
+
+Resolve os modelos CCR (retornos constantes) e BCC (retornos variáveis),
+orientados a entrada ou a saída, para todas as DMUs de uma vez. Serve de
+alternativa a ``adndea.solver`` quando há milhares de unidades:
+
+- as colunas do problema na forma do envelope (``[x_j; -y_j]`` para cada
+  DMU ``j``) são montadas uma única vez; de uma DMU para outra só mudam a
+  coluna de ``θ``/``φ`` e o lado direito;
+- cada PL usa só um conjunto de DMUs de referência candidatas, e não as
+  ``n`` colunas. Os duais do PL restrito dão o custo reduzido de todas as
+  DMUs fora dele num único produto de matrizes; as que o tornariam
+  negativo entram no conjunto e o PL é refeito. O conjunto cresce ao longo
+  do lote, então as DMUs seguintes já partem da fronteira encontrada;
+- os lotes de DMUs são distribuídos entre processos.
+
+Os pesos devolvidos são os multiplicadores (duais), na escala original dos
+dados e na mesma convenção do ``adndea``: na orientação a entrada,
+``θ = u·y0 + u0`` com ``v·x0 = 1``; na orientação a saída,
+``φ = v·x0 + v0`` com ``u·y0 = 1`` e eficiência ``1/φ``. Com soluções
+degeneradas, os pesos podem diferir dos do ``adndea`` sem que a eficiência
+mude.
+
+Para medir o desempenho em 10 mil DMUs sintéticas::
+
+    python 10-adap/03-dea-rdd/envoltoria.py --dmus 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.optimize import linprog
+
+
+MODELOS = ("CCR", "BCC")
+ORIENTACOES = ("entrada", "saida")
+
+# Custo reduzido abaixo de -TOLERANCIA traz a DMU para o conjunto de
+# referência; as colunas são reescaladas pela média, então o limite é absoluto.
+TOLERANCIA = 1e-9
+# DMUs acrescentadas por rodada, das mais violadoras às menos.
+NOVAS_POR_RODADA = 32
+
+_CONTEXTO: dict | None = None
+
+
+@dataclass(frozen=True)
+class ResultadoDEA:
+    """Resultado de ``dea``, com uma linha por DMU.
+
+    ``eficiencia`` fica em ``(0, 1]``: ``θ`` na orientação a entrada e
+    ``1/φ`` na orientação a saída. ``peso_livre`` é o ``u0``/``v0`` do BCC
+    (zero no CCR).
+    """
+
+    eficiencia: np.ndarray
+    pesos_entradas: np.ndarray
+    pesos_saidas: np.ndarray
+    peso_livre: np.ndarray
+    modelo: str
+    orientacao: str
+
+    @property
+    def eficientes(self) -> np.ndarray:
+        """Máscara das DMUs na fronteira."""
+        return np.isclose(self.eficiencia, 1.0, rtol=0, atol=1e-6)
+
+
+def _matriz(valores) -> np.ndarray:
+    matriz = np.asarray(valores, dtype=float)
+    return matriz.reshape(-1, 1) if matriz.ndim == 1 else matriz
+
+
+def _referencias_iniciais(X: np.ndarray, Y: np.ndarray, modelo: str) -> np.ndarray:
+    # Quem maximiza cada razão saída/entrada está na fronteira CCR; no BCC,
+    # também quem usa menos de cada entrada ou produz mais de cada saída.
+    razoes = Y[:, :, None] / np.where(X > 0, X, np.nan)[:, None, :]
+    iniciais = [np.nanargmax(razoes.reshape(len(X), -1), axis=0)]
+    if modelo == "BCC":
+        iniciais += [X.argmin(axis=0), Y.argmax(axis=0)]
+    return np.unique(np.concatenate(iniciais))
+
+
+def _resolver_dmu(ctx: dict, o: int, referencias: np.ndarray | None):
+    """PL da DMU ``o``; ``referencias=None`` usa todas as DMUs.
+
+    Devolve a eficiência, os duais e as referências ao fim das rodadas.
+    """
+    colunas, m = ctx["colunas"], ctx["m"]
+    x0, y0 = ctx["X"][o], ctx["Y"][o]
+    if ctx["orientacao"] == "entrada":
+        # min θ  s.a.  Xλ - θx0 <= 0,  -Yλ <= -y0
+        theta = np.concatenate([-x0, np.zeros_like(y0)])
+        b_ub = np.concatenate([np.zeros_like(x0), -y0])
+        c0 = 1.0
+    else:
+        # max φ  s.a.  Xλ <= x0,  -Yλ + φy0 <= 0
+        theta = np.concatenate([np.zeros_like(x0), y0])
+        b_ub = np.concatenate([x0, np.zeros_like(y0)])
+        c0 = -1.0
+    bcc = ctx["modelo"] == "BCC"
+
+    while True:
+        # A própria DMU garante um PL restrito viável (λo = 1, θ = φ = 1).
+        usadas = (
+            np.arange(ctx["n"])
+            if referencias is None
+            else np.union1d(referencias, [o])
+        )
+        c = np.zeros(len(usadas) + 1)
+        c[0] = c0
+        res = linprog(
+            c,
+            A_ub=np.column_stack([theta, colunas[:, usadas]]),
+            b_ub=b_ub,
+            A_eq=np.concatenate([[0.0], np.ones(len(usadas))])[None, :] if bcc else None,
+            b_eq=[1.0] if bcc else None,
+            bounds=(0, None),
+            method="highs",
+        )
+        if res.status != 0:
+            raise RuntimeError(f"PL da DMU {o} não convergiu: {res.message}")
+        duais = res.ineqlin.marginals
+        livre = res.eqlin.marginals[0] if bcc else 0.0
+        if referencias is None:
+            break
+        # Custo reduzido de λj: 0 - a_j·duais - livre; negativo = melhora o PL.
+        reduzidos = -(duais @ colunas) - livre
+        reduzidos[usadas] = 0.0
+        violadoras = np.flatnonzero(reduzidos < -TOLERANCIA)
+        if len(violadoras) == 0:
+            break
+        violadoras = violadoras[np.argsort(reduzidos[violadoras])[:NOVAS_POR_RODADA]]
+        referencias = np.union1d(referencias, violadoras)
+
+    escore = res.x[0]
+    v, u = -duais[:m], -duais[m:]
+    if ctx["orientacao"] == "entrada":
+        return escore, v, u, livre, referencias
+    return 1 / escore, v, u, -livre, referencias
+
+
+def _contexto(X: np.ndarray, Y: np.ndarray, modelo: str, orientacao: str, restringir: bool) -> dict:
+    # Eficiência não depende de unidade de medida; reescalar melhora o PL.
+    escala_x, escala_y = X.mean(axis=0), Y.mean(axis=0)
+    escala_y = np.where(escala_y > 0, escala_y, 1.0)
+    X, Y = X / escala_x, Y / escala_y
+    return {
+        "X": X,
+        "Y": Y,
+        "escala_x": escala_x,
+        "escala_y": escala_y,
+        "colunas": np.vstack([X.T, -Y.T]),
+        "m": X.shape[1],
+        "n": len(X),
+        "modelo": modelo,
+        "orientacao": orientacao,
+        "referencias": _referencias_iniciais(X, Y, modelo) if restringir else None,
+    }
+
+
+def _preparar_contexto(contexto: dict) -> None:
+    global _CONTEXTO
+    _CONTEXTO = contexto
+
+
+def _rodar_lote(dmus: np.ndarray) -> tuple[np.ndarray, ...]:
+    ctx = _CONTEXTO
+    referencias = ctx["referencias"]
+    eficiencia = np.empty(len(dmus))
+    V = np.empty((len(dmus), ctx["m"]))
+    U = np.empty((len(dmus), ctx["Y"].shape[1]))
+    livre = np.empty(len(dmus))
+    for i, o in enumerate(dmus):
+        eficiencia[i], V[i], U[i], livre[i], novas = _resolver_dmu(ctx, o, referencias)
+        if referencias is not None:
+            referencias = novas
+    return eficiencia, V, U, livre
+
+
+def dea(
+    entradas,
+    saidas,
+    modelo: str = "CCR",
+    orientacao: str = "saida",
+    tamanho_lote: int = 250,
+    trabalhadores: int | None = None,
+    restringir_referencias: bool = True,
+) -> ResultadoDEA:
+    """Eficiência DEA de cada DMU (linhas de ``entradas`` e ``saidas``).
+
+    ``modelo`` é ``"CCR"`` ou ``"BCC"`` e ``orientacao``, ``"entrada"`` ou
+    ``"saida"``; ``dea(X, Y, "CCR", "saida")`` corresponde a
+    ``adndea.solver.CCR_O(X, Y)``. Entradas precisam ser positivas e saídas,
+    não negativas. Com ``restringir_referencias=False``, cada PL usa todas as
+    DMUs, como nos solvers que resolvem uma DMU por vez; o resultado é o
+    mesmo, só mais lento.
+    """
+    modelo = modelo.upper()
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo deve ser um de {MODELOS}; recebido {modelo!r}.")
+    if orientacao not in ORIENTACOES:
+        raise ValueError(f"Orientação deve ser uma de {ORIENTACOES}; recebida {orientacao!r}.")
+    X, Y = _matriz(entradas), _matriz(saidas)
+    if len(X) != len(Y):
+        raise ValueError("Entradas e saídas devem ter o mesmo número de DMUs.")
+    if (X <= 0).any() or (Y < 0).any() or not (Y > 0).any(axis=1).all():
+        raise ValueError("Entradas devem ser positivas e cada DMU precisa de alguma saída positiva.")
+
+    contexto = _contexto(X, Y, modelo, orientacao, restringir_referencias)
+
+    lotes = np.array_split(np.arange(len(X)), max(1, -(-len(X) // tamanho_lote)))
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    if trabalhadores <= 1 or len(lotes) <= 1:
+        _preparar_contexto(contexto)
+        partes = [_rodar_lote(lote) for lote in lotes]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(trabalhadores, len(lotes)), initializer=_preparar_contexto, initargs=(contexto,)
+        ) as executor:
+            partes = list(executor.map(_rodar_lote, lotes))
+
+    eficiencia, V, U, livre = (np.concatenate(p) for p in zip(*partes))
+    return ResultadoDEA(
+        eficiencia=eficiencia,
+        pesos_entradas=V / contexto["escala_x"],
+        pesos_saidas=U / contexto["escala_y"],
+        peso_livre=livre,
+        modelo=modelo,
+        orientacao=orientacao,
+    )
+
+
+def dados_sinteticos(n: int, entradas: int = 2, saidas: int = 2, semente: int = 0):
+    """Entradas e saídas de uma fronteira Cobb-Douglas com ineficiência."""
+    gerador = np.random.default_rng(semente)
+    X = gerador.uniform(10, 100, size=(n, entradas))
+    producao = np.prod(X ** (0.8 / entradas), axis=1) * np.exp(-gerador.exponential(0.3, n))
+    participacao = gerador.dirichlet(np.ones(saidas), size=n)
+    return X, producao[:, None] * participacao
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede o tempo do DEA em lote em dados sintéticos.")
+    parser.add_argument("--dmus", type=int, default=10_000)
+    parser.add_argument("--entradas", type=int, default=2)
+    parser.add_argument("--saidas", type=int, default=2)
+    parser.add_argument("--trabalhadores", type=int, default=None)
+    parser.add_argument(
+        "--amostra-completa",
+        type=int,
+        default=200,
+        help="DMUs resolvidas também com todas as referências, para comparação",
+    )
+    args = parser.parse_args()
+
+    X, Y = dados_sinteticos(args.dmus, args.entradas, args.saidas)
+    amostra = np.linspace(0, args.dmus - 1, min(args.amostra_completa, args.dmus)).astype(int)
+    print(f"{args.dmus} DMUs, {args.entradas} entradas, {args.saidas} saídas")
+    for modelo in MODELOS:
+        for orientacao in ORIENTACOES:
+            inicio = time.perf_counter()
+            resultado = dea(X, Y, modelo, orientacao, trabalhadores=args.trabalhadores)
+            lote = time.perf_counter() - inicio
+
+            # O PL completo de cada DMU da amostra envolve todas as n DMUs.
+            contexto = _contexto(X, Y, modelo, orientacao, restringir=False)
+            inicio = time.perf_counter()
+            completo = np.array([_resolver_dmu(contexto, o, None)[0] for o in amostra])
+            por_dmu = (time.perf_counter() - inicio) / len(amostra)
+
+            diferenca = np.abs(completo - resultado.eficiencia[amostra]).max()
+            print(
+                f"{modelo}-{orientacao:<7} lote: {lote:7.1f} s | "
+                f"uma DMU por vez (estimado): {por_dmu * args.dmus:7.1f} s | "
+                f"eficientes: {resultado.eficientes.sum():5d} | "
+                f"diferença máx. na amostra: {diferenca:.1e}"
+            )
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""Conta unigramas e bigramas do corpus de discursos em uma única passada.
+
+O notebook ``01-analisar-base-discursos-rag.ipynb`` ajustava dois
+``CountVectorizer`` sobre os textos integrais, um para unigramas e outro para
+bigramas. Cada ajuste montava uma matriz esparsa documentos x termos apenas
+para somar as colunas, e a mudança lexical entre anos dependia dessa matriz
+continuar em memória. Este módulo produz as mesmas tabelas sem a matriz:
+
+1. cada lote de documentos é normalizado uma vez (minúsculas e remoção de
+   acentos, como ``strip_accents='unicode'``) e tokenizado com os dois
+   padrões de token usados pelo notebook;
+2. as palavras distintas do lote recebem um hash estável de 64 bits, e as
+   stopwords são descartadas pela tabela de palavras distintas;
+3. as ocorrências por documento são agregadas sobre os hashes, o que dá a
+   frequência, a frequência de documentos e as quebras por ano e partido de
+   cada termo;
+4. as tabelas parciais dos lotes são somadas à medida que chegam, e os filtros
+   ``min_df``, ``max_df`` e ``max_features`` são aplicados no final.
+
+A contagem é exata: os hashes só substituem as palavras como chave de
+agregação. Os lotes são distribuídos entre processos. O módulo pode ser
+importado pelo notebook ou executado diretamente sobre o parquet do corpus.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from quase_duplicados import MULTIPLICADOR_SHINGLE, misturar
+
+
+# token_pattern do vetorizador de unigramas do notebook.
+PADRAO_UNIGRAMA = re.compile(r"(?u)\b[a-zA-ZÀ-ÿ]{3,}\b")
+# token_pattern padrão do CountVectorizer, usado pelo vetorizador de bigramas.
+PADRAO_BIGRAMA = re.compile(r"(?u)\b\w\w+\b")
+ARQUIVO_PADRAO = Path("../dados/discursos_2019-02-01_2023-01-31.parquet")
+# Quantidade de tabelas parciais acumuladas antes de somá-las.
+LOTES_POR_COMPACTACAO = 8
+
+LOG = logging.getLogger("estatisticas_termos")
+
+
+Tabela = dict[str, np.ndarray]
+
+
+def preprocessar(texto: str) -> str:
+    """``lowercase=True`` seguido de ``strip_accents='unicode'``, como no ``CountVectorizer``."""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    decomposto = unicodedata.normalize("NFKD", texto)
+    # Testa cada caractere distinto uma vez e remove as marcas com uma única regex.
+    marcas = [caractere for caractere in set(decomposto) if unicodedata.combining(caractere)]
+    if not marcas:
+        return decomposto
+    return re.sub(f"[{''.join(map(re.escape, marcas))}]+", "", decomposto)
+
+
+def normalizar_stopwords(palavras: Iterable[str]) -> list[str]:
+    """Aplica às stopwords a mesma normalização dos textos."""
+    return sorted({preprocessar(str(palavra)).strip() for palavra in palavras if str(palavra).strip()})
+
+
+def carregar_stopwords_pt() -> list[str]:
+    """União das stopwords do NLTK e do Stopwords ISO, como na seção 1 do notebook."""
+    try:
+        import nltk
+        import stopwordsiso
+        from nltk.corpus import stopwords
+    except ModuleNotFoundError as exc:
+        raise ValueError(
+            "stopwords indisponíveis: instale nltk e stopwordsiso ou informe --stopwords"
+        ) from exc
+    try:
+        nltk.data.find("corpora/stopwords")
+    except LookupError:
+        nltk.download("stopwords", quiet=True)
+    return normalizar_stopwords([*stopwords.words("portuguese"), *stopwordsiso.stopwords("pt")])
+
+
+def hash_distintos(palavras: pd.Index) -> np.ndarray:
+    """Hash estável de 64 bits de cada palavra distinta."""
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(palavra.encode("utf-8"), digest_size=8).digest(), "little")
+            for palavra in palavras
+        ),
+        dtype=np.uint64,
+        count=len(palavras),
+    )
+
+
+def combinar(primeiro: np.ndarray, segundo: np.ndarray) -> np.ndarray:
+    """Hash de 64 bits de pares de valores ``uint64``; a ordem do par importa."""
+    return misturar(primeiro * MULTIPLICADOR_SHINGLE + segundo)
+
+
+def _reduzir(tabela: Tabela, somar: tuple[str, ...] = ("frequencia", "documentos")) -> Tabela:
+    """Soma as colunas ``somar`` das linhas com a mesma ``chave``.
+
+    As demais colunas dependem apenas da chave e ficam com o valor da primeira
+    linha de cada uma.
+    """
+    codigos, chaves = pd.factorize(tabela["chave"])
+    primeiras = np.empty(len(chaves), dtype=np.int64)
+    primeiras[codigos[::-1]] = np.arange(len(codigos) - 1, -1, -1)
+    reduzida = {nome: valores[primeiras] for nome, valores in tabela.items() if nome not in somar}
+    for nome in somar:
+        reduzida[nome] = np.bincount(codigos, weights=tabela[nome], minlength=len(chaves)).astype(np.int64)
+    return reduzida
+
+
+def _concatenar(tabelas: list[Tabela]) -> Tabela:
+    return {nome: np.concatenate([tabela[nome] for tabela in tabelas]) for nome in tabelas[0]}
+
+
+def _contar_lote(
+    parametros: tuple[list[str], np.ndarray, list[str]],
+) -> tuple[dict[str, Tabela], dict[int, str], dict[str, int]]:
+    """Tabelas parciais de um lote, vocabulário ``hash -> palavra`` e total de tokens.
+
+    ``grupos`` tem uma coluna de códigos inteiros por dimensão. As tabelas por
+    dimensão se chamam ``<tabela>_<posição da dimensão>`` e usam como chave o
+    hash do par (termo, grupo).
+    """
+    textos, grupos, stopwords = parametros
+    preprocessados = [preprocessar(texto) for texto in textos]
+    tabelas: dict[str, Tabela] = {}
+    vocabulario: dict[int, str] = {}
+    tokens: dict[str, int] = {}
+    for tabela, padrao in (("unigramas", PADRAO_UNIGRAMA), ("bigramas", PADRAO_BIGRAMA)):
+        por_documento = [padrao.findall(texto) for texto in preprocessados]
+        tamanhos = np.fromiter(map(len, por_documento), dtype=np.int64, count=len(por_documento))
+        documentos = np.repeat(np.arange(len(por_documento), dtype=np.uint64), tamanhos)
+        codigos, distintas = pd.factorize(pd.Series(list(chain.from_iterable(por_documento)), dtype=object))
+        manter = ~distintas.isin(stopwords)
+        hashes_distintas = hash_distintos(distintas)
+        vocabulario.update(zip(hashes_distintas[manter].tolist(), distintas[manter]))
+
+        selecionados = manter[codigos]
+        documentos = documentos[selecionados]
+        hashes = hashes_distintas[codigos[selecionados]]
+        if tabela == "bigramas":
+            # As stopwords saem antes da formação dos bigramas, como no CountVectorizer.
+            consecutivos = documentos[1:] == documentos[:-1]
+            componentes = {"hash_1": hashes[:-1][consecutivos], "hash_2": hashes[1:][consecutivos]}
+            termos = combinar(componentes["hash_1"], componentes["hash_2"])
+            documentos = documentos[:-1][consecutivos]
+        else:
+            componentes = {}
+            termos = hashes
+        tokens[tabela] = len(termos)
+
+        # Uma linha por par (documento, termo), com a frequência do termo no documento.
+        ocorrencias = _reduzir(
+            {
+                "chave": combinar(termos, documentos),
+                "termo": termos,
+                "documento": documentos,
+                **componentes,
+                "frequencia": np.ones(len(termos), dtype=np.int64),
+            },
+            somar=("frequencia",),
+        )
+        um_documento = np.ones(len(ocorrencias["termo"]), dtype=np.int64)
+        tabelas[tabela] = _reduzir(
+            {
+                "chave": ocorrencias["termo"],
+                **{nome: ocorrencias[nome] for nome in componentes},
+                "frequencia": ocorrencias["frequencia"],
+                "documentos": um_documento,
+            }
+        )
+        grupos_ocorrencias = grupos[ocorrencias["documento"].astype(np.int64)].astype(np.uint64) + np.uint64(1)
+        for dimensao in range(grupos.shape[1]):
+            tabelas[f"{tabela}_{dimensao}"] = _reduzir(
+                {
+                    "chave": combinar(ocorrencias["termo"], grupos_ocorrencias[:, dimensao]),
+                    "frequencia": ocorrencias["frequencia"],
+                    "documentos": um_documento,
+                }
+            )
+    return tabelas, vocabulario, tokens
+
+
+def estatisticas_termos(
+    textos: pd.Series,
+    grupos: pd.DataFrame | None = None,
+    *,
+    stopwords: Iterable[str] = (),
+    min_documentos_unigramas: int = 10,
+    max_proporcao_documentos_unigramas: float = 0.98,
+    min_documentos_bigramas: int = 20,
+    max_bigramas: int | None = 5_000,
+    tamanho_lote: int = 500,
+    trabalhadores: int | None = None,
+) -> dict[str, Any]:
+    """Frequências de unigramas e bigramas, no total e por dimensão de ``grupos``.
+
+    Os filtros reproduzem os vetorizadores da seção 6 do notebook: unigramas
+    presentes em ao menos ``min_documentos_unigramas`` documentos e em no
+    máximo ``max_proporcao_documentos_unigramas`` deles; bigramas presentes em
+    ao menos ``min_documentos_bigramas`` documentos, limitados aos
+    ``max_bigramas`` mais frequentes. ``stopwords`` deve estar normalizada
+    como os textos (ver ``normalizar_stopwords``).
+
+    ``grupos`` é um ``DataFrame`` com o mesmo índice de ``textos``, e cada
+    coluna é uma dimensão de quebra. O resultado contém ``unigramas`` e
+    ``bigramas`` (colunas ``termo``/``bigrama``, ``frequencia`` e
+    ``documentos``), uma tabela ``<tabela>_por_<dimensão>`` por dimensão, com
+    o nome da dimensão em minúsculas, e ``metricas``.
+    """
+    inicio = time.perf_counter()
+    lista_textos = textos.fillna("").astype(str).tolist()
+    grupos = pd.DataFrame(index=textos.index) if grupos is None else grupos.reindex(textos.index)
+    dimensoes = list(grupos.columns)
+    rotulos_grupos: list[pd.Index] = []
+    codigos_grupos = np.zeros((len(lista_textos), len(dimensoes)), dtype=np.int64)
+    for posicao, dimensao in enumerate(dimensoes):
+        codigos, rotulos = pd.factorize(grupos[dimensao], use_na_sentinel=False)
+        codigos_grupos[:, posicao] = codigos
+        rotulos_grupos.append(pd.Index(rotulos))
+    lista_stopwords = sorted(set(stopwords))
+
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    lotes = [
+        (
+            lista_textos[posicao : posicao + tamanho_lote],
+            codigos_grupos[posicao : posicao + tamanho_lote],
+            lista_stopwords,
+        )
+        for posicao in range(0, len(lista_textos), tamanho_lote)
+    ]
+    # Cada grupo de LOTES_POR_COMPACTACAO tabelas pendentes é somado em uma
+    # compactada; as compactadas só são combinadas no final.
+    pendentes: dict[str, list[Tabela]] = {}
+    compactadas: dict[str, list[Tabela]] = {}
+    vocabulario: dict[int, str] = {}
+    tokens = {"unigramas": 0, "bigramas": 0}
+
+    def acumular(resultados: Iterable[tuple[dict[str, Tabela], dict[int, str], dict[str, int]]]) -> None:
+        for tabelas, vocabulario_lote, tokens_lote in resultados:
+            vocabulario.update(vocabulario_lote)
+            for tabela, quantidade in tokens_lote.items():
+                tokens[tabela] += quantidade
+            for nome, tabela in tabelas.items():
+                pendentes.setdefault(nome, []).append(tabela)
+                if len(pendentes[nome]) >= LOTES_POR_COMPACTACAO:
+                    compactadas.setdefault(nome, []).append(_reduzir(_concatenar(pendentes.pop(nome))))
+
+    if trabalhadores == 1 or len(lotes) <= 1:
+        acumular(map(_contar_lote, lotes))
+    else:
+        with ProcessPoolExecutor(max_workers=min(trabalhadores, len(lotes))) as executor:
+            acumular(executor.map(_contar_lote, lotes))
+    tempo_contagem = time.perf_counter() - inicio
+
+    def partes(nome: str) -> list[Tabela]:
+        return compactadas.pop(nome, []) + pendentes.pop(nome, [])
+
+    def somada(nome: str, componentes: tuple[str, ...]) -> Tabela:
+        tabelas = partes(nome)
+        if tabelas:
+            return _reduzir(_concatenar(tabelas))
+        vazia = {coluna: np.zeros(0, dtype=np.uint64) for coluna in ("chave", *componentes)}
+        return {**vazia, "frequencia": np.zeros(0, dtype=np.int64), "documentos": np.zeros(0, dtype=np.int64)}
+
+    def somada_nas_chaves(nome: str, chaves: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Frequência e documentos apenas das ``chaves`` pedidas, sem combinar a tabela inteira."""
+        indice = pd.Index(chaves)
+        frequencia = np.zeros(len(chaves), dtype=np.int64)
+        documentos = np.zeros(len(chaves), dtype=np.int64)
+        for tabela in partes(nome):
+            linhas = indice.get_indexer(tabela["chave"])
+            encontradas = linhas >= 0
+            for soma, coluna in ((frequencia, "frequencia"), (documentos, "documentos")):
+                soma += np.bincount(
+                    linhas[encontradas], weights=tabela[coluna][encontradas], minlength=len(chaves)
+                ).astype(np.int64)
+        return frequencia, documentos
+
+    total_documentos = len(lista_textos)
+    resultado: dict[str, Any] = {}
+    metricas: dict[str, Any] = {"documentos": total_documentos, "dimensoes": dimensoes}
+    for tabela, coluna in (("unigramas", "termo"), ("bigramas", "bigrama")):
+        contagem = somada(tabela, ("hash_1", "hash_2") if tabela == "bigramas" else ())
+        frequencia, documentos = contagem["frequencia"], contagem["documentos"]
+        if tabela == "unigramas":
+            maximo = max_proporcao_documentos_unigramas * total_documentos
+            mantidos = np.flatnonzero((documentos >= min_documentos_unigramas) & (documentos <= maximo))
+            rotulos = [vocabulario[chave] for chave in contagem["chave"][mantidos].tolist()]
+        else:
+            mantidos = np.flatnonzero(documentos >= min_documentos_bigramas)
+            if max_bigramas is not None:
+                mantidos = mantidos[np.argsort(-frequencia[mantidos], kind="stable")[:max_bigramas]]
+            rotulos = [
+                f"{vocabulario[primeiro]} {vocabulario[segundo]}"
+                for primeiro, segundo in zip(
+                    contagem["hash_1"][mantidos].tolist(), contagem["hash_2"][mantidos].tolist()
+                )
+            ]
+        rotulos = np.asarray(rotulos, dtype=object)
+        resultado[tabela] = pd.DataFrame(
+            {coluna: rotulos, "frequencia": frequencia[mantidos], "documentos": documentos[mantidos]}
+        ).sort_values(["frequencia", coluna], ascending=[False, True], ignore_index=True)
+
+        chaves = contagem["chave"][mantidos]
+        for posicao, dimensao in enumerate(dimensoes):
+            quantidade_grupos = len(rotulos_grupos[posicao])
+            termo = np.repeat(np.arange(len(chaves)), quantidade_grupos)
+            grupo = np.tile(np.arange(quantidade_grupos), len(chaves))
+            frequencia_grupo, documentos_grupo = somada_nas_chaves(
+                f"{tabela}_{posicao}", combinar(chaves[termo], grupo.astype(np.uint64) + np.uint64(1))
+            )
+            existentes = documentos_grupo > 0
+            resultado[f"{tabela}_por_{str(dimensao).lower()}"] = pd.DataFrame(
+                {
+                    coluna: rotulos[termo[existentes]],
+                    dimensao: rotulos_grupos[posicao].take(grupo[existentes]),
+                    "frequencia": frequencia_grupo[existentes],
+                    "documentos": documentos_grupo[existentes],
+                }
+            ).sort_values([coluna, dimensao], ignore_index=True)
+        metricas[f"tokens_{tabela}"] = int(tokens[tabela])
+        metricas[f"{tabela}_distintos"] = int(len(contagem["chave"]))
+        metricas[f"{tabela}_mantidos"] = int(len(mantidos))
+    metricas["segundos_contagem"] = round(tempo_contagem, 3)
+    metricas["segundos_total"] = round(time.perf_counter() - inicio, 3)
+    resultado["metricas"] = metricas
+    return resultado
+
+
+def carregar_corpus_integral(arquivo: Path) -> tuple[pd.Series, pd.DataFrame]:
+    """Textos integrais não vazios, com ano e partido, como ``corpus_integral`` no notebook."""
+    df = pd.read_parquet(arquivo, columns=["CodigoPronunciamento", "Data", "Partido", "TextoDiscursoIntegral"])
+    df = df.set_index("CodigoPronunciamento")
+    integral = df["TextoDiscursoIntegral"].fillna("").astype(str).str.strip()
+    grupos = pd.DataFrame(
+        {
+            "ano": pd.to_datetime(df["Data"], errors="coerce").dt.year.astype("Int64"),
+            "Partido": df["Partido"].fillna("").astype(str).str.strip(),
+        },
+        index=df.index,
+    )
+    manter = integral.ne("")
+    return integral.loc[manter].rename("documento_rag"), grupos.loc[manter]
+
+
+def ler_stopwords(arquivo: Path | None) -> list[str]:
+    if arquivo is None:
+        return carregar_stopwords_pt()
+    return normalizar_stopwords(arquivo.read_text(encoding="utf-8").splitlines())
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Conta unigramas e bigramas dos textos integrais em uma única passada."
+    )
+    parser.add_argument("--arquivo", type=Path, default=ARQUIVO_PADRAO, help="parquet do corpus")
+    parser.add_argument(
+        "--diretorio-saida",
+        type=Path,
+        default=Path("../dados/estatisticas_termos"),
+        help="destino das tabelas .parquet e de metricas.json",
+    )
+    parser.add_argument(
+        "--stopwords",
+        type=Path,
+        default=None,
+        help="arquivo com uma stopword por linha (padrão: NLTK + Stopwords ISO, como no notebook)",
+    )
+    parser.add_argument("--min-df-unigramas", type=int, default=10, help="padrão: 10")
+    parser.add_argument(
+        "--max-df-unigramas", type=float, default=0.98, help="proporção de documentos (padrão: 0,98)"
+    )
+    parser.add_argument("--min-df-bigramas", type=int, default=20, help="padrão: 20")
+    parser.add_argument("--max-bigramas", type=int, default=5_000, help="padrão: 5000")
+    parser.add_argument("--tamanho-lote", type=int, default=500, help="documentos por lote (padrão: 500)")
+    parser.add_argument(
+        "--trabalhadores",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processos paralelos (padrão: número de núcleos)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        default="INFO",
+    )
+    return parser
+
+
+def validar_argumentos(args: argparse.Namespace) -> None:
+    if not 0 < args.max_df_unigramas <= 1:
+        raise ValueError("max_df_unigramas deve estar no intervalo (0, 1]")
+    if min(args.min_df_unigramas, args.min_df_bigramas, args.max_bigramas, args.tamanho_lote) < 1:
+        raise ValueError("min_df, max_bigramas e tamanho_lote devem ser positivos")
+    if args.trabalhadores < 1:
+        raise ValueError("trabalhadores deve ser positivo")
+
+
+def executar(args: argparse.Namespace) -> dict[str, Any]:
+    validar_argumentos(args)
+    stopwords = ler_stopwords(args.stopwords)
+    textos, grupos = carregar_corpus_integral(args.arquivo)
+    LOG.info("Documentos integrais: %d; stopwords: %d", len(textos), len(stopwords))
+    resultado = estatisticas_termos(
+        textos,
+        grupos,
+        stopwords=stopwords,
+        min_documentos_unigramas=args.min_df_unigramas,
+        max_proporcao_documentos_unigramas=args.max_df_unigramas,
+        min_documentos_bigramas=args.min_df_bigramas,
+        max_bigramas=args.max_bigramas,
+        tamanho_lote=args.tamanho_lote,
+        trabalhadores=args.trabalhadores,
+    )
+    saida = args.diretorio_saida.resolve()
+    saida.mkdir(parents=True, exist_ok=True)
+    for nome, tabela in resultado.items():
+        if isinstance(tabela, pd.DataFrame):
+            tabela.to_parquet(saida / f"{nome}.parquet", index=False)
+    (saida / "metricas.json").write_text(
+        json.dumps(resultado["metricas"], ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    LOG.info(
+        "Concluído em %.1fs: %d unigramas e %d bigramas mantidos; saída: %s",
+        resultado["metricas"]["segundos_total"],
+        resultado["metricas"]["unigramas_mantidos"],
+        resultado["metricas"]["bigramas_mantidos"],
+        saida,
+    )
+    return resultado
+
+
+def main() -> int:
+    parser = criar_parser()
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    try:
+        executar(args)
+    except (ValueError, KeyError, OSError) as exc:
+        LOG.error("Falha: %s", exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
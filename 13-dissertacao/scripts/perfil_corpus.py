@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Calcula e guarda em cache o perfil por documento do corpus de discursos.
+
+O notebook ``01-analisar-base-discursos-rag.ipynb`` recalculava a cada
+execução o ``hash_texto`` (normalização Unicode e SHA-256 linha a linha), as
+contagens de caracteres, palavras e linhas e os indicadores de qualidade
+textual. Este módulo calcula essas colunas uma vez e as grava em um parquet
+auxiliar cujo nome combina:
+
+- o SHA-256 do parquet do corpus, já conferido pelo notebook com
+  ``EXPECTED_SHA256``;
+- o SHA-256 do código que calcula as colunas.
+
+Alterar o corpus ou qualquer função de cálculo muda o nome do arquivo, e o
+perfil é recalculado na próxima execução.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import inspect
+import logging
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+ARQUIVO_PADRAO = Path("../dados/discursos_2019-02-01_2023-01-31.parquet")
+COLUNAS_ENTRADA = ("CodigoPronunciamento", "TextoDiscursoIntegral", "Resumo")
+# nome: (padrão, é expressão regular, diferencia maiúsculas)
+PADROES_QUALIDADE = {
+    "possui_html": (r"<[^>]+>", True, True),
+    "possui_url": (r"https?://|www\.", True, False),
+    "espaços_repetidos": (r" {3,}", True, True),
+    "caractere_substituição": ("�", False, True),
+}
+COLUNAS_QUALIDADE = ("vazio", "menos_de_50_palavras", "mais_de_10_mil_palavras", *PADROES_QUALIDADE)
+
+LOG = logging.getLogger("perfil_corpus")
+
+
+def normalizar_para_hash(valor: str) -> str:
+    valor = unicodedata.normalize("NFKC", valor).casefold()
+    return re.sub(r"\s+", " ", valor).strip()
+
+
+def hash_texto(valor: str) -> str:
+    normalizado = normalizar_para_hash(valor)
+    return hashlib.sha256(normalizado.encode("utf-8")).hexdigest() if normalizado else ""
+
+
+def calcular_perfil(df: pd.DataFrame) -> pd.DataFrame:
+    """Colunas por documento, na mesma ordem das linhas de ``df``.
+
+    Reproduz as seções 4 e 5 do notebook: ``documento_rag`` é o texto integral
+    ou, na falta dele, o resumo.
+    """
+    integral = df["TextoDiscursoIntegral"].fillna("").astype(str).str.strip()
+    resumo = df["Resumo"].fillna("").astype(str).str.strip()
+    tem_integral = integral.ne("")
+    texto = pd.Series(np.where(tem_integral, integral, resumo), index=df.index)
+
+    perfil = pd.DataFrame(index=df.index)
+    perfil["CodigoPronunciamento"] = df["CodigoPronunciamento"].astype(str)
+    perfil["fonte_documento"] = np.select(
+        [tem_integral, ~tem_integral & resumo.ne("")],
+        ["texto_integral", "resumo_fallback"],
+        default="indisponível",
+    )
+    perfil["n_caracteres"] = texto.str.len()
+    perfil["n_palavras"] = texto.str.count(r"\S+")
+    perfil["n_linhas"] = texto.str.count(r"\n") + texto.ne("").astype(int)
+    perfil["tokens_estimados"] = np.ceil(perfil["n_caracteres"] / 4).astype(int)
+    perfil["razao_caracteres_palavra"] = np.where(
+        perfil["n_palavras"] > 0, perfil["n_caracteres"] / perfil["n_palavras"], np.nan
+    )
+    perfil["vazio"] = texto.eq("")
+    perfil["menos_de_50_palavras"] = perfil["n_palavras"].between(1, 49)
+    perfil["mais_de_10_mil_palavras"] = perfil["n_palavras"].gt(10_000)
+    for nome, (padrao, regex, maiusculas) in PADROES_QUALIDADE.items():
+        perfil[nome] = texto.str.contains(padrao, regex=regex, case=maiusculas, na=False)
+    perfil["hash_texto"] = texto.map(hash_texto)
+    return perfil
+
+
+def hash_codigo_perfil() -> str:
+    """SHA-256 do código-fonte das funções e constantes que definem o perfil."""
+    partes = [inspect.getsource(funcao) for funcao in (normalizar_para_hash, hash_texto, calcular_perfil)]
+    partes.append(repr(PADROES_QUALIDADE))
+    return hashlib.sha256("\n".join(partes).encode("utf-8")).hexdigest()
+
+
+def sha256_arquivo(arquivo: Path) -> str:
+    digest = hashlib.sha256()
+    with arquivo.open("rb") as origem:
+        for bloco in iter(lambda: origem.read(1 << 20), b""):
+            digest.update(bloco)
+    return digest.hexdigest()
+
+
+def caminho_perfil(diretorio: Path, sha256_corpus: str) -> Path:
+    return diretorio / f"perfil_{sha256_corpus[:16]}_{hash_codigo_perfil()[:12]}.parquet"
+
+
+def carregar_ou_calcular_perfil(
+    df: pd.DataFrame, sha256_corpus: str, diretorio: Path
+) -> tuple[pd.DataFrame, bool]:
+    """Lê o perfil em cache ou o calcula e grava; informa se veio do cache.
+
+    O perfil em cache só é aceito se tiver uma linha por registro de ``df``,
+    com os mesmos códigos de pronunciamento na mesma ordem.
+    """
+    destino = caminho_perfil(diretorio, sha256_corpus)
+    codigos = df["CodigoPronunciamento"].astype(str).to_numpy()
+    if destino.exists():
+        perfil = pd.read_parquet(destino)
+        if len(perfil) == len(df) and np.array_equal(perfil["CodigoPronunciamento"].to_numpy(), codigos):
+            perfil.index = df.index
+            return perfil, True
+        LOG.warning("Perfil em cache não corresponde ao corpus; recalculando: %s", destino)
+    perfil = calcular_perfil(df)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    perfil.reset_index(drop=True).to_parquet(destino, index=False)
+    return perfil, False
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Gera o perfil por documento do corpus usado pelo notebook de auditoria."
+    )
+    parser.add_argument("--arquivo", type=Path, default=ARQUIVO_PADRAO, help="parquet do corpus")
+    parser.add_argument(
+        "--diretorio-saida",
+        type=Path,
+        default=None,
+        help="destino do perfil (padrão: perfil_corpus/ ao lado do parquet)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        default="INFO",
+    )
+    return parser
+
+
+def executar(args: argparse.Namespace) -> Path:
+    arquivo = args.arquivo.resolve()
+    diretorio = (args.diretorio_saida or arquivo.parent / "perfil_corpus").resolve()
+    inicio = time.perf_counter()
+    sha256_corpus = sha256_arquivo(arquivo)
+    df = pd.read_parquet(arquivo, columns=list(COLUNAS_ENTRADA))
+    perfil, em_cache = carregar_ou_calcular_perfil(df, sha256_corpus, diretorio)
+    destino = caminho_perfil(diretorio, sha256_corpus)
+    LOG.info(
+        "Perfil de %d documentos %s em %.1fs: %s",
+        len(perfil),
+        "reutilizado" if em_cache else "calculado",
+        time.perf_counter() - inicio,
+        destino,
+    )
+    return destino
+
+
+def main() -> int:
+    parser = criar_parser()
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    try:
+        executar(args)
+    except (ValueError, KeyError, OSError) as exc:
+        LOG.error("Falha: %s", exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""Detecta quase duplicidade no corpus completo de discursos com MinHash e LSH.
+
+Substitui a amostra de 800 documentos do notebook
+``01-analisar-base-discursos-rag.ipynb``, em que o laço de ``shingles_palavras``
+e o ``MinHash.update`` por shingle do ``datasketch`` tornavam inviável
+processar todo o corpus. Aqui o cálculo usa apenas numpy:
+
+1. shingles de cinco palavras recebem um hash polinomial calculado de uma só
+   vez sobre os hashes das palavras de cada lote de documentos;
+2. as assinaturas MinHash formam uma matriz ``documentos x posições``. Em vez
+   de ``k`` permutações, cada shingle passa por um único hash que escolhe a
+   posição e o valor (*one permutation hashing*); o mínimo por posição sai de
+   ``np.minimum.at`` e as posições vazias são preenchidas por rotação
+   (densificação), o que custa uma passada sobre os shingles em vez de ``k``;
+3. o LSH por bandas gera pares candidatos, que são confirmados pela
+   concordância das assinaturas e, em seguida, pelo Jaccard exato dos shingles;
+4. os grupos de quase duplicidade são os componentes conexos dos pares
+   confirmados.
+
+Os lotes de documentos são distribuídos entre processos. O módulo pode ser
+importado pelo notebook ou executado diretamente sobre o parquet do corpus.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+PADRAO_TOKEN = re.compile(r"(?u)\b\w{2,}\b")
+MULTIPLICADOR_SHINGLE = np.uint64(0x9E3779B97F4A7C15)
+DESLOCAMENTO_DENSIFICACAO = np.uint64(0x632BE59BD9B4E019)
+ARQUIVO_PADRAO = Path("../dados/discursos_2019-02-01_2023-01-31.parquet")
+
+LOG = logging.getLogger("quase_duplicados")
+
+
+def misturar(valores: np.ndarray) -> np.ndarray:
+    """Finalizador do splitmix64: espalha os bits de hashes ``uint64``."""
+    valores = valores ^ (valores >> np.uint64(30))
+    valores = valores * np.uint64(0xBF58476D1CE4E5B9)
+    valores = valores ^ (valores >> np.uint64(27))
+    valores = valores * np.uint64(0x94D049BB133111EB)
+    return valores ^ (valores >> np.uint64(31))
+
+
+def hash_palavras(palavras: list[str]) -> np.ndarray:
+    """Hash estável de 64 bits por palavra, calculado uma vez por palavra distinta."""
+    if not palavras:
+        return np.zeros(0, dtype=np.uint64)
+    codigos, distintas = pd.factorize(pd.Series(palavras, dtype=object), sort=False)
+    tabela = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(palavra.encode("utf-8"), digest_size=8).digest(), "little")
+            for palavra in distintas
+        ),
+        dtype=np.uint64,
+        count=len(distintas),
+    )
+    return tabela[codigos]
+
+
+def hashes_shingles(textos: Sequence[str], n: int = 5) -> tuple[np.ndarray, np.ndarray]:
+    """Hashes dos shingles de ``n`` palavras de um lote, concatenados por documento.
+
+    Devolve também a quantidade de shingles de cada documento. Documentos com
+    menos de ``n`` palavras ficam sem shingles, como em ``shingles_palavras``.
+    Repetições dentro de um documento são mantidas: não alteram o MinHash.
+    """
+    # O colapso de espaços de perfil_corpus.normalizar_para_hash nao muda as palavras extraidas.
+    palavras_por_documento = [
+        PADRAO_TOKEN.findall(unicodedata.normalize("NFKC", texto).casefold()) for texto in textos
+    ]
+    tamanhos = np.fromiter(map(len, palavras_por_documento), dtype=np.int64, count=len(textos))
+    quantidades = np.maximum(tamanhos - n + 1, 0)
+    hashes = hash_palavras(list(chain.from_iterable(palavras_por_documento)))
+    janelas = len(hashes) - n + 1
+    if janelas <= 0 or not quantidades.any():
+        return np.zeros(0, dtype=np.uint64), quantidades
+
+    valores = np.zeros(janelas, dtype=np.uint64)
+    for deslocamento in range(n):
+        valores = valores * MULTIPLICADOR_SHINGLE + hashes[deslocamento : deslocamento + janelas]
+    valores = misturar(valores)
+
+    # Descarta as janelas que atravessam a fronteira entre dois documentos.
+    inicios_palavras = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+    inicios_shingles = np.concatenate(([0], np.cumsum(quantidades)[:-1]))
+    posicoes = np.arange(int(quantidades.sum())) + np.repeat(inicios_palavras - inicios_shingles, quantidades)
+    return valores[posicoes], quantidades
+
+
+def assinaturas_minhash(hashes: np.ndarray, quantidades: np.ndarray, num_perm: int, semente: int) -> np.ndarray:
+    """Matriz ``uint32`` de assinaturas; documentos sem shingles ficam com o valor máximo.
+
+    Os 32 bits altos do hash de cada shingle escolhem a posição e os 32 bits
+    baixos são o valor comparado. Uma posição vazia copia o valor da próxima
+    posição ocupada à direita (circularmente), misturado com a distância, de
+    modo que dois documentos com os mesmos shingles continuam com assinaturas
+    iguais.
+    """
+    vazio = np.iinfo(np.uint32).max
+    total = len(quantidades)
+    assinaturas = np.full(total * num_perm, vazio, dtype=np.uint32)
+    if len(hashes):
+        permutados = misturar(hashes ^ misturar(np.array([semente], dtype=np.uint64))[0])
+        posicoes = ((permutados >> np.uint64(32)) * np.uint64(num_perm)) >> np.uint64(32)
+        documentos = np.repeat(np.arange(total, dtype=np.uint64), quantidades)
+        valores = (permutados & np.uint64(vazio)).astype(np.uint32)
+        np.minimum.at(assinaturas, (documentos * np.uint64(num_perm) + posicoes).astype(np.int64), valores)
+    assinaturas = assinaturas.reshape(total, num_perm)
+
+    ocupadas = assinaturas != vazio
+    parciais = ocupadas.any(axis=1) & ~ocupadas.all(axis=1)
+    if parciais.any():
+        bloco = assinaturas[parciais]
+        colunas = np.arange(2 * num_perm)
+        proxima = np.where(np.tile(ocupadas[parciais], 2), colunas, 2 * num_perm)
+        proxima = np.minimum.accumulate(proxima[:, ::-1], axis=1)[:, ::-1][:, :num_perm]
+        distancia = (proxima - colunas[:num_perm]).astype(np.uint64)
+        origem = np.take_along_axis(bloco, proxima % num_perm, axis=1).astype(np.uint64)
+        preenchido = (misturar(origem + distancia * DESLOCAMENTO_DENSIFICACAO) >> np.uint64(32)).astype(np.uint32)
+        assinaturas[parciais] = np.where(distancia > 0, preenchido, bloco)
+    return assinaturas
+
+
+def _processar_lote(parametros: tuple[list[str], int, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    textos, num_perm, n, semente = parametros
+    hashes, quantidades = hashes_shingles(textos, n)
+    return assinaturas_minhash(hashes, quantidades, num_perm, semente), quantidades
+
+
+def calcular_assinaturas(
+    textos: Sequence[str],
+    *,
+    num_perm: int = 128,
+    n: int = 5,
+    semente: int = 42,
+    tamanho_lote: int = 500,
+    trabalhadores: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Assinaturas MinHash e quantidade de shingles de todos os documentos.
+
+    Com ``trabalhadores`` igual a 1 o cálculo roda no processo atual; caso
+    contrário, os lotes são distribuídos por ``ProcessPoolExecutor``.
+    """
+    trabalhadores = trabalhadores or os.cpu_count() or 1
+    lotes = [
+        (list(textos[inicio : inicio + tamanho_lote]), num_perm, n, semente)
+        for inicio in range(0, len(textos), tamanho_lote)
+    ]
+    if trabalhadores == 1 or len(lotes) <= 1:
+        resultados = [_processar_lote(lote) for lote in lotes]
+    else:
+        with ProcessPoolExecutor(max_workers=min(trabalhadores, len(lotes))) as executor:
+            resultados = list(executor.map(_processar_lote, lotes))
+    if not resultados:
+        return np.zeros((0, num_perm), dtype=np.uint32), np.zeros(0, dtype=np.int64)
+    return (
+        np.concatenate([assinaturas for assinaturas, _ in resultados]),
+        np.concatenate([quantidades for _, quantidades in resultados]),
+    )
+
+
+def escolher_bandas(limiar: float, num_perm: int) -> tuple[int, int]:
+    """Escolhe ``(bandas, linhas)`` com ponto de inflexão ``(1/b)^(1/r)`` logo abaixo do limiar.
+
+    Ficar abaixo do limiar favorece a revocação; os falsos candidatos são
+    descartados depois, na verificação das assinaturas.
+    """
+    opcoes = [(num_perm // linhas, linhas) for linhas in range(1, num_perm + 1) if num_perm % linhas == 0]
+
+    def inflexao(opcao: tuple[int, int]) -> float:
+        return (1 / opcao[0]) ** (1 / opcao[1])
+
+    return min(opcoes, key=lambda opcao: (inflexao(opcao) > limiar, abs(inflexao(opcao) - limiar)))
+
+
+def pares_candidatos(assinaturas: np.ndarray, validos: np.ndarray, bandas: int, linhas: int) -> np.ndarray:
+    """Pares ``(i, j)``, com ``i < j``, que coincidem em pelo menos uma banda."""
+    indices = np.flatnonzero(validos)
+    pesos = misturar(np.arange(1, linhas + 1, dtype=np.uint64))
+    blocos: list[np.ndarray] = []
+    for banda in range(bandas):
+        trecho = assinaturas[indices, banda * linhas : (banda + 1) * linhas].astype(np.uint64)
+        chaves = misturar((trecho * pesos).sum(axis=1, dtype=np.uint64) + np.uint64(banda))
+        ordem = np.argsort(chaves, kind="stable")
+        ordenadas = chaves[ordem]
+        limites = np.flatnonzero(np.diff(ordenadas)) + 1
+        inicios = np.concatenate(([0], limites))
+        fins = np.concatenate((limites, [len(ordenadas)]))
+        for inicio, fim in zip(inicios[fins - inicios > 1], fins[fins - inicios > 1]):
+            membros = np.sort(indices[ordem[inicio:fim]])
+            primeiro, segundo = np.triu_indices(len(membros), 1)
+            blocos.append(np.column_stack((membros[primeiro], membros[segundo])))
+    if not blocos:
+        return np.zeros((0, 2), dtype=np.int64)
+    pares = np.concatenate(blocos).astype(np.int64)
+    return np.unique(pares, axis=0)
+
+
+def similaridade_assinaturas(assinaturas: np.ndarray, pares: np.ndarray, bloco: int = 50_000) -> np.ndarray:
+    """Jaccard estimado: fração das posições em que as assinaturas coincidem."""
+    estimativas = np.zeros(len(pares), dtype=np.float64)
+    for inicio in range(0, len(pares), bloco):
+        parte = pares[inicio : inicio + bloco]
+        estimativas[inicio : inicio + bloco] = (assinaturas[parte[:, 0]] == assinaturas[parte[:, 1]]).mean(axis=1)
+    return estimativas
+
+
+def jaccard_exato(textos: Sequence[str], pares: np.ndarray, n: int = 5) -> np.ndarray:
+    """Jaccard dos conjuntos de shingles, recalculados só para os documentos dos pares."""
+    envolvidos = np.unique(pares)
+    conjuntos: dict[int, np.ndarray] = {}
+    hashes, quantidades = hashes_shingles([textos[int(indice)] for indice in envolvidos], n)
+    for indice, partes in zip(envolvidos, np.split(hashes, np.cumsum(quantidades)[:-1])):
+        conjuntos[int(indice)] = np.unique(partes)
+    resultado = np.zeros(len(pares), dtype=np.float64)
+    for posicao, (primeiro, segundo) in enumerate(pares):
+        a, b = conjuntos[int(primeiro)], conjuntos[int(segundo)]
+        intersecao = len(np.intersect1d(a, b, assume_unique=True))
+        uniao = len(a) + len(b) - intersecao
+        resultado[posicao] = intersecao / uniao if uniao else 0.0
+    return resultado
+
+
+def agrupar(pares: np.ndarray, total: int) -> np.ndarray:
+    """Rótulo do componente conexo de cada documento (union-find com compressão de caminho)."""
+    pais = np.arange(total)
+
+    def raiz(indice: int) -> int:
+        while pais[indice] != indice:
+            pais[indice] = pais[pais[indice]]
+            indice = pais[indice]
+        return indice
+
+    for primeiro, segundo in pares:
+        raiz_a, raiz_b = raiz(int(primeiro)), raiz(int(segundo))
+        if raiz_a != raiz_b:
+            pais[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+    return np.fromiter((raiz(indice) for indice in range(total)), dtype=np.int64, count=total)
+
+
+def detectar_quase_duplicados(
+    textos: pd.Series,
+    *,
+    limiar: float = 0.75,
+    num_perm: int = 128,
+    n: int = 5,
+    semente: int = 42,
+    tamanho_lote: int = 500,
+    trabalhadores: int | None = None,
+) -> dict[str, Any]:
+    """Pares e grupos de quase duplicidade com Jaccard de shingles >= ``limiar``.
+
+    ``textos`` é uma série indexada como o ``DataFrame`` de origem; os rótulos
+    do índice aparecem em ``indice_a``/``indice_b`` e ``indice``. O resultado
+    contém ``pares`` (pares confirmados), ``grupos`` (um registro por
+    documento em grupo com dois ou mais membros) e ``metricas``.
+    """
+    inicio = time.perf_counter()
+    lista_textos = textos.fillna("").astype(str).tolist()
+    rotulos = textos.index.to_numpy()
+    assinaturas, quantidades = calcular_assinaturas(
+        lista_textos,
+        num_perm=num_perm,
+        n=n,
+        semente=semente,
+        tamanho_lote=tamanho_lote,
+        trabalhadores=trabalhadores,
+    )
+    tempo_assinaturas = time.perf_counter() - inicio
+
+    bandas, linhas = escolher_bandas(limiar, num_perm)
+    candidatos = pares_candidatos(assinaturas, quantidades > 0, bandas, linhas)
+    estimado = similaridade_assinaturas(assinaturas, candidatos)
+    # Margem na estimativa para não perder pares cujo Jaccard exato atinge o limiar.
+    margem = 2 / np.sqrt(num_perm)
+    verificados = candidatos[estimado >= limiar - margem]
+    exato = jaccard_exato(lista_textos, verificados, n)
+    aceitos = exato >= limiar
+    confirmados = verificados[aceitos]
+
+    pares = pd.DataFrame(
+        {
+            "indice_a": rotulos[confirmados[:, 0]],
+            "indice_b": rotulos[confirmados[:, 1]],
+            "jaccard_estimado": estimado[estimado >= limiar - margem][aceitos],
+            f"jaccard_{n}_shingles": exato[aceitos],
+        }
+    ).sort_values(["jaccard_estimado", "indice_a"], ascending=[False, True], ignore_index=True)
+
+    componentes = agrupar(confirmados, len(lista_textos))
+    tamanhos = np.bincount(componentes, minlength=len(lista_textos))
+    em_grupo = np.flatnonzero(tamanhos[componentes] > 1)
+    grupos = pd.DataFrame(
+        {
+            "grupo": pd.factorize(componentes[em_grupo])[0],
+            "indice": rotulos[em_grupo],
+            "tamanho_grupo": tamanhos[componentes[em_grupo]],
+        }
+    )
+    metricas = {
+        "documentos": len(lista_textos),
+        "documentos_com_shingles": int((quantidades > 0).sum()),
+        "limiar": limiar,
+        "permutacoes": num_perm,
+        "bandas": bandas,
+        "linhas_por_banda": linhas,
+        "pares_candidatos": int(len(candidatos)),
+        "pares_verificados": int(len(verificados)),
+        "pares_confirmados": int(len(confirmados)),
+        "grupos": int(grupos["grupo"].nunique()),
+        "documentos_em_grupos": int(len(grupos)),
+        "copias_excedentes": int(len(grupos) - grupos["grupo"].nunique()),
+        "segundos_assinaturas": round(tempo_assinaturas, 3),
+        "segundos_total": round(time.perf_counter() - inicio, 3),
+    }
+    return {"pares": pares, "grupos": grupos, "metricas": metricas}
+
+
+def carregar_documentos(arquivo: Path, min_palavras: int) -> pd.Series:
+    """``documento_rag`` como no notebook: texto integral ou, na falta dele, o resumo."""
+    df = pd.read_parquet(arquivo, columns=["CodigoPronunciamento", "TextoDiscursoIntegral", "Resumo"])
+    integral = df["TextoDiscursoIntegral"].fillna("").astype(str).str.strip()
+    resumo = df["Resumo"].fillna("").astype(str).str.strip()
+    documentos = pd.Series(np.where(integral.ne(""), integral, resumo), index=df["CodigoPronunciamento"])
+    documentos = documentos.loc[documentos.ne("") & documentos.str.count(r"\S+").ge(min_palavras)]
+    return documentos.rename("documento_rag")
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Detecta grupos de quase duplicidade em todo o corpus de discursos."
+    )
+    parser.add_argument("--arquivo", type=Path, default=ARQUIVO_PADRAO, help="parquet do corpus")
+    parser.add_argument(
+        "--diretorio-saida",
+        type=Path,
+        default=Path("../dados/quase_duplicados"),
+        help="destino de pares.parquet, grupos.parquet e metricas.json",
+    )
+    parser.add_argument(
+        "--limiar", type=float, default=0.75, help="Jaccard mínimo dos shingles (padrão: 0,75)"
+    )
+    parser.add_argument("--permutacoes", type=int, default=128, help="posições da assinatura MinHash (padrão: 128)")
+    parser.add_argument("--tamanho-shingle", type=int, default=5, help="palavras por shingle (padrão: 5)")
+    parser.add_argument(
+        "--min-palavras",
+        type=int,
+        default=50,
+        help="ignora documentos com menos palavras (padrão: 50, como no notebook)",
+    )
+    parser.add_argument("--tamanho-lote", type=int, default=500, help="documentos por lote (padrão: 500)")
+    parser.add_argument(
+        "--trabalhadores",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processos paralelos (padrão: número de núcleos)",
+    )
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument(
+        "--log-level",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        default="INFO",
+    )
+    return parser
+
+
+def validar_argumentos(args: argparse.Namespace) -> None:
+    if not 0 < args.limiar <= 1:
+        raise ValueError("limiar deve estar no intervalo (0, 1]")
+    if args.permutacoes < 1 or args.tamanho_shingle < 1 or args.tamanho_lote < 1:
+        raise ValueError("permutacoes, tamanho_shingle e tamanho_lote devem ser positivos")
+    if args.trabalhadores < 1:
+        raise ValueError("trabalhadores deve ser positivo")
+
+
+def executar(args: argparse.Namespace) -> dict[str, Any]:
+    validar_argumentos(args)
+    documentos = carregar_documentos(args.arquivo, args.min_palavras)
+    LOG.info("Documentos analisados: %d", len(documentos))
+    resultado = detectar_quase_duplicados(
+        documentos,
+        limiar=args.limiar,
+        num_perm=args.permutacoes,
+        n=args.tamanho_shingle,
+        semente=args.semente,
+        tamanho_lote=args.tamanho_lote,
+        trabalhadores=args.trabalhadores,
+    )
+    saida = args.diretorio_saida.resolve()
+    saida.mkdir(parents=True, exist_ok=True)
+    resultado["pares"].to_parquet(saida / "pares.parquet", index=False)
+    resultado["grupos"].to_parquet(saida / "grupos.parquet", index=False)
+    (saida / "metricas.json").write_text(
+        json.dumps(resultado["metricas"], ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    LOG.info(
+        "Concluído em %.1fs: %d grupos, %d documentos em grupos; saída: %s",
+        resultado["metricas"]["segundos_total"],
+        resultado["metricas"]["grupos"],
+        resultado["metricas"]["documentos_em_grupos"],
+        saida,
+    )
+    return resultado
+
+
+def main() -> int:
+    parser = criar_parser()
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format="%(asctime)s [%(levelname)s] %(message)s",
+    )
+    try:
+        executar(args)
+    except (ValueError, KeyError, OSError) as exc:
+        LOG.error("Falha: %s", exc)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
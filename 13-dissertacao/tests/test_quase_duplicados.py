@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from quase_duplicados import agrupar, detectar_quase_duplicados
+
+
+def test_agrupar_returns_integer_labels_for_empty_input():
+    componentes = agrupar(np.zeros((0, 2), dtype=np.int64), 0)
+
+    assert componentes.dtype.kind == "i"
+    assert len(componentes) == 0
+
+
+def test_detectar_quase_duplicados_accepts_empty_series():
+    resultado = detectar_quase_duplicados(pd.Series([], dtype=object), trabalhadores=1)
+
+    assert resultado["pares"].empty
+    assert resultado["grupos"].empty
+    assert resultado["metricas"]["documentos"] == 0
+    assert resultado["metricas"]["grupos"] == 0
+
+
+def test_detectar_quase_duplicados_groups_identical_documents():
+    textos = pd.Series(
+        ["um dois tres quatro cinco seis sete oito"] * 3 + ["outro texto sem nenhuma relacao com os demais"],
+        index=[10, 11, 12, 13],
+    )
+
+    resultado = detectar_quase_duplicados(textos, trabalhadores=1)
+
+    assert sorted(resultado["grupos"]["indice"]) == [10, 11, 12]
+    assert resultado["metricas"]["copias_excedentes"] == 2